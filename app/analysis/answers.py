@@ -0,0 +1,141 @@
+"""
+Scoring of participants' task answers against a test's answer key.
+Answers and keys are compared as fold_text forms with a rapidfuzz ratio (0-100); an answer is correct when its score
+reaches the match threshold. Scores are computed in batch over the unique folded answers of each task.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.normalization.text import fold_text
+
+try:
+    from rapidfuzz import fuzz, process  # type: ignore
+except Exception:  # pragma: no cover
+    fuzz = None  # type: ignore
+    process = None  # type: ignore
+
+# Only identical folded text counts as correct unless a lower threshold is configured.
+EXACT_MATCH_THRESHOLD = 100.0
+
+
+def similarity_matrix(answers: List[str], keys: List[str]) -> np.ndarray:
+    """(answers, keys) similarity of folded strings in 0-100; exact equality when rapidfuzz is unavailable."""
+    if not answers or not keys:
+        return np.zeros((len(answers), len(keys)))
+    if process is None:
+        return np.where(np.asarray(answers, dtype=object)[:, None] == np.asarray(keys, dtype=object)[None, :], 100.0, 0.0)
+    return process.cdist(answers, keys, scorer=fuzz.ratio, dtype=np.float64)
+
+
+def is_match(similarity_score: Optional[float], threshold: float = EXACT_MATCH_THRESHOLD) -> bool:
+    return similarity_score is not None and similarity_score >= threshold
+
+
+class AnswerScorer:
+    """Scores answers against one answer key, caching folded keys and each task's scored answers.
+
+    `prepare` scores every not yet seen (task, answer) pair with a single cdist; `score` then only looks results up.
+    """
+
+    def __init__(self, answer_key: Dict[str, str], threshold: float = EXACT_MATCH_THRESHOLD) -> None:
+        self.answer_key = answer_key
+        self.threshold = threshold
+        self._folded_keys = {
+            str(task): fold_text(answer)
+            for task, answer in answer_key.items()
+            if isinstance(answer, str) and answer.strip()
+        }
+        self._scores: Dict[str, Dict[str, float]] = {task: {} for task in self._folded_keys}
+
+    def prepare(self, pairs: Iterable[Tuple[str, str]]) -> None:
+        """Score (task_id, folded answer) pairs; tasks without a key are skipped."""
+        pending: Dict[str, set] = {}
+        for task, folded in pairs:
+            scored = self._scores.get(task)
+            if scored is not None and folded not in scored:
+                pending.setdefault(task, set()).add(folded)
+        if not pending:
+            return
+
+        answers = sorted({folded for values in pending.values() for folded in values})
+        tasks = sorted(pending)
+        row = {folded: i for i, folded in enumerate(answers)}
+        matrix = similarity_matrix(answers, [self._folded_keys[task] for task in tasks])
+        for column, task in enumerate(tasks):
+            for folded in pending[task]:
+                self._scores[task][folded] = round(float(matrix[row[folded], column]), 2)
+
+    def score(self, task_id: str, folded_answer: str) -> Dict[str, Any]:
+        """Evaluation columns of one answer; tasks without a key are neither correct nor scored."""
+        scored = self._scores.get(task_id)
+        if scored is None:
+            return {"correct_answer": self.answer_key.get(task_id), "is_correct": False, "similarity_score": None}
+        if folded_answer not in scored:
+            self.prepare([(task_id, folded_answer)])
+        similarity = scored[folded_answer]
+        return {
+            "correct_answer": self.answer_key[task_id],
+            "is_correct": is_match(similarity, self.threshold),
+            "similarity_score": similarity,
+        }
+
+
+def expected_answer_count(answer_key: Dict[str, str]) -> int:
+    return len([
+        t for t, val in answer_key.items()
+        if str(t).strip() and isinstance(val, str) and val.strip()
+    ])
+
+
+def answers_eval_payload(task_records: Iterable[Dict[str, Any]], expected_count: int) -> Dict[str, Any]:
+    """Session payload of {task_id, answer, correct_answer, is_correct, similarity_score} records plus its summary."""
+    by_task = {record["task_id"]: record for record in task_records}
+    answered_count = len(by_task)
+    correct_count = sum(1 for record in by_task.values() if record.get("is_correct"))
+
+    return {
+        "by_task": by_task,
+        "summary": {
+            "answered_count": answered_count,
+            "correct_count": correct_count,
+            "expected_count": expected_count,
+            "accuracy": (correct_count / answered_count) if answered_count else None,
+            "coverage": (answered_count / expected_count) if expected_count else None,
+        },
+    }
+
+
+def session_answers(answers_by_task: Any) -> Dict[str, str]:
+    """Non-empty answers of a session's stats["answers_by_task"], keyed by stripped task id."""
+    if not isinstance(answers_by_task, dict):
+        return {}
+    out: Dict[str, str] = {}
+    for task_id, user_answer in answers_by_task.items():
+        task = str(task_id or "").strip()
+        answer_text = str(user_answer or "").strip()
+        if task and answer_text:
+            out[task] = answer_text
+    return out
+
+
+def prepare_sessions(scorer: AnswerScorer, answers_by_session: Iterable[Any]) -> None:
+    """Score the answers of many sessions' answers_by_task maps in one batch."""
+    scorer.prepare(
+        (task, fold_text(answer))
+        for answers_by_task in answers_by_session
+        for task, answer in session_answers(answers_by_task).items()
+    )
+
+
+def build_answers_eval(answers_by_task: Dict[str, str], scorer: AnswerScorer) -> Dict[str, Any]:
+    answers = session_answers(answers_by_task)
+    prepare_sessions(scorer, [answers])
+    records = [
+        {"task_id": task, "answer": answer_text, **scorer.score(task, fold_text(answer_text))}
+        for task, answer_text in answers.items()
+    ]
+    return answers_eval_payload(records, expected_answer_count(scorer.answer_key))
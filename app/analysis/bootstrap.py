@@ -0,0 +1,116 @@
+"""
+Percentile bootstrap confidence intervals for group comparisons.
+Each replicate resamples every group's sessions with replacement; all groups and replicates are drawn in one matrix
+and turned into per-session multiplicities, so means are one matrix product and medians one cumulative sum per metric.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Fixed so that the same data always yields the same intervals (and compare payloads can be cached).
+BOOTSTRAP_SEED = 20240601
+DEFAULT_CONFIDENCE = 0.95
+
+
+def resample_counts(group_sizes: Sequence[int], resamples: int, seed: int = BOOTSTRAP_SEED) -> List[np.ndarray]:
+    """(resamples, n) multiplicities per group: how often each session is drawn into each replicate."""
+    sizes = np.asarray(group_sizes, dtype=np.int64)
+    total = int(sizes.sum())
+    if total == 0 or resamples <= 0:
+        return [np.zeros((max(resamples, 0), int(n))) for n in sizes]
+
+    offsets = np.concatenate([[0], np.cumsum(sizes)])
+    column_group = np.repeat(np.arange(sizes.size), sizes)
+    rng = np.random.default_rng(seed)
+    # Column c of a row draws one session of its own group, so each group gets n draws per replicate.
+    picks = offsets[column_group] + (rng.random((resamples, total)) * sizes[column_group]).astype(np.int64)
+    flat = (np.arange(resamples, dtype=np.int64)[:, None] * total + picks).ravel()
+    counts = np.bincount(flat, minlength=resamples * total).reshape(resamples, total).astype(float)
+    return [counts[:, offsets[g]:offsets[g + 1]] for g in range(sizes.size)]
+
+
+def _intervals(replicates: np.ndarray, confidence: float) -> List[Optional[List[float]]]:
+    """Percentile interval of each column of a (resamples, k) matrix, ignoring NaN replicates.
+
+    Quantiles interpolate linearly like np.quantile, on one sort of the whole matrix.
+    """
+    ordered = np.sort(replicates, axis=0)
+    finite = np.isfinite(replicates).sum(axis=0)
+    columns = np.arange(replicates.shape[1])
+    alpha = (1 - confidence) / 2
+    bounds = []
+    for q in (alpha, 1 - alpha):
+        position = q * np.maximum(finite - 1, 0)
+        below = np.floor(position).astype(np.int64)
+        above = np.ceil(position).astype(np.int64)
+        low, high = ordered[below, columns], ordered[above, columns]
+        bounds.append(low + (position - below) * (high - low))
+    return [
+        [float(bounds[0][j]), float(bounds[1][j])] if finite[j] else None
+        for j in range(replicates.shape[1])
+    ]
+
+
+def bootstrap_means(counts: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """(resamples, k) replicate means of each column of `values` (n sessions x k; NaN where a session has no value)."""
+    valid = np.isfinite(values)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (counts @ np.where(valid, values, 0.0)) / (counts @ valid.astype(float))
+
+
+def bootstrap_median(counts: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """(resamples,) replicate medians of one metric (NaN where a session has no value)."""
+    valid = np.flatnonzero(np.isfinite(values))
+    if valid.size == 0:
+        return np.full(counts.shape[0], np.nan)
+    order = valid[np.argsort(values[valid], kind="stable")]
+    sorted_values = values[order]
+    cumulative = np.cumsum(counts[:, order].astype(np.int64), axis=1)
+    drawn = cumulative[:, -1]
+    # The k-th smallest drawn value (0-based) is the first session whose cumulative count exceeds k.
+    # Rows are offset so the flattened cumulative counts stay sorted and one searchsorted answers every replicate.
+    span = int(drawn.max()) + 1
+    row_offset = np.arange(counts.shape[0], dtype=np.int64) * span
+    flat = (cumulative + row_offset[:, None]).ravel()
+    base = np.arange(counts.shape[0], dtype=np.int64) * order.size
+    low = np.searchsorted(flat, row_offset + (drawn - 1) // 2, side="right") - base
+    high = np.searchsorted(flat, row_offset + drawn // 2, side="right") - base
+    low, high = np.minimum(low, order.size - 1), np.minimum(high, order.size - 1)
+    return np.where(drawn > 0, (sorted_values[low] + sorted_values[high]) / 2, np.nan)
+
+
+def bootstrap_group_cis(
+    groups: List[Dict[str, np.ndarray]],
+    median_keys: Sequence[str],
+    resamples: int,
+    confidence: float = DEFAULT_CONFIDENCE,
+    seed: int = BOOTSTRAP_SEED,
+) -> List[Dict[str, Dict[str, Optional[List[float]]]]]:
+    """{"mean": {key: [low, high]}, "median": {...}} per group, for per-session metric arrays of equal length.
+
+    Every metric of a group is computed from the same replicates, so one draw serves all of them.
+    """
+    sizes = [len(next(iter(metrics.values()), ())) for metrics in groups]
+    counts_by_group = resample_counts(sizes, resamples, seed)
+
+    out: List[Dict[str, Dict[str, Optional[List[float]]]]] = []
+    for metrics, counts in zip(groups, counts_by_group):
+        keys = list(metrics.keys())
+        medians = [key for key in median_keys if key in metrics]
+        if not keys or counts.shape[1] == 0 or resamples <= 0:
+            out.append({"mean": {key: None for key in keys}, "median": {key: None for key in medians}})
+            continue
+        matrix = np.column_stack([np.asarray(metrics[key], dtype=float) for key in keys])
+        replicates = np.column_stack([
+            bootstrap_means(counts, matrix),
+            *(bootstrap_median(counts, matrix[:, keys.index(key)]) for key in medians),
+        ])
+        intervals = _intervals(replicates, confidence)
+        out.append({
+            "mean": dict(zip(keys, intervals[:len(keys)])),
+            "median": dict(zip(medians, intervals[len(keys):])),
+        })
+    return out
@@ -0,0 +1,379 @@
+"""
+Single-pass metrics engine for one session's event rows.
+Metric plugins declare the source columns they need; the engine reads only those columns once and groups rows by task once.
+Every plugin then works on the same prepared frame and writes one key of the session stats payload.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.analysis.kinematics import compute_task_kinematics, empty_task_kinematics
+from app.analysis.metrics import SOC_DEMO_KEYS, extract_soc_demo
+from app.analysis.segmentation import segment_events, segment_timeline_items
+from app.analysis.transitions import session_transitions
+from app.analysis.timeline import (
+    _build_timeline_items_from_events_df,
+    _compute_interval_event_ratios,
+    build_interval_index,
+    prepare_events_df,
+)
+from app.parsing.column_aliases import SOC_DEMO_COLUMN_ALIASES, resolve_column_aliases
+from app.parsing.maptrack_csv import (
+    _normalize_task_id,
+    get_user_id_column,
+    normalize_task_series,
+    validate_maptrack_df,
+)
+
+EVENT_COLUMNS = ("timestamp", "event_name", "event_detail", "task")
+ANSWER_EVENT_NAMES = {"answer selected", "polygon selected"}
+
+
+def soc_demo_row_from_df(df: pd.DataFrame) -> Dict[str, Any]:
+    """Socio-demographic fields of the first row, keyed by canonical SOC_DEMO_KEYS."""
+    if df.empty:
+        return {}
+    row = df.iloc[0].to_dict()
+    resolved = resolve_column_aliases(df.columns, SOC_DEMO_COLUMN_ALIASES)
+    return {key: row.get(resolved[key]) for key in SOC_DEMO_KEYS if resolved.get(key)}
+
+
+def derive_row_columns(df: pd.DataFrame, group_col: Optional[str] = None) -> pd.DataFrame:
+    """timestamp_ms / event_name / task / is_answer per row; "setting task" rows carry forward only within `group_col`."""
+    # Same rules as parse_session_df: invalid timestamps count as 0, tasks follow "setting task" rows.
+    timestamps = pd.to_numeric(df["timestamp"], errors="coerce").replace([np.inf, -np.inf], np.nan)
+    event_name = df["event_name"].astype(str).str.strip()
+
+    explicit_tasks = normalize_task_series(df["task"]) if "task" in df.columns else pd.Series(None, index=df.index, dtype=object)
+    current_tasks = normalize_task_series(df["event_detail"].where(event_name == "setting task"))
+    current_tasks = current_tasks.groupby(df[group_col], sort=False).ffill() if group_col else current_tasks.ffill()
+    tasks = explicit_tasks.where(explicit_tasks.notna(), current_tasks)
+
+    return pd.DataFrame({
+        "timestamp_ms": timestamps.fillna(0).astype("int64"),
+        "event_name": event_name,
+        "task": tasks.astype(object).where(tasks.notna(), None),
+        "is_answer": event_name.str.lower().isin(ANSWER_EVENT_NAMES),
+    }, index=df.index)
+
+
+class SessionFrame:
+    """One session's rows plus the per-row columns and per-task aggregates every plugin shares."""
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        *,
+        session_id: str,
+        user_id: Optional[str] = None,
+        soc_row: Optional[Dict[str, Any]] = None,
+        rows: Optional[pd.DataFrame] = None,
+        events_df: Optional[pd.DataFrame] = None,
+        task_kinematics: Optional[Dict[str, Dict[str, Any]]] = None,
+        transitions: Optional[Dict[str, Any]] = None,
+        segments: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        self.df = df
+        self.session_id = session_id
+        self.soc_row = soc_row or {}
+
+        if user_id is not None:
+            self.user_id = _normalize_task_id(user_id)
+        else:
+            user_col = get_user_id_column(df)
+            self.user_id = _normalize_task_id(df[user_col].iloc[0]) if user_col and len(df) > 0 else None
+
+        rows = derive_row_columns(df) if rows is None else rows
+        self.timestamp_ms = rows["timestamp_ms"]
+        self.event_name = rows["event_name"]
+        self.task = rows["task"]
+        self.is_answer = rows["is_answer"]
+        if events_df is not None:
+            self.__dict__["events_df"] = events_df
+        if task_kinematics is not None:
+            self.__dict__["task_kinematics"] = task_kinematics
+        if transitions is not None:
+            self.__dict__["transitions"] = transitions
+        if segments is not None:
+            self.__dict__["segments"] = segments
+
+    @cached_property
+    def task_summary(self) -> pd.DataFrame:
+        """events_total / time_min_ms / time_max_ms per task, in first-occurrence order."""
+        grouped = self.timestamp_ms.groupby(self.task, sort=False)
+        return pd.DataFrame({
+            "events_total": grouped.size(),
+            "time_min_ms": grouped.min(),
+            "time_max_ms": grouped.max(),
+        })
+
+    @property
+    def task_ids(self) -> List[str]:
+        return [str(task_id) for task_id in self.task_summary.index]
+
+    @cached_property
+    def events_df(self) -> pd.DataFrame:
+        """Time-sorted rows with the active task carried forward, as used by the timeline."""
+        return prepare_events_df(self.df[[col for col in EVENT_COLUMNS if col in self.df.columns]])
+
+    @cached_property
+    def task_kinematics(self) -> Dict[str, Dict[str, Any]]:
+        detail = self.df["event_detail"] if "event_detail" in self.df.columns else None
+        return compute_task_kinematics(self.timestamp_ms, self.event_name, detail, self.task)
+
+    @cached_property
+    def transitions(self) -> Dict[str, Any]:
+        return session_transitions(self.timestamp_ms, self.event_name, self.task)
+
+    @cached_property
+    def segments(self) -> Dict[str, Any]:
+        return segment_events(self.events_df)
+
+    @cached_property
+    def timeline_items(self) -> List[Dict[str, Any]]:
+        return _build_timeline_items_from_events_df(self.events_df) + segment_timeline_items(self.segments)
+
+
+class MetricPlugin(ABC):
+    """Computes one stats key from a SessionFrame; `columns` lists the source columns it reads.
+
+    Bump `version` whenever the plugin's output changes so stored sessions are recomputed.
+    """
+
+    key: str = ""
+    version: int = 1
+    columns: Sequence[str] = ()
+    # Stats keys this plugin reads; it is recomputed whenever one of them is.
+    depends_on: Sequence[str] = ()
+
+    def resolve_columns(self, header: Sequence[str]) -> List[str]:
+        return [col for col in self.columns if col in header]
+
+    @abstractmethod
+    def compute(self, frame: SessionFrame, stats: Dict[str, Any]) -> Any:
+        """Value stored under `key`; `stats` holds the keys computed so far."""
+
+
+class SessionMetricsPlugin(MetricPlugin):
+    key = "session"
+    columns = ("timestamp", "event_name")
+
+    def resolve_columns(self, header: Sequence[str]) -> List[str]:
+        user_col = get_user_id_column(pd.DataFrame(columns=list(header)))
+        return [*super().resolve_columns(header), *([user_col] if user_col else [])]
+
+    def compute(self, frame: SessionFrame, stats: Dict[str, Any]) -> Dict[str, Any]:
+        event_count = len(frame.df)
+        time_min = int(frame.timestamp_ms.min()) if event_count else None
+        time_max = int(frame.timestamp_ms.max()) if event_count else None
+        return {
+            "session_id": frame.session_id,
+            "user_id": frame.user_id,
+            "tasks_count": len(frame.task_summary),
+            "events_total": event_count,
+            "time_min_ms": time_min,
+            "time_max_ms": time_max,
+            "duration_ms": (time_max - time_min) if event_count else None,
+            "soc_demo": extract_soc_demo(raw_row=frame.soc_row),
+        }
+
+
+class TaskMetricsPlugin(MetricPlugin):
+    """Duration, event counts and movement kinematics per task."""
+
+    key = "tasks"
+    version = 2
+    columns = ("timestamp", "event_name", "event_detail", "task")
+
+    def compute(self, frame: SessionFrame, stats: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        kinematics = frame.task_kinematics
+        out: Dict[str, Dict[str, Any]] = {}
+        for task_id, row in frame.task_summary.iterrows():
+            tmin = int(row["time_min_ms"])
+            tmax = int(row["time_max_ms"])
+            out[str(task_id)] = {
+                "task_id": str(task_id),
+                "events_total": int(row["events_total"]),
+                "time_min_ms": tmin,
+                "time_max_ms": tmax,
+                "duration_ms": tmax - tmin,
+                **(kinematics.get(str(task_id)) or empty_task_kinematics()),
+            }
+        return out
+
+
+class AnswersPlugin(MetricPlugin):
+    """Latest "answer selected" / "polygon selected" detail per task, using the raw task column."""
+
+    key = "answers_by_task"
+    columns = ("event_name", "event_detail", "task")
+
+    def compute(self, frame: SessionFrame, stats: Dict[str, Any]) -> Dict[str, str]:
+        df = frame.df
+        if df.empty or "task" not in df.columns or "event_detail" not in df.columns:
+            return {}
+
+        out: Dict[str, str] = {}
+        rows = df.loc[frame.is_answer.to_numpy(), ["task", "event_detail"]]
+        for task_raw, detail_raw in zip(rows["task"].tolist(), rows["event_detail"].tolist()):
+            task_id = "" if pd.isna(task_raw) else str(task_raw).strip()
+            answer = "" if pd.isna(detail_raw) else str(detail_raw).strip()
+            if task_id and answer:
+                out[task_id] = answer
+        return out
+
+
+class SegmentsPlugin(MetricPlugin):
+    """Idle gaps and stationary dwells per task; their durations also feed the interval ratios' segments block."""
+
+    key = "segments"
+    columns = EVENT_COLUMNS
+
+    def compute(self, frame: SessionFrame, stats: Dict[str, Any]) -> Dict[str, Any]:
+        return frame.segments
+
+
+class IntervalRatiosPlugin(MetricPlugin):
+    key = "interval_event_ratios"
+    version = 2
+    columns = EVENT_COLUMNS
+    depends_on = ("tasks", "segments")
+
+    def compute(self, frame: SessionFrame, stats: Dict[str, Any]) -> Dict[str, Any]:
+        task_metrics = stats.get("tasks") if isinstance(stats.get("tasks"), dict) else {}
+        return _compute_interval_event_ratios(frame.timeline_items, task_metrics)
+
+
+class IntervalIndexPlugin(MetricPlugin):
+    """Cumulative covered time per behaviour, for ratio queries over arbitrary time windows."""
+
+    key = "interval_index"
+    version = 2
+    columns = EVENT_COLUMNS
+    depends_on = ("tasks",)
+
+    def compute(self, frame: SessionFrame, stats: Dict[str, Any]) -> Dict[str, Any]:
+        task_metrics = stats.get("tasks") if isinstance(stats.get("tasks"), dict) else {}
+        return build_interval_index(frame.timeline_items, task_metrics)
+
+
+class TransitionsPlugin(MetricPlugin):
+    """Sparse event-to-event transition counts, summed into group and test matrices on request."""
+
+    key = "transitions"
+    columns = ("timestamp", "event_name", "event_detail", "task")
+
+    def compute(self, frame: SessionFrame, stats: Dict[str, Any]) -> Dict[str, Any]:
+        return frame.transitions
+
+
+# Run in order; later plugins may read keys written by earlier ones.
+METRIC_PLUGINS: List[MetricPlugin] = [
+    SessionMetricsPlugin(),
+    TaskMetricsPlugin(),
+    AnswersPlugin(),
+    SegmentsPlugin(),
+    IntervalRatiosPlugin(),
+    IntervalIndexPlugin(),
+    TransitionsPlugin(),
+]
+
+
+def register_metric_plugin(plugin: MetricPlugin) -> MetricPlugin:
+    METRIC_PLUGINS.append(plugin)
+    return plugin
+
+
+def _required_columns(header: Sequence[str], plugins: Iterable[MetricPlugin]) -> List[str]:
+    # SessionFrame itself derives timestamps and tasks, whatever subset of plugins runs.
+    needed = set(EVENT_COLUMNS)
+    for plugin in plugins:
+        needed.update(plugin.resolve_columns(header))
+    return [col for col in header if col in needed]
+
+
+def load_session_frame(
+    csv_path: Path,
+    *,
+    session_id: str,
+    plugins: Optional[List[MetricPlugin]] = None,
+) -> SessionFrame:
+    """Read the header and first row, then only the columns the plugins need."""
+    head = pd.read_csv(csv_path, nrows=1)
+    validate_maptrack_df(head)
+    usecols = _required_columns(list(head.columns), plugins or METRIC_PLUGINS)
+    df = pd.read_csv(csv_path, usecols=usecols, low_memory=False)
+    return SessionFrame(df, session_id=session_id, soc_row=soc_demo_row_from_df(head))
+
+
+def iter_session_frames(
+    df: pd.DataFrame,
+    group_col: str,
+    *,
+    session_id_for: Callable[[str], str],
+    soc_rows: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Iterator[Tuple[str, SessionFrame]]:
+    """Split a multi-user frame into (group id, SessionFrame) pairs, deriving shared columns for all users in one pass."""
+    rows = derive_row_columns(df, group_col)
+    event_cols = [col for col in (*EVENT_COLUMNS, group_col) if col in df.columns]
+    events = prepare_events_df(df[event_cols], group_col)
+    events_by_group = dict(iter(events.groupby(group_col, sort=False)))
+    segments_by_group = segment_events(events, group_col)
+    detail = df["event_detail"] if "event_detail" in df.columns else None
+    kinematics_by_group = compute_task_kinematics(rows["timestamp_ms"], rows["event_name"], detail, rows["task"], df[group_col])
+    transitions_by_group = session_transitions(rows["timestamp_ms"], rows["event_name"], rows["task"], df[group_col])
+
+    for group_id, df_group in df.groupby(group_col, sort=False):
+        group_id = str(group_id)
+        events_df = events_by_group.get(group_id)
+        df_group = df_group.drop(columns=[group_col])
+        yield group_id, SessionFrame(
+            df_group,
+            session_id=session_id_for(group_id),
+            user_id=group_id,
+            soc_row=(soc_rows or {}).get(group_id, {}),
+            rows=rows.loc[df_group.index],
+            events_df=events_df.drop(columns=[group_col]) if events_df is not None else None,
+            task_kinematics=kinematics_by_group.get(group_id, {}),
+            transitions=transitions_by_group.get(group_id),
+            segments=segments_by_group.get(group_id),
+        )
+
+
+def compute_session_stats(
+    frame: SessionFrame,
+    plugins: Optional[List[MetricPlugin]] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Run plugins over the frame, on top of `stats` when only some families are recomputed."""
+    stats = dict(stats or {})
+    versions = dict(stats.get("metrics_versions") or {})
+    for plugin in plugins or METRIC_PLUGINS:
+        stats[plugin.key] = plugin.compute(frame, stats)
+        versions[plugin.key] = plugin.version
+    stats["metrics_versions"] = versions
+    return stats
+
+
+def metrics_version(plugins: Optional[List[MetricPlugin]] = None) -> str:
+    """Session-level token over every family's version, stored in its own column for stale-session queries."""
+    return ",".join(f"{plugin.key}:{plugin.version}" for plugin in plugins or METRIC_PLUGINS)
+
+
+def stale_metric_plugins(stats: Dict[str, Any], plugins: Optional[List[MetricPlugin]] = None) -> List[MetricPlugin]:
+    """Plugins whose stored family version is missing or outdated, plus everything depending on them."""
+    stored = stats.get("metrics_versions") if isinstance(stats.get("metrics_versions"), dict) else {}
+    stale_keys: set[str] = set()
+    out: List[MetricPlugin] = []
+    for plugin in plugins or METRIC_PLUGINS:
+        if stored.get(plugin.key) != plugin.version or plugin.key not in stats or stale_keys.intersection(plugin.depends_on):
+            stale_keys.add(plugin.key)
+            out.append(plugin)
+    return out
@@ -0,0 +1,322 @@
+"""
+Group-level distribution statistics computed over the stored stats of member sessions.
+Values are collected into NumPy arrays once per metric and summarized (mean, std, median, quantiles, boxplot).
+Only the summary numbers are returned, so clients no longer need every member session's full stats payload.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from app.analysis.bootstrap import BOOTSTRAP_SEED, DEFAULT_CONFIDENCE, bootstrap_group_cis
+from app.analysis.timeline import INTERVAL_EVENT_NAME_MAP
+
+SOC_DEMO_NUMERIC_KEYS = ["age"]
+SOC_DEMO_CATEGORICAL_KEYS = [
+    "gender",
+    "occupation",
+    "education",
+    "nationality",
+    "device",
+    "confidence",
+    "paper_maps",
+    "computer_maps",
+    "mobile_maps",
+]
+SUMMARY_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Per-task numeric metrics stored in stats.tasks and summarized across member sessions.
+TASK_METRIC_KEYS = (
+    "duration_ms",
+    "events_total",
+    "pan_distance_m",
+    "pan_speed_m_s",
+    "direction_changes",
+    "zoom_changes",
+    "zoom_delta_abs",
+)
+
+
+def _to_array(values: Iterable[Any]) -> np.ndarray:
+    """Finite floats only; None, blanks and non-numeric values are dropped."""
+    out: List[float] = []
+    for value in values:
+        if value is None or isinstance(value, bool):
+            continue
+        try:
+            number = float(value)
+        except (TypeError, ValueError):
+            continue
+        out.append(number)
+    arr = np.asarray(out, dtype=float)
+    return arr[np.isfinite(arr)]
+
+
+def _finite_or_nan(value: Any) -> float:
+    """One value under the same rules as _to_array, with NaN in place of a dropped value."""
+    if value is None or isinstance(value, bool):
+        return math.nan
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return math.nan
+    return number if math.isfinite(number) else math.nan
+
+
+def numeric_summary(values: Iterable[Any]) -> Optional[Dict[str, Any]]:
+    """count / min / max / avg / std / median / quantiles, as computeNumericStats reports them."""
+    arr = np.sort(_to_array(values))
+    if arr.size == 0:
+        return None
+
+    quantiles = np.quantile(arr, SUMMARY_QUANTILES)
+    return {
+        "count": int(arr.size),
+        "min": float(arr[0]),
+        "max": float(arr[-1]),
+        "avg": float(arr.mean()),
+        "std": float(arr.std(ddof=1)) if arr.size > 1 else 0.0,
+        "median": float(np.median(arr)),
+        "quantiles": {f"p{int(q * 100)}": float(v) for q, v in zip(SUMMARY_QUANTILES, quantiles)},
+        "boxplot": _boxplot_from_sorted(arr),
+    }
+
+
+def _boxplot_from_sorted(arr: np.ndarray) -> Dict[str, Any]:
+    """Tukey boxplot with 1.5 * IQR fences and linearly interpolated quartiles, as drawn by the compare view."""
+    q1, median, q3 = (float(v) for v in np.quantile(arr, (0.25, 0.5, 0.75)))
+    iqr = q3 - q1
+    lower_fence = q1 - 1.5 * iqr
+    upper_fence = q3 + 1.5 * iqr
+    inside_mask = (arr >= lower_fence) & (arr <= upper_fence)
+    inside = arr[inside_mask]
+    return {
+        "min": float(arr[0]),
+        "max": float(arr[-1]),
+        "q1": q1,
+        "median": median,
+        "q3": q3,
+        "iqr": iqr,
+        "lowerFence": lower_fence,
+        "upperFence": upper_fence,
+        "whiskerLow": float(inside[0]) if inside.size else float(arr[0]),
+        "whiskerHigh": float(inside[-1]) if inside.size else float(arr[-1]),
+        "outliers": arr[~inside_mask].tolist(),
+        "average": float(arr.mean()),
+        "count": int(arr.size),
+    }
+
+
+def categorical_summary(values: Iterable[Any]) -> Dict[str, Any]:
+    """Counts and shares of non-empty values, most frequent first."""
+    labels = [str(value).strip() for value in values if value is not None]
+    labels = [label for label in labels if label]
+    if not labels:
+        return {"total": 0, "values": []}
+
+    unique, counts = np.unique(np.asarray(labels, dtype=object), return_counts=True)
+    order = np.argsort(-counts, kind="stable")
+    total = int(counts.sum())
+    return {
+        "total": total,
+        "values": [
+            {"value": str(unique[i]), "count": int(counts[i]), "share": float(counts[i] / total)}
+            for i in order
+        ],
+    }
+
+
+def _dict_at(payload: Any, *keys: str) -> Dict[str, Any]:
+    for key in keys:
+        payload = payload.get(key) if isinstance(payload, dict) else None
+    return payload if isinstance(payload, dict) else {}
+
+
+def _empty_task_bucket() -> Dict[str, List[Any]]:
+    return {**{key: [] for key in TASK_METRIC_KEYS}, "is_correct": []}
+
+
+def build_group_stats(sessions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Summaries over member sessions' stored stats: session, per-task, accuracy, interval ratios, soc-demo."""
+    stats_list = [_dict_at(session, "stats") for session in sessions]
+    session_rows = [_dict_at(stats, "session") for stats in stats_list]
+
+    task_values: Dict[str, Dict[str, List[Any]]] = {}
+    ratio_values: Dict[str, Dict[str, List[Any]]] = {}
+    for stats in stats_list:
+        for task_id, metrics in _dict_at(stats, "tasks").items():
+            if not isinstance(metrics, dict):
+                continue
+            bucket = task_values.setdefault(str(task_id), _empty_task_bucket())
+            for key in TASK_METRIC_KEYS:
+                bucket[key].append(metrics.get(key))
+
+        for task_id, record in _dict_at(stats, "answers_eval", "by_task").items():
+            if isinstance(record, dict) and record.get("correct_answer"):
+                bucket = task_values.setdefault(str(task_id), _empty_task_bucket())
+                bucket["is_correct"].append(1.0 if record.get("is_correct") else 0.0)
+
+        ratios = _dict_at(stats, "interval_event_ratios")
+        scopes = {**_dict_at(ratios, "by_task"), "ALL_TASKS": _dict_at(ratios, "all_tasks")}
+        for task_id, scope in scopes.items():
+            events = _dict_at(scope, "events")
+            if not events:
+                continue
+            bucket = ratio_values.setdefault(str(task_id), {key: [] for key in INTERVAL_EVENT_NAME_MAP.values()})
+            for event_key in bucket:
+                bucket[event_key].append(_dict_at(events, event_key).get("ratio"))
+
+    accuracy_rows = [_dict_at(stats, "answers_eval", "summary") for stats in stats_list]
+    soc_rows = [_dict_at(row, "soc_demo") for row in session_rows]
+
+    return {
+        "sessions_count": len(sessions),
+        "session": {
+            key: numeric_summary(row.get(key) for row in session_rows)
+            for key in ("duration_ms", "tasks_count", "events_total")
+        },
+        "tasks": {
+            task_id: {
+                **{key: numeric_summary(values[key]) for key in TASK_METRIC_KEYS},
+                "accuracy": numeric_summary(values["is_correct"]),
+            }
+            for task_id, values in sorted(task_values.items())
+        },
+        "accuracy": {
+            key: numeric_summary(row.get(key) for row in accuracy_rows)
+            for key in ("accuracy", "coverage", "answered_count", "correct_count")
+        },
+        "interval_ratios": {
+            task_id: {event_key: numeric_summary(values) for event_key, values in by_event.items()}
+            for task_id, by_event in sorted(ratio_values.items())
+        },
+        "soc_demo": {
+            **{key: numeric_summary(row.get(key) for row in soc_rows) for key in SOC_DEMO_NUMERIC_KEYS},
+            **{key: categorical_summary(row.get(key) for row in soc_rows) for key in SOC_DEMO_CATEGORICAL_KEYS},
+        },
+    }
+
+
+def _session_task_ids(session: Dict[str, Any]) -> List[str]:
+    tasks = session.get("tasks") if isinstance(session.get("tasks"), list) else []
+    return [str(task_id) for task_id in tasks] if tasks else [str(session.get("task") or "unknown")]
+
+
+def _compare_values(session: Dict[str, Any], task_id: Optional[str] = None) -> Dict[str, Any]:
+    """Duration, correctness and interval ratios of one session, overall or for task_id."""
+    stats = _dict_at(session, "stats")
+    if task_id:
+        is_correct = _dict_at(stats, "answers_eval", "by_task", task_id).get("is_correct")
+        values = {
+            "duration_ms": _dict_at(stats, "tasks", task_id).get("duration_ms"),
+            "correctness": float(is_correct) if isinstance(is_correct, bool) else _dict_at(stats, "tasks", task_id).get("accuracy"),
+        }
+        ratios = _dict_at(stats, "interval_event_ratios", "by_task", task_id)
+    else:
+        values = {
+            "duration_ms": _dict_at(stats, "session").get("duration_ms"),
+            "correctness": _dict_at(stats, "answers_eval", "summary").get("accuracy"),
+        }
+        ratios = _dict_at(stats, "interval_event_ratios", "all_tasks")
+    for event_key in INTERVAL_EVENT_NAME_MAP.values():
+        values[f"ratio:{event_key}"] = _dict_at(ratios, "events", event_key).get("ratio")
+    return values
+
+
+def _mean_or_none(values: Iterable[Any]) -> Optional[float]:
+    arr = _to_array(values)
+    return float(arr.mean()) if arr.size else None
+
+
+def build_compare_row(sessions: List[Dict[str, Any]], task_id: Optional[str] = None) -> Dict[str, Any]:
+    """Average / median duration, average correctness, interval ratios and age, over all sessions or those that contain task_id."""
+    if task_id:
+        sessions = [session for session in sessions if task_id in _session_task_ids(session)]
+
+    rows = [_compare_values(session, task_id) for session in sessions]
+    duration_arr = _to_array(row["duration_ms"] for row in rows)
+    return {
+        "members_count": len(sessions),
+        "avg_duration_ms": float(duration_arr.mean()) if duration_arr.size else None,
+        "median_duration_ms": float(np.median(duration_arr)) if duration_arr.size else None,
+        "avg_correctness": _mean_or_none(row["correctness"] for row in rows),
+        "avg_interval_ratios": {
+            event_key: _mean_or_none(row[f"ratio:{event_key}"] for row in rows)
+            for event_key in INTERVAL_EVENT_NAME_MAP.values()
+        },
+        "avg_age": _mean_or_none(_dict_at(session, "stats", "session", "soc_demo").get("age") for session in sessions),
+    }
+
+
+def _compare_metric_arrays(sessions: List[Dict[str, Any]], task_ids: List[str]) -> Dict[str, np.ndarray]:
+    """Per-session values keyed "<scope>|<metric>" ("" is the overall scope); NaN outside a task or when missing."""
+    out: Dict[str, List[float]] = {}
+    for session in sessions:
+        session_tasks = set(_session_task_ids(session))
+        for scope in ["", *task_ids]:
+            values = _compare_values(session, scope or None) if not scope or scope in session_tasks else {}
+            for key in ("duration_ms", "correctness", *(f"ratio:{k}" for k in INTERVAL_EVENT_NAME_MAP.values())):
+                out.setdefault(f"{scope}|{key}", []).append(_finite_or_nan(values.get(key)))
+    return {key: np.asarray(values, dtype=float) for key, values in out.items()}
+
+
+def _row_confidence_intervals(cis: Dict[str, Dict[str, Any]], scope: str) -> Dict[str, Any]:
+    mean, median = cis["mean"], cis["median"]
+    return {
+        "avg_duration_ms": mean.get(f"{scope}|duration_ms"),
+        "median_duration_ms": median.get(f"{scope}|duration_ms"),
+        "avg_correctness": mean.get(f"{scope}|correctness"),
+        "avg_interval_ratios": {
+            event_key: mean.get(f"{scope}|ratio:{event_key}") for event_key in INTERVAL_EVENT_NAME_MAP.values()
+        },
+    }
+
+
+def build_group_compare(
+    groups: List[Dict[str, Any]],
+    resamples: int = 0,
+    confidence: float = DEFAULT_CONFIDENCE,
+) -> Dict[str, Any]:
+    """Compare rows (overall and per task) and completion-time boxplots for each group, in request order.
+
+    With `resamples` every row also gets percentile bootstrap intervals ("ci") for its estimates.
+    """
+    all_task_ids = sorted({
+        task_id
+        for group in groups
+        for session in group.get("sessions", [])
+        for task_id in _session_task_ids(session)
+    })
+
+    cis_by_group: List[Optional[Dict[str, Any]]] = [None] * len(groups)
+    if resamples > 0:
+        metric_arrays = [_compare_metric_arrays(group.get("sessions", []), all_task_ids) for group in groups]
+        median_keys = [f"{scope}|duration_ms" for scope in ["", *all_task_ids]]
+        cis_by_group = bootstrap_group_cis(metric_arrays, median_keys, resamples, confidence)
+
+    out_groups: List[Dict[str, Any]] = []
+    for group, cis in zip(groups, cis_by_group):
+        sessions = group.get("sessions", [])
+        durations = np.sort(_to_array(_dict_at(session, "stats", "session").get("duration_ms") for session in sessions))
+        group_task_ids = sorted({task_id for session in sessions for task_id in _session_task_ids(session)})
+        summary = build_compare_row(sessions)
+        by_task = {task_id: build_compare_row(sessions, task_id) for task_id in group_task_ids}
+        if cis is not None:
+            summary["ci"] = _row_confidence_intervals(cis, "")
+            for task_id, row in by_task.items():
+                row["ci"] = _row_confidence_intervals(cis, task_id)
+        out_groups.append({
+            "group_id": group.get("id"),
+            "summary": summary,
+            "by_task": by_task,
+            "duration_boxplot": _boxplot_from_sorted(durations) if durations.size else None,
+            "answers": group.get("answers"),
+        })
+
+    return {
+        "task_ids": all_task_ids,
+        "groups": out_groups,
+        "bootstrap": {"resamples": resamples, "confidence": confidence, "seed": BOOTSTRAP_SEED} if resamples > 0 else None,
+    }
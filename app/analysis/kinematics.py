@@ -0,0 +1,144 @@
+"""
+Per-task movement kinematics computed from a session's moveend coordinates and zoom levels.
+Each pan runs from a movestart position to the following moveend; distances use a vectorized haversine.
+Totals are merged into stats.tasks at ingest, so group statistics read them without reparsing events.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.parsing.maptrack_csv import COORDINATE_PATTERN
+
+EARTH_RADIUS_M = 6371008.8
+# Heading change between consecutive pans above which the user is counted as changing direction.
+DIRECTION_CHANGE_DEG = 45.0
+# Pans shorter than this have no meaningful heading.
+MIN_HEADING_DISTANCE_M = 1.0
+ZOOM_EVENT_NAMES = ("zoom in", "zoom out")
+
+
+def haversine_m(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def bearing_deg(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = (np.radians(a) for a in (lat1, lon1, lat2, lon2))
+    y = np.sin(lon2 - lon1) * np.cos(lat2)
+    x = np.cos(lat1) * np.sin(lat2) - np.sin(lat1) * np.cos(lat2) * np.cos(lon2 - lon1)
+    return np.degrees(np.arctan2(y, x)) % 360
+
+
+def empty_task_kinematics() -> Dict[str, Any]:
+    return {
+        "pan_count": 0,
+        "pan_distance_m": 0.0,
+        "pan_moving_ms": 0,
+        "pan_speed_m_s": None,
+        "direction_changes": 0,
+        "zoom_changes": 0,
+        "zoom_delta_abs": 0.0,
+        "zoom_delta_net": 0.0,
+    }
+
+
+def compute_task_kinematics(
+    timestamp_ms: pd.Series,
+    event_name: pd.Series,
+    event_detail: Optional[pd.Series],
+    task: pd.Series,
+    group: Optional[pd.Series] = None,
+) -> Dict[Any, Any]:
+    """Pan distance / moving time / speed, direction changes and zoom-level changes per task.
+
+    With `group` (a multi-user bulk frame) the result is keyed by str(group id), then task.
+    """
+    out: Dict[Any, Any] = {}
+    if event_detail is None or len(timestamp_ms) == 0:
+        return out
+
+    group_codes, group_ids = pd.factorize(group if group is not None else pd.Series(0, index=timestamp_ms.index), sort=False)
+    order = np.lexsort((timestamp_ms.to_numpy(), group_codes))
+    ts = timestamp_ms.to_numpy()[order]
+    names = event_name.to_numpy()[order]
+    details = event_detail.iloc[order].reset_index(drop=True)
+    group_codes = group_codes[order]
+    task_codes, task_ids = pd.factorize(task.iloc[order], sort=False)
+    # One code per (group, task); rows without a task get -1.
+    keys = np.where(task_codes >= 0, group_codes.astype(np.int64) * max(len(task_ids), 1) + task_codes, -1)
+
+    # A pan runs from the latest movestart (position and time) of the same group to its moveend.
+    is_start = names == "movestart"
+    is_end = names == "moveend"
+    coords = details.where(is_start | is_end).astype("string").str.extract(COORDINATE_PATTERN).astype(float)
+    coords.loc[(np.abs(coords["lat"]) > 90) | (np.abs(coords["lon"]) > 180)] = np.nan
+    start_row = pd.Series(np.where(is_start, np.arange(ts.size), np.nan)).ffill().to_numpy()
+    has_start = ~np.isnan(start_row)
+    start_row = np.where(has_start, start_row, 0).astype(np.int64)
+    has_start &= group_codes[start_row] == group_codes
+    lat = coords["lat"].to_numpy()
+    lon = coords["lon"].to_numpy()
+
+    valid = is_end & has_start & (keys >= 0) & ~np.isnan(lat) & ~np.isnan(lat[start_row])
+    seg_key = keys[valid]
+    starts = start_row[valid]
+    seg_dist = haversine_m(lat[starts], lon[starts], lat[valid], lon[valid])
+    seg_heading = bearing_deg(lat[starts], lon[starts], lat[valid], lon[valid])
+    seg_moving = ts[valid] - ts[starts]
+
+    # Direction changes compare consecutive pans of the same task that moved far enough to have a heading.
+    headed = seg_dist >= MIN_HEADING_DISTANCE_M
+    head_key = seg_key[headed]
+    head = seg_heading[headed]
+    turn = np.abs((head[1:] - head[:-1] + 180) % 360 - 180)
+    turn_key = head_key[1:][(head_key[1:] == head_key[:-1]) & (turn > DIRECTION_CHANGE_DEG)]
+
+    zoom_levels = pd.to_numeric(details.where(np.isin(names, ZOOM_EVENT_NAMES)), errors="coerce").to_numpy()
+    zoom_valid = np.isfinite(zoom_levels)
+    levels = zoom_levels[zoom_valid]
+    level_key = keys[zoom_valid]
+    level_group = group_codes[zoom_valid]
+    # The first level of each session has nothing to change from.
+    zoom_keep = (level_group[1:] == level_group[:-1]) & (level_key[1:] >= 0)
+    zoom_delta = np.diff(levels)[zoom_keep]
+    zoom_key = level_key[1:][zoom_keep]
+
+    unique_keys, codes = np.unique(np.concatenate([seg_key, turn_key, zoom_key]), return_inverse=True)
+    n_keys = unique_keys.size
+    if n_keys == 0:
+        return out
+    seg_codes = codes[: seg_key.size]
+    turn_codes = codes[seg_key.size: seg_key.size + turn_key.size]
+    zoom_codes = codes[seg_key.size + turn_key.size:]
+
+    pan_count = np.bincount(seg_codes, minlength=n_keys)
+    pan_distance = np.bincount(seg_codes, weights=seg_dist, minlength=n_keys)
+    pan_moving = np.bincount(seg_codes, weights=seg_moving, minlength=n_keys)
+    direction_changes = np.bincount(turn_codes, minlength=n_keys)
+    zoom_changes = np.bincount(zoom_codes, weights=(zoom_delta != 0).astype(float), minlength=n_keys)
+    zoom_abs = np.bincount(zoom_codes, weights=np.abs(zoom_delta), minlength=n_keys)
+    zoom_net = np.bincount(zoom_codes, weights=zoom_delta, minlength=n_keys)
+
+    for i, key in enumerate(unique_keys.tolist()):
+        group_code, task_code = divmod(key, max(len(task_ids), 1))
+        moving_ms = int(pan_moving[i])
+        metrics = {
+            "pan_count": int(pan_count[i]),
+            "pan_distance_m": round(float(pan_distance[i]), 1),
+            "pan_moving_ms": moving_ms,
+            "pan_speed_m_s": round(float(pan_distance[i]) / (moving_ms / 1000), 3) if moving_ms > 0 else None,
+            "direction_changes": int(direction_changes[i]),
+            "zoom_changes": int(zoom_changes[i]),
+            "zoom_delta_abs": float(zoom_abs[i]),
+            "zoom_delta_net": float(zoom_net[i]),
+        }
+        if group is None:
+            out[str(task_ids[task_code])] = metrics
+        else:
+            out.setdefault(str(group_ids[group_code]), {})[str(task_ids[task_code])] = metrics
+    return out
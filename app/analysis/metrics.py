@@ -7,8 +7,9 @@ It also centralizes socio-demographic extraction and normalization rules.
 
 from __future__ import annotations
 
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Sequence, Tuple
 
+from app.analysis.sketch import QuantileSketch
 from app.parsing.maptrack_csv import ParsedSession, TaskStream
 from app.normalization.nationality import normalize_nationality
 
@@ -31,6 +32,8 @@ SOC_DEMO_KEYS = [
     "ip",
 ]
 
+AGGREGATE_PERCENTILES = (0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+
 def _first_nonempty(raw_row: Optional[Dict[str, Any]], key: str) -> Optional[str]:
     """Return a trimmed string value if present, otherwise None."""
     if not raw_row:
@@ -43,7 +46,7 @@ def _first_nonempty(raw_row: Optional[Dict[str, Any]], key: str) -> Optional[str
 
 def extract_soc_demo(
     *,
-    session: ParsedSession,
+    session: Optional[ParsedSession] = None,
     raw_row: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Optional[str]]:
     """Resolve socio-demographics from parsed session data or fallback CSV row."""
@@ -147,25 +150,99 @@ def compute_all_task_metrics(session: ParsedSession) -> Dict[str, Dict[str, Any]
         out[task_id] = compute_task_metrics(task_stream)
     return out
 
+def _stats_parts(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """(session metrics, task metrics) from a full stats payload or a bare session metrics payload."""
+    session = payload.get("session") if isinstance(payload.get("session"), dict) else payload
+    tasks = payload.get("tasks") if isinstance(payload.get("tasks"), dict) else {}
+    return session, tasks
+
+
+def _aggregate_payload(
+    sessions_count: int,
+    duration_sketch: QuantileSketch,
+    events_sketch: QuantileSketch,
+    task_sketches: Dict[str, QuantileSketch],
+) -> Dict[str, Any]:
+    return {
+        "sessions_count": sessions_count,
+        "avg_duration_ms": int(duration_sketch.sum / duration_sketch.count) if duration_sketch.count else None,
+        "avg_events_total": int(events_sketch.sum / events_sketch.count) if events_sketch.count else None,
+        "duration_ms": duration_sketch.to_dict(),
+        "events_total": events_sketch.to_dict(),
+        "tasks": {
+            task_id: {"duration_ms": sketch.to_dict()}
+            for task_id, sketch in sorted(task_sketches.items())
+        },
+    }
+
+
 def aggregate_sessions(
     sessions: List[Dict[str, Any]],
 ) -> Dict[str, Any]:
-    """Aggregate session metric payloads for experiment-level summaries."""
-    if not sessions:
-        return {
-            "sessions_count": 0,
-            "avg_duration_ms": None,
-            "avg_events_total": None,
-        }
-
-    durations = [s.get("duration_ms") for s in sessions if isinstance(s.get("duration_ms"), int)]
-    events = [s.get("events_total") for s in sessions if isinstance(s.get("events_total"), int)]
+    """Aggregate session metric payloads into mergeable summaries (count / sum / min / max / quantile sketch).
+
+    Accepts full stats payloads ({"session", "tasks", ...}) or bare session metrics payloads.
+    """
+    durations: List[Any] = []
+    events: List[Any] = []
+    task_durations: Dict[str, List[Any]] = {}
+    for payload in sessions:
+        session, tasks = _stats_parts(payload)
+        durations.append(session.get("duration_ms"))
+        events.append(session.get("events_total"))
+        for task_id, metrics in tasks.items():
+            if isinstance(metrics, dict):
+                task_durations.setdefault(str(task_id), []).append(metrics.get("duration_ms"))
+
+    duration_sketch = QuantileSketch.from_values(durations)
+    events_sketch = QuantileSketch.from_values(events)
+    task_sketches = {task_id: QuantileSketch.from_values(values) for task_id, values in task_durations.items()}
+    return _aggregate_payload(len(sessions), duration_sketch, events_sketch, task_sketches)
+
+
+def merge_aggregates(aggregates: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Combine aggregate_sessions payloads of disjoint session sets by merging their sketches."""
+    duration_sketch = QuantileSketch()
+    events_sketch = QuantileSketch()
+    task_sketches: Dict[str, QuantileSketch] = {}
+    sessions_count = 0
+    for aggregate in aggregates:
+        sessions_count += int(aggregate.get("sessions_count") or 0)
+        duration_sketch.merge(QuantileSketch.from_dict(aggregate.get("duration_ms")))
+        events_sketch.merge(QuantileSketch.from_dict(aggregate.get("events_total")))
+        tasks = aggregate.get("tasks") if isinstance(aggregate.get("tasks"), dict) else {}
+        for task_id, metrics in tasks.items():
+            sketch = QuantileSketch.from_dict(metrics.get("duration_ms") if isinstance(metrics, dict) else None)
+            task_sketches.setdefault(str(task_id), QuantileSketch()).merge(sketch)
+
+    return _aggregate_payload(sessions_count, duration_sketch, events_sketch, task_sketches)
+
+
+def _sketch_summary(payload: Any, quantiles: Sequence[float]) -> Dict[str, Any]:
+    sketch = QuantileSketch.from_dict(payload)
+    return {
+        "count": sketch.count,
+        "sum": sketch.sum,
+        "min": sketch.min,
+        "max": sketch.max,
+        "avg": sketch.sum / sketch.count if sketch.count else None,
+        "percentiles": {
+            f"p{round(q * 100, 1):g}": value
+            for q, value in zip(quantiles, sketch.quantiles(quantiles))
+        },
+    }
 
-    avg_duration = int(sum(durations) / len(durations)) if durations else None
-    avg_events = int(sum(events) / len(events)) if events else None
 
+def summarize_aggregate(aggregate: Dict[str, Any], quantiles: Sequence[float] = AGGREGATE_PERCENTILES) -> Dict[str, Any]:
+    """Readable counts / averages / percentiles from an aggregate payload, without the raw sketches."""
+    tasks = aggregate.get("tasks") if isinstance(aggregate.get("tasks"), dict) else {}
     return {
-        "sessions_count": len(sessions),
-        "avg_duration_ms": avg_duration,
-        "avg_events_total": avg_events,
-    }
\ No newline at end of file
+        "sessions_count": int(aggregate.get("sessions_count") or 0),
+        "duration_ms": _sketch_summary(aggregate.get("duration_ms"), quantiles),
+        "events_total": _sketch_summary(aggregate.get("events_total"), quantiles),
+        "tasks": {
+            task_id: {"duration_ms": _sketch_summary(metrics.get("duration_ms"), quantiles)}
+            for task_id, metrics in tasks.items()
+            if isinstance(metrics, dict)
+        },
+    }
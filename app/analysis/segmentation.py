@@ -0,0 +1,98 @@
+"""
+Idle gaps and stationary dwells segmented from a session's time-sorted event rows.
+An idle gap is a pause longer than IDLE_GAP_MS between consecutive events of one task; a dwell is a run of
+map rests (moveend to the next movestart) whose viewport centre and zoom level do not change.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.analysis.kinematics import ZOOM_EVENT_NAMES, haversine_m
+from app.parsing.maptrack_csv import COORDINATE_PATTERN
+
+IDLE_GAP_MS = 10_000
+DWELL_MIN_MS = 3_000
+# Rests whose moveend centres are closer than this count as the same viewport.
+DWELL_RADIUS_M = 5.0
+SEGMENT_NAMES = {"idle": "IDLE", "dwell": "DWELL"}
+
+
+def _empty_segments() -> Dict[str, Any]:
+    return {"idle_gap_ms": IDLE_GAP_MS, "dwell_min_ms": DWELL_MIN_MS, "by_task": {}}
+
+
+def segment_events(events_df: pd.DataFrame, group_col: Optional[str] = None) -> Dict[Any, Any]:
+    """[start, end] idle and dwell intervals per task of a prepare_events_df frame.
+
+    With `group_col` (a multi-user bulk frame sorted by group, then time) the result is keyed by str(group id).
+    """
+    if events_df.empty:
+        return {} if group_col else _empty_segments()
+
+    n = len(events_df)
+    group_codes, group_ids = pd.factorize(events_df[group_col] if group_col else pd.Series(0, index=events_df.index), sort=False)
+    ts = events_df["timestamp"].to_numpy(dtype=np.int64)
+    names = events_df["event_name"].astype(str).to_numpy()
+    task_codes, task_ids = pd.factorize(events_df["task"] if "task" in events_df.columns else pd.Series(None, index=events_df.index))
+
+    # A run is a stretch of consecutive rows of one session in one task; segments never cross runs.
+    run_break = np.ones(n, dtype=bool)
+    run_break[1:] = (group_codes[1:] != group_codes[:-1]) | (task_codes[1:] != task_codes[:-1])
+    run_id = np.cumsum(run_break) - 1
+    run_last_ts = ts[np.r_[np.flatnonzero(run_break)[1:] - 1, n - 1]]
+
+    gaps = np.diff(ts)
+    idle = (run_id[1:] == run_id[:-1]) & (task_codes[:-1] >= 0) & (gaps > IDLE_GAP_MS)
+    idle_rows = np.flatnonzero(idle)
+    idle_start, idle_end, idle_row = ts[idle_rows], ts[idle_rows + 1], idle_rows
+
+    # A rest lasts from a moveend to the next movestart of the same run, or to the run's last event.
+    is_start = names == "movestart"
+    next_start = np.minimum.accumulate(np.where(is_start, np.arange(n), n)[::-1])[::-1]
+    next_start = np.r_[next_start[1:], n]
+    ends = np.flatnonzero((names == "moveend") & (task_codes >= 0))
+    following = next_start[ends]
+    same_run = following < n
+    same_run[same_run] = run_id[following[same_run]] == run_id[ends[same_run]]
+    rest_end = np.where(same_run, ts[np.minimum(following, n - 1)], run_last_ts[run_id[ends]])
+
+    details = events_df["event_detail"] if "event_detail" in events_df.columns else pd.Series(None, index=events_df.index)
+    coords = details.iloc[ends].astype("string").str.extract(COORDINATE_PATTERN).astype(float)
+    lat, lon = coords["lat"].to_numpy(), coords["lon"].to_numpy()
+    zoom_seen = np.cumsum(np.isin(names, ZOOM_EVENT_NAMES))[ends]
+
+    # Consecutive rests stay one dwell while the run, zoom level and centre (within DWELL_RADIUS_M) are unchanged.
+    moved = haversine_m(lat[:-1], lon[:-1], lat[1:], lon[1:])
+    same_view = (run_id[ends][1:] == run_id[ends][:-1]) & (zoom_seen[1:] == zoom_seen[:-1]) & (moved < DWELL_RADIUS_M)
+    dwell_break = np.r_[True, ~same_view] if ends.size else np.zeros(0, dtype=bool)
+    first = np.flatnonzero(dwell_break)
+    last = np.r_[first[1:] - 1, ends.size - 1] if first.size else first
+    dwell_start, dwell_end, dwell_row = ts[ends[first]], rest_end[last], ends[first]
+    long_enough = dwell_end - dwell_start >= DWELL_MIN_MS
+    dwell_start, dwell_end, dwell_row = dwell_start[long_enough], dwell_end[long_enough], dwell_row[long_enough]
+
+    out: Dict[int, Dict[str, Any]] = {}
+    for kind, starts, stops, rows in (("idle", idle_start, idle_end, idle_row), ("dwell", dwell_start, dwell_end, dwell_row)):
+        for start, stop, g, task_code in zip(starts.tolist(), stops.tolist(), group_codes[rows].tolist(), task_codes[rows].tolist()):
+            by_task = out.setdefault(g, _empty_segments())["by_task"]
+            scope = by_task.setdefault(str(task_ids[task_code]), {key: [] for key in SEGMENT_NAMES})
+            scope[kind].append([int(start), int(stop)])
+
+    if group_col is None:
+        return out.get(0) or _empty_segments()
+    return {str(group_id): out.get(g) or _empty_segments() for g, group_id in enumerate(group_ids)}
+
+
+def segment_timeline_items(segments: Any) -> List[Dict[str, Any]]:
+    """Stored segments as IDLE / DWELL interval items, in the shape _build_timeline_items_from_events_df uses."""
+    by_task = segments.get("by_task") if isinstance(segments, dict) and isinstance(segments.get("by_task"), dict) else {}
+    items: List[Dict[str, Any]] = []
+    for task_id, scope in by_task.items():
+        for kind, name in SEGMENT_NAMES.items():
+            for start, end in (scope.get(kind) or []) if isinstance(scope, dict) else []:
+                items.append({"type": "interval", "name": name, "startTs": int(start), "endTs": int(end), "task": str(task_id)})
+    return items
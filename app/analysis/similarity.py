@@ -0,0 +1,182 @@
+"""
+Pairwise trajectory distances (DTW and discrete Fréchet) between sessions' moveend tracks.
+Each pair is projected to metres around its own mean latitude, so its distance does not depend on the other tracks
+requested with it, and fills its cost matrix one anti-diagonal at a time with NumPy.
+Cheap lower bounds prune pairs above a distance threshold before any matrix is filled, and large jobs run on a process pool.
+"""
+
+from __future__ import annotations
+
+import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from app.analysis.kinematics import EARTH_RADIUS_M
+
+ALGORITHMS = ("dtw", "frechet")
+# Below this many pairs the pool start-up costs more than it saves.
+PARALLEL_MIN_PAIRS = 64
+PAIRS_PER_CHUNK = 32
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def project_tracks(tracks: Dict[str, Sequence[Sequence[float]]]) -> Dict[str, np.ndarray]:
+    """[[lat, lon], ...] to equirectangular x/y metres around the tracks' mean latitude."""
+    arrays = {key: np.asarray(points, dtype=float).reshape(-1, 2) for key, points in tracks.items()}
+    lats = np.concatenate([arr[:, 0] for arr in arrays.values()]) if arrays else np.empty(0)
+    ref_lat = math.radians(float(lats.mean())) if lats.size else 0.0
+    scale = np.radians(1.0) * EARTH_RADIUS_M
+    return {
+        key: np.column_stack([arr[:, 1] * scale * math.cos(ref_lat), arr[:, 0] * scale])
+        for key, arr in arrays.items()
+    }
+
+
+def _band_centres(m: int, k: int) -> np.ndarray:
+    return np.rint(np.arange(m) * (k - 1) / max(m - 1, 1)).astype(np.int64)
+
+
+def _band_mask(m: int, k: int, window: Optional[int]) -> Optional[np.ndarray]:
+    """Sakoe-Chiba band around the diagonal, scaled to unequal lengths; None means no band."""
+    if window is None:
+        return None
+    return np.abs(np.arange(k)[None, :] - _band_centres(m, k)[:, None]) <= window
+
+
+def _box_gap(point: np.ndarray, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    return np.linalg.norm(np.maximum(0.0, np.maximum(low - point, point - high)), axis=-1)
+
+
+def lower_bound(a: np.ndarray, b: np.ndarray, algorithm: str, window: Optional[int] = None) -> float:
+    """Never above the true distance: endpoint and bounding-box bounds, plus an LB_Keogh envelope for DTW."""
+    endpoints = (np.linalg.norm(a[0] - b[0]), np.linalg.norm(a[-1] - b[-1]))
+    if algorithm == "frechet":
+        # Every point of a is matched to some point of b, so it is at least its gap to b's bounding box.
+        bbox = float(_box_gap(a, b.min(axis=0), b.max(axis=0)).max())
+        return max(float(max(endpoints)), bbox)
+
+    corner = float(endpoints[0]) if len(a) == 1 and len(b) == 1 else float(sum(endpoints))
+    # Each row i of the warping path visits some column inside its band, so it costs at least the
+    # gap between a[i] and the envelope (bounding box) of b over that band.
+    if window is None:
+        keogh = float(_box_gap(a, b.min(axis=0), b.max(axis=0)).sum())
+    else:
+        width = 2 * window + 1
+        padded_low = np.pad(b, ((window, window), (0, 0)), constant_values=np.inf)
+        padded_high = np.pad(b, ((window, window), (0, 0)), constant_values=-np.inf)
+        centres = _band_centres(len(a), len(b))
+        low = sliding_window_view(padded_low, width, axis=0)[centres].min(axis=-1)
+        high = sliding_window_view(padded_high, width, axis=0)[centres].max(axis=-1)
+        keogh = float(_box_gap(a, low, high).sum())
+    return max(corner, keogh)
+
+
+def trajectory_distance(
+    a: np.ndarray,
+    b: np.ndarray,
+    algorithm: str,
+    window: Optional[int] = None,
+    abandon_above: Optional[float] = None,
+) -> Tuple[Optional[float], float]:
+    """(distance, lower bound); distance is None when every path already exceeds `abandon_above`."""
+    m, k = len(a), len(b)
+    cost = np.linalg.norm(a[:, None, :] - b[None, :, :], axis=-1)
+    band = _band_mask(m, k, window)
+    if band is not None:
+        cost = np.where(band, cost, np.inf)
+
+    # Accumulated cost with a padding row and column, flattened so each anti-diagonal is one gather.
+    stride = k + 1
+    acc = np.full((m + 1) * stride, np.inf)
+    acc[0] = 0.0
+    flat_cost = cost.ravel()
+    previous_min = 0.0
+    for diagonal in range(2, m + k + 1):
+        i = np.arange(max(1, diagonal - k), min(m, diagonal - 1) + 1)
+        cell = i * stride + (diagonal - i)
+        best = np.minimum(np.minimum(acc[cell - stride - 1], acc[cell - stride]), acc[cell - 1])
+        step = flat_cost[cell - stride - i]
+        values = step + best if algorithm == "dtw" else np.maximum(step, best)
+        acc[cell] = values
+        # Paths advance one or two anti-diagonals per step, so they all cross one of the last two.
+        current_min = float(values.min())
+        if abandon_above is not None and min(current_min, previous_min) > abandon_above:
+            return None, min(current_min, previous_min)
+        previous_min = current_min
+
+    distance = float(acc[-1])
+    return (distance, distance) if math.isfinite(distance) else (None, math.inf)
+
+
+def _distance_chunk(
+    pairs: List[Tuple[str, str]],
+    tracks: Dict[str, np.ndarray],
+    algorithm: str,
+    window: Optional[int],
+    max_distance: Optional[float],
+) -> List[Dict[str, Any]]:
+    out: List[Dict[str, Any]] = []
+    for key_a, key_b in pairs:
+        projected = project_tracks({0: tracks[key_a], 1: tracks[key_b]})
+        a, b = projected[0], projected[1]
+        bound = lower_bound(a, b, algorithm, window)
+        if max_distance is not None and bound > max_distance:
+            out.append({"distance": None, "lower_bound": bound})
+            continue
+        distance, bound_after = trajectory_distance(a, b, algorithm, window, max_distance)
+        out.append({"distance": distance, "lower_bound": max(bound, bound_after)})
+    return out
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            # Spawned workers import only the analysis modules, not the web app and its open connections.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def compute_pair_distances(
+    pairs: List[Tuple[str, str]],
+    tracks: Dict[str, Sequence[Sequence[float]]],
+    algorithm: str,
+    *,
+    window: Optional[int] = None,
+    max_distance: Optional[float] = None,
+    workers: int = 1,
+) -> List[Dict[str, Any]]:
+    """{distance, lower_bound} per pair of [[lat, lon], ...] tracks, in order; pruned or abandoned pairs have distance None.
+
+    A reported distance can still exceed max_distance: a pair is only abandoned once a whole anti-diagonal is above it.
+    """
+    tracks = {key: np.asarray(points, dtype=float).reshape(-1, 2) for key, points in tracks.items()}
+    if workers <= 1 or len(pairs) < PARALLEL_MIN_PAIRS:
+        return _distance_chunk(pairs, tracks, algorithm, window, max_distance)
+
+    pool = _get_pool(workers)
+    chunks = [pairs[i:i + PAIRS_PER_CHUNK] for i in range(0, len(pairs), PAIRS_PER_CHUNK)]
+    futures = []
+    for chunk in chunks:
+        chunk_tracks = {key: tracks[key] for pair in chunk for key in pair}
+        futures.append(pool.submit(_distance_chunk, chunk, chunk_tracks, algorithm, window, max_distance))
+    return [result for future in futures for result in future.result()]
@@ -0,0 +1,128 @@
+"""
+Mergeable quantile sketch (a merging t-digest) for metric distributions.
+A sketch keeps count, sum, min, max and a bounded list of weighted centroids, so it can be stored as JSON.
+Sketches of disjoint session sets merge into one with approximately the same quantiles as a sketch of the union.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_COMPRESSION = 100
+
+
+def _k_scale(q: float, compression: float) -> float:
+    # k1 scale function: centroids stay small near the tails and may grow around the median.
+    return compression / (2 * math.pi) * math.asin(2 * min(max(q, 0.0), 1.0) - 1)
+
+
+def _k_scale_inverse(k: float, compression: float) -> float:
+    return (math.sin(min(max(k * 2 * math.pi / compression, -math.pi / 2), math.pi / 2)) + 1) / 2
+
+
+class QuantileSketch:
+    def __init__(self, compression: int = DEFAULT_COMPRESSION) -> None:
+        self.compression = compression
+        self.count = 0
+        self.sum = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+        self.means = np.empty(0, dtype=float)
+        self.weights = np.empty(0, dtype=float)
+
+    @classmethod
+    def from_values(cls, values: Iterable[Any], compression: int = DEFAULT_COMPRESSION) -> "QuantileSketch":
+        sketch = cls(compression)
+        sketch.add(values)
+        return sketch
+
+    def add(self, values: Iterable[Any]) -> None:
+        """Add finite numeric values; None, bools and non-numeric values are skipped."""
+        numbers = [
+            float(value)
+            for value in values
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+        arr = np.asarray(numbers, dtype=float)
+        arr = arr[np.isfinite(arr)]
+        if arr.size == 0:
+            return
+        self._absorb(arr, np.ones(arr.size), int(arr.size), float(arr.sum()), float(arr.min()), float(arr.max()))
+
+    def merge(self, other: "QuantileSketch") -> None:
+        if other.count == 0:
+            return
+        self._absorb(other.means, other.weights, other.count, other.sum, other.min, other.max)
+
+    def _absorb(self, means: np.ndarray, weights: np.ndarray, count: int, total: float, low: float, high: float) -> None:
+        self.count += count
+        self.sum += total
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self._compress(np.concatenate([self.means, means]), np.concatenate([self.weights, weights]))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="stable")
+        means = means[order]
+        weights = weights[order]
+        total_weight = float(weights.sum())
+
+        out_means: List[float] = []
+        out_weights: List[float] = []
+        cur_mean = float(means[0])
+        cur_weight = float(weights[0])
+        seen = 0.0
+        q_limit = _k_scale_inverse(_k_scale(0.0, self.compression) + 1, self.compression)
+        for mean, weight in zip(means[1:].tolist(), weights[1:].tolist()):
+            if (seen + cur_weight + weight) / total_weight <= q_limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+                continue
+            out_means.append(cur_mean)
+            out_weights.append(cur_weight)
+            seen += cur_weight
+            q_limit = _k_scale_inverse(_k_scale(seen / total_weight, self.compression) + 1, self.compression)
+            cur_mean, cur_weight = mean, weight
+        out_means.append(cur_mean)
+        out_weights.append(cur_weight)
+
+        self.means = np.asarray(out_means, dtype=float)
+        self.weights = np.asarray(out_weights, dtype=float)
+
+    def quantiles(self, qs: Sequence[float]) -> List[Optional[float]]:
+        """Interpolated between centroid centres, anchored at the exact min and max."""
+        if self.count == 0:
+            return [None for _ in qs]
+        centres = np.cumsum(self.weights) - self.weights / 2
+        xp = np.concatenate([[0.0], centres, [float(self.weights.sum())]])
+        fp = np.concatenate([[self.min], self.means, [self.max]])
+        targets = np.clip(np.asarray(qs, dtype=float), 0.0, 1.0) * xp[-1]
+        return [float(v) for v in np.interp(targets, xp, fp)]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "compression": self.compression,
+            "centroids": [[m, w] for m, w in zip(self.means.tolist(), self.weights.tolist())],
+        }
+
+    @classmethod
+    def from_dict(cls, payload: Any) -> "QuantileSketch":
+        payload = payload if isinstance(payload, dict) else {}
+        sketch = cls(int(payload.get("compression") or DEFAULT_COMPRESSION))
+        centroids = [c for c in payload.get("centroids") or [] if isinstance(c, (list, tuple)) and len(c) == 2]
+        if not centroids or not payload.get("count"):
+            return sketch
+        sketch.count = int(payload["count"])
+        sketch.sum = float(payload.get("sum") or 0.0)
+        sketch.min = float(payload["min"])
+        sketch.max = float(payload["max"])
+        sketch.means = np.asarray([float(c[0]) for c in centroids], dtype=float)
+        sketch.weights = np.asarray([float(c[1]) for c in centroids], dtype=float)
+        return sketch
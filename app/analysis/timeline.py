@@ -0,0 +1,536 @@
+"""
+Timeline items and interval ratios derived from a session's event rows.
+Raw events are collapsed into MOVE/ZOOM/POPUP/INTRO intervals and instants used by the timeline views;
+IDLE/DWELL intervals come from app.analysis.segmentation. Interval durations per task feed the interval_event_ratios block stored
+in session stats (segments in a block of their own), and a cumulative-duration index per behaviour answers ratio queries for
+arbitrary time windows.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.parsing.maptrack_csv import normalize_task_series
+
+
+def prepare_events_df(df: pd.DataFrame, group_col: Optional[str] = None) -> pd.DataFrame:
+    """Drop rows without a usable timestamp, sort by time and carry the active task forward (within `group_col`)."""
+    df = df[df["timestamp"].notna() & df["event_name"].notna()].copy()
+    if df.empty:
+        return df
+
+    df["timestamp"] = pd.to_numeric(df["timestamp"], errors="coerce")
+    df = df[df["timestamp"].notna()].copy()
+    if df.empty:
+        return df
+
+    df["timestamp"] = df["timestamp"].astype(int)
+    sort_by = [group_col, "timestamp"] if group_col else ["timestamp"]
+    df = df.sort_values(by=sort_by, kind="stable").reset_index(drop=True)
+
+    explicit_tasks = normalize_task_series(df["task"]) if "task" in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+    # A "setting task" row without an explicit task switches to the task named in its detail.
+    if "event_detail" in df.columns:
+        setting_rows = df["event_name"].astype(str).str.strip() == "setting task"
+        detail_tasks = normalize_task_series(df["event_detail"].where(setting_rows))
+    else:
+        detail_tasks = pd.Series(None, index=df.index, dtype=object)
+
+    inferred = explicit_tasks.where(explicit_tasks.notna(), detail_tasks)
+    inferred = inferred.groupby(df[group_col], sort=False).ffill() if group_col else inferred.ffill()
+    df["task"] = inferred.astype(object).where(inferred.notna(), None)
+    return df
+
+
+def _to_text_detail(value: Any) -> Optional[str]:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    text = str(value).strip()
+    if not text:
+        return None
+    if re.match(r"^-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?$", text):
+        return None
+    return text
+
+def _build_timeline_items_from_events_df(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Collapse raw events into instant and interval timeline items."""
+    size = len(df)
+    details = df["event_detail"].tolist() if "event_detail" in df.columns else [None] * size
+    tasks = df["task"].tolist() if "task" in df.columns else [None] * size
+    events = [
+        {
+            "timestamp": int(timestamp),
+            "event_name": str(event_name),
+            "event_detail": detail,
+            "task": None if pd.isna(task) else str(task),
+        }
+        for timestamp, event_name, detail, task in zip(df["timestamp"].tolist(), df["event_name"].tolist(), details, tasks)
+    ]
+
+    items: List[Dict[str, Any]] = []
+    open_move: Optional[Dict[str, Any]] = None
+    open_popup: Optional[Dict[str, Any]] = None
+
+    for event in events:
+        ts = int(event["timestamp"])
+        name = str(event["event_name"])
+        detail = _to_text_detail(event.get("event_detail"))
+        task = event.get("task")
+
+        if name == "movestart":
+            if open_move:
+                items.append({
+                    "type": "interval",
+                    "name": "ZOOM" if open_move.get("hadZoom") else "MOVE",
+                    "startTs": int(open_move["startTs"]),
+                    "endTs": ts,
+                    "task": open_move.get("task") or task,
+                })
+            open_move = {"startTs": ts, "hadZoom": False, "task": task, "details": []}
+            continue
+
+        if name in {"zoom in", "zoom out"}:
+            if open_move:
+                open_move["hadZoom"] = True
+                if not open_move.get("task") and task:
+                    open_move["task"] = task
+                if detail:
+                    open_move["details"].append(f"{name}: {detail}")
+            else:
+                items.append({"type": "instant", "name": name, "ts": ts, "task": task})
+            continue
+
+        if name == "moveend":
+            if open_move:
+                items.append({
+                    "type": "interval",
+                    "name": "ZOOM" if open_move.get("hadZoom") else "MOVE",
+                    "startTs": int(open_move["startTs"]),
+                    "endTs": ts,
+                    "task": open_move.get("task") or task,
+                })
+                open_move = None
+            else:
+                items.append({"type": "instant", "name": name, "ts": ts, "task": task})
+            continue
+
+        if name == "popupopen":
+            if open_popup:
+                items.append({
+                    "type": "interval",
+                    "name": "POPUP",
+                    "startTs": int(open_popup["startTs"]),
+                    "endTs": ts,
+                    "task": open_popup.get("task") or task,
+                })
+            open_popup = {"startTs": ts, "task": task, "details": []}
+            if detail:
+                open_popup["details"].append(f"popupopen: {detail}")
+            continue
+
+        if name == "popupclose":
+            if open_popup:
+                items.append({
+                    "type": "interval",
+                    "name": "POPUP",
+                    "startTs": int(open_popup["startTs"]),
+                    "endTs": ts,
+                    "task": open_popup.get("task") or task,
+                })
+                open_popup = None
+            else:
+                items.append({"type": "instant", "name": name, "ts": ts, "task": task})
+            continue
+        
+        # Close dangling popup interval when task changes mid-popup.
+        if name == "setting task" and open_popup:
+            items.append({
+                "type": "interval",
+                "name": "POPUP",
+                "startTs": int(open_popup["startTs"]),
+                "endTs": ts,
+                "task": open_popup.get("task") or task,
+            })
+            open_popup = None
+
+        if open_popup and not open_popup.get("task") and task:
+            open_popup["task"] = task
+
+        items.append({"type": "instant", "name": name, "ts": ts, "task": task})
+
+    last_ts = int(events[-1]["timestamp"]) if events else 0
+
+    if open_move:
+        items.append({
+            "type": "interval",
+            "name": "ZOOM" if open_move.get("hadZoom") else "MOVE",
+            "startTs": int(open_move["startTs"]),
+            "endTs": last_ts,
+            "task": open_move.get("task"),
+        })
+
+    if open_popup:
+        items.append({
+            "type": "interval",
+            "name": "POPUP",
+            "startTs": int(open_popup["startTs"]),
+            "endTs": last_ts,
+            "task": open_popup.get("task"),
+        })
+
+    first_task_id: Optional[str] = None
+    setting_task_start_by_task: Dict[str, int] = {}
+    question_closed_by_task: Dict[str, int] = {}
+    for event in events:
+        task_raw = event.get("task")
+        task_id = str(task_raw).strip() if task_raw is not None else ""
+        if not task_id:
+            continue
+        if first_task_id is None:
+            first_task_id = task_id
+        event_name = str(event.get("event_name") or "")
+        ts = int(event.get("timestamp", 0))
+        if event_name == "setting task" and task_id not in setting_task_start_by_task:
+            setting_task_start_by_task[task_id] = ts
+        if event_name == "question dialog closed" and task_id not in question_closed_by_task:
+            question_closed_by_task[task_id] = ts
+
+    intro_items: List[Dict[str, Any]] = []
+    for task_id, end_ts in question_closed_by_task.items():
+        if task_id in setting_task_start_by_task:
+            start_ts = setting_task_start_by_task[task_id]
+        elif task_id == first_task_id:
+            start_ts = 0
+        else:
+            continue
+        if end_ts < start_ts:
+            continue
+        intro_items.append({
+            "type": "interval",
+            "name": "INTRO",
+            "startTs": int(start_ts),
+            "endTs": int(end_ts),
+            "task": task_id,
+        })
+
+    if intro_items:
+        intro_items.sort(key=lambda item: (int(item.get("startTs", 0)), int(item.get("endTs", 0))))
+        items = intro_items + items
+
+    items.sort(
+        key=lambda item: (
+            int(item.get("startTs", item.get("ts", 0))),
+            int(item.get("endTs", item.get("ts", 0))),
+            0 if str(item.get("type") or "") == "interval" else 1,
+        )
+    )
+   
+    return items
+
+
+# =========================
+# Interval ratios
+# =========================
+
+INTERVAL_EVENT_NAME_MAP: Dict[str, str] = {
+    "MOVE": "move",
+    "ZOOM": "zoom",
+    "POPUP": "popup",
+}
+# Idle gaps and dwells overlap the behaviours above (a dwell spans a whole map rest), so they are
+# reported apart from them and never compete for dominant_behavior.
+SEGMENT_EVENT_NAME_MAP: Dict[str, str] = {
+    "IDLE": "idle",
+    "DWELL": "dwell",
+}
+
+def _empty_interval_duration_bucket() -> Dict[str, int]:
+    return {event_key: 0 for event_key in INTERVAL_EVENT_NAME_MAP.values()}
+
+def _union_ms(intervals: List[Any]) -> int:
+    covered = 0
+    reach: Optional[int] = None
+    for start, end in sorted(intervals):
+        if reach is not None:
+            start = max(start, reach)
+        if end > start:
+            covered += end - start
+        reach = end if reach is None else max(reach, end)
+    return covered
+
+def _segment_durations(intervals: Dict[str, List[Any]]) -> Dict[str, int]:
+    """Idle time, and dwell time outside idle gaps, so the two never count the same millisecond."""
+    idle = intervals.get("idle") or []
+    idle_ms = _union_ms(idle)
+    return {"idle": idle_ms, "dwell": _union_ms(idle + (intervals.get("dwell") or [])) - idle_ms}
+
+def _segment_ratio_rows(durations: Dict[str, int], total_ms: int) -> Dict[str, Any]:
+    return {
+        segment_key: {
+            "duration_ms": durations.get(segment_key, 0),
+            "ratio": (durations.get(segment_key, 0) / total_ms) if total_ms > 0 else None,
+        }
+        for segment_key in SEGMENT_EVENT_NAME_MAP.values()
+    }
+
+def _compute_dominant_behavior(events: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    dominant_key: Optional[str] = None
+    dominant_duration = -1
+
+    for event_key in INTERVAL_EVENT_NAME_MAP.values():
+        payload = events.get(event_key) if isinstance(events, dict) else {}
+        duration_ms = int(payload.get("duration_ms", 0)) if isinstance(payload, dict) else 0
+        if duration_ms > dominant_duration:
+            dominant_duration = duration_ms
+            dominant_key = event_key
+
+    if dominant_key is None or dominant_duration <= 0:
+        return None
+
+    payload = events.get(dominant_key) if isinstance(events, dict) else {}
+    ratio = payload.get("ratio") if isinstance(payload, dict) else None
+
+    return {
+        "event_key": dominant_key,
+        "label": dominant_key.capitalize(),
+        "duration_ms": dominant_duration,
+        "ratio": ratio,
+    }
+
+def _enrich_interval_ratio_scope(scope_payload: Dict[str, Any]) -> Dict[str, Any]:
+    events_payload = scope_payload.get("events") if isinstance(scope_payload.get("events"), dict) else {}
+    normalized_events: Dict[str, Any] = {}
+
+    for event_key in INTERVAL_EVENT_NAME_MAP.values():
+        event_row = events_payload.get(event_key) if isinstance(events_payload.get(event_key), dict) else {}
+        normalized_events[event_key] = {
+            "duration_ms": int(event_row.get("duration_ms", 0)) if event_row.get("duration_ms") is not None else 0,
+            "ratio": event_row.get("ratio"),
+        }
+
+    out = dict(scope_payload)
+    out["events"] = normalized_events
+    out["dominant_behavior"] = _compute_dominant_behavior(normalized_events)
+    return out
+
+def _normalize_interval_event_ratios_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    by_task_raw = payload.get("by_task") if isinstance(payload.get("by_task"), dict) else {}
+    all_tasks_raw = payload.get("all_tasks") if isinstance(payload.get("all_tasks"), dict) else {}
+
+    by_task: Dict[str, Any] = {}
+    for task_id, scope_payload in by_task_raw.items():
+        if not isinstance(scope_payload, dict):
+            continue
+        by_task[str(task_id)] = _enrich_interval_ratio_scope(scope_payload)
+
+    normalized_all_tasks = _enrich_interval_ratio_scope(all_tasks_raw) if all_tasks_raw else {
+        "task_id": "ALL_TASKS",
+        "task_duration_ms": 0,
+        "events": {
+            event_key: {"duration_ms": 0, "ratio": None}
+            for event_key in INTERVAL_EVENT_NAME_MAP.values()
+        },
+        "dominant_behavior": None,
+        "segments": _segment_ratio_rows({}, 0),
+    }
+
+    return {
+        "event_order": list(INTERVAL_EVENT_NAME_MAP.values()),
+        "segment_order": list(SEGMENT_EVENT_NAME_MAP.values()),
+        "by_task": by_task,
+        "all_tasks": normalized_all_tasks,
+    }
+
+def _compute_interval_event_ratios(
+    timeline_items: List[Dict[str, Any]],
+    task_metrics: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    session_duration_ms = 0
+    for item in timeline_items:
+        if item.get("type") == "interval":
+            end_ts = int(item.get("endTs", item.get("startTs", 0)))
+            session_duration_ms = max(session_duration_ms, end_ts)
+        else:
+            ts = int(item.get("ts", 0))
+            session_duration_ms = max(session_duration_ms, ts)
+
+    by_task_durations: Dict[str, Dict[str, int]] = {
+        str(task_id): _empty_interval_duration_bucket()
+        for task_id in task_metrics.keys()
+    }
+    segment_intervals: Dict[str, Dict[str, List[Any]]] = {}
+
+    for item in timeline_items:
+        if item.get("type") != "interval":
+            continue
+
+        raw_name = str(item.get("name") or "").strip().upper()
+        event_key = INTERVAL_EVENT_NAME_MAP.get(raw_name)
+        segment_key = SEGMENT_EVENT_NAME_MAP.get(raw_name)
+        if not event_key and not segment_key:
+            continue
+
+        task_id = str(item.get("task") or "").strip()
+        if not task_id:
+            continue
+
+        if segment_key:
+            start_ts = int(item.get("startTs", 0))
+            segment_intervals.setdefault(task_id, {}).setdefault(segment_key, []).append(
+                (start_ts, int(item.get("endTs", start_ts)))
+            )
+            continue
+
+        if task_id not in by_task_durations:
+            by_task_durations[task_id] = _empty_interval_duration_bucket()
+
+        start_ts = int(item.get("startTs", 0))
+        end_ts = int(item.get("endTs", start_ts))
+        duration_ms = max(0, end_ts - start_ts)
+        by_task_durations[task_id][event_key] += duration_ms
+
+    by_task: Dict[str, Any] = {}
+    all_tasks_durations = _empty_interval_duration_bucket()
+    all_tasks_segments = {segment_key: 0 for segment_key in SEGMENT_EVENT_NAME_MAP.values()}
+
+    for task_id, metrics in task_metrics.items():
+        task_id_str = str(task_id)
+        task_duration_ms = metrics.get("duration_ms")
+        task_duration_int = int(task_duration_ms) if isinstance(task_duration_ms, int) else 0
+
+        event_rows: Dict[str, Any] = {}
+        durations = by_task_durations.get(task_id_str, _empty_interval_duration_bucket())
+        for event_key, duration_ms in durations.items():
+            all_tasks_durations[event_key] += duration_ms
+            ratio = (duration_ms / task_duration_int) if task_duration_int > 0 else None
+            event_rows[event_key] = {
+                "duration_ms": duration_ms,
+                "ratio": ratio,
+            }
+
+        segment_durations = _segment_durations(segment_intervals.get(task_id_str, {}))
+        for segment_key, duration_ms in segment_durations.items():
+            all_tasks_segments[segment_key] += duration_ms
+
+        by_task[task_id_str] = {
+            "task_id": task_id_str,
+            "task_duration_ms": task_duration_int if task_duration_ms is not None else None,
+            "events": event_rows,
+            "segments": _segment_ratio_rows(segment_durations, task_duration_int),
+        }
+
+    all_tasks_events: Dict[str, Any] = {}
+    for event_key, duration_ms in all_tasks_durations.items():
+        ratio = (duration_ms / session_duration_ms) if session_duration_ms > 0 else None
+        all_tasks_events[event_key] = {
+            "duration_ms": duration_ms,
+            "ratio": ratio,
+        }
+
+    return _normalize_interval_event_ratios_payload({
+        "event_order": list(INTERVAL_EVENT_NAME_MAP.values()),
+        "by_task": by_task,
+        "all_tasks": {
+            "task_id": "ALL_TASKS",
+            "task_duration_ms": session_duration_ms,
+            "events": all_tasks_events,
+            "segments": _segment_ratio_rows(all_tasks_segments, session_duration_ms),
+        },
+    })
+
+
+# =========================
+# Interval index
+# =========================
+
+def _coverage_index(intervals: List[Any]) -> Dict[str, List[int]]:
+    """Sorted breakpoints and the covered milliseconds accumulated up to each of them.
+
+    Overlapping intervals count once per interval, as in _compute_interval_event_ratios, so the
+    covered time between two points is a linear interpolation of `covered` between breakpoints.
+    """
+    if not intervals:
+        return {"bounds": [], "covered": []}
+    starts = np.asarray([start for start, _ in intervals], dtype=np.int64)
+    ends = np.asarray([end for _, end in intervals], dtype=np.int64)
+    bounds, inverse = np.unique(np.concatenate([starts, ends]), return_inverse=True)
+    # Number of open intervals on each [bounds[i], bounds[i + 1]) segment.
+    delta = np.zeros(bounds.size, dtype=np.int64)
+    np.add.at(delta, inverse[: starts.size], 1)
+    np.add.at(delta, inverse[starts.size:], -1)
+    active = np.cumsum(delta)[:-1]
+    covered = np.concatenate([[0], np.cumsum(active * np.diff(bounds))])
+    return {"bounds": bounds.tolist(), "covered": covered.tolist()}
+
+
+def build_interval_index(
+    timeline_items: List[Dict[str, Any]],
+    task_metrics: Dict[str, Dict[str, Any]],
+) -> Dict[str, Any]:
+    """Coverage index per behaviour, for each task in task_metrics and for all of them together."""
+    task_ids = {str(task_id) for task_id in task_metrics.keys()}
+    by_task: Dict[str, Dict[str, List[Any]]] = {
+        task_id: {event_key: [] for event_key in INTERVAL_EVENT_NAME_MAP.values()} for task_id in task_ids
+    }
+    for item in timeline_items:
+        if item.get("type") != "interval":
+            continue
+        event_key = INTERVAL_EVENT_NAME_MAP.get(str(item.get("name") or "").strip().upper())
+        task_id = str(item.get("task") or "").strip()
+        if not event_key or task_id not in by_task:
+            continue
+        start_ts = int(item.get("startTs", 0))
+        end_ts = int(item.get("endTs", start_ts))
+        if end_ts > start_ts:
+            by_task[task_id][event_key].append((start_ts, end_ts))
+
+    return {
+        "event_order": list(INTERVAL_EVENT_NAME_MAP.values()),
+        "by_task": {
+            task_id: {event_key: _coverage_index(intervals) for event_key, intervals in events.items()}
+            for task_id, events in sorted(by_task.items())
+        },
+        "all_tasks": {
+            event_key: _coverage_index([interval for events in by_task.values() for interval in events[event_key]])
+            for event_key in INTERVAL_EVENT_NAME_MAP.values()
+        },
+    }
+
+
+def _covered_until(index: Dict[str, Any], ts: int) -> float:
+    bounds = index.get("bounds") or []
+    if not bounds:
+        return 0.0
+    return float(np.interp(ts, bounds, index.get("covered") or []))
+
+
+def interval_ratios_for_window(
+    interval_index: Dict[str, Any],
+    t0: int,
+    t1: int,
+    task_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Covered milliseconds and ratio per behaviour inside [t0, t1], two binary searches per behaviour."""
+    scope = interval_index.get("by_task", {}).get(task_id) if task_id else interval_index.get("all_tasks")
+    scope = scope if isinstance(scope, dict) else {}
+    window_ms = max(0, t1 - t0)
+
+    events: Dict[str, Any] = {}
+    for event_key in INTERVAL_EVENT_NAME_MAP.values():
+        index = scope.get(event_key) if isinstance(scope.get(event_key), dict) else {}
+        duration_ms = int(round(_covered_until(index, t1) - _covered_until(index, t0))) if window_ms else 0
+        events[event_key] = {
+            "duration_ms": duration_ms,
+            "ratio": (duration_ms / window_ms) if window_ms > 0 else None,
+        }
+
+    return _enrich_interval_ratio_scope({
+        "task_id": task_id or "ALL_TASKS",
+        "window": {"t0": t0, "t1": t1, "duration_ms": window_ms},
+        "events": events,
+    })
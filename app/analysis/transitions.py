@@ -0,0 +1,106 @@
+"""
+First-order transition counts between consecutive interaction events of a session.
+Event names are encoded to integer codes and pairs counted with np.bincount, per task and for the whole session.
+Sessions store sparse [from, to, count] triplets over their own vocabulary; group and test matrices are sums of those.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _sparse_counts(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct keys and how often each occurs; the keys are compacted first so bincount stays small."""
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    return unique_keys, np.bincount(inverse, minlength=unique_keys.size)
+
+
+def session_transitions(
+    timestamp_ms: pd.Series,
+    event_name: pd.Series,
+    task: pd.Series,
+    group: Optional[pd.Series] = None,
+) -> Dict[Any, Any]:
+    """Sparse transition counts of time-ordered events, within each task and across the whole session.
+
+    With `group` (a multi-user bulk frame) every group is a session and the result is keyed by str(group id).
+    """
+    group_codes, group_ids = pd.factorize(group if group is not None else pd.Series(0, index=timestamp_ms.index), sort=False)
+    order = np.lexsort((timestamp_ms.to_numpy(), group_codes))
+    group_codes = group_codes[order].astype(np.int64)
+    codes, events = pd.factorize(event_name.to_numpy()[order], sort=True)
+    task_codes, task_ids = pd.factorize(task.to_numpy()[order], sort=False)
+    n_events, n_tasks = max(len(events), 1), max(len(task_ids), 1)
+
+    # Each session keeps its own sorted vocabulary; `present` lists (group, event) pairs in group order.
+    present = np.unique(group_codes * n_events + codes)
+    present_group = present // n_events
+    group_start = np.searchsorted(present_group, np.arange(len(group_ids)))
+
+    def local(group_of: np.ndarray, code: np.ndarray) -> np.ndarray:
+        return np.searchsorted(present, group_of * n_events + code) - group_start[group_of]
+
+    same_group = group_codes[:-1] == group_codes[1:]
+    pair_group = group_codes[1:][same_group]
+    from_local = local(pair_group, codes[:-1][same_group])
+    to_local = local(pair_group, codes[1:][same_group])
+    # A task transition needs both events in the same (known) task.
+    task_from, task_to = task_codes[:-1][same_group], task_codes[1:][same_group]
+    in_task = (task_from == task_to) & (task_to >= 0)
+
+    vocabularies = np.split(present % n_events, group_start[1:])
+    out: Dict[int, Dict[str, Any]] = {
+        g: {"events": [str(events[c]) for c in vocabulary], "by_task": {}, "all_tasks": []}
+        for g, vocabulary in enumerate(vocabularies)
+    }
+
+    all_keys, all_counts = _sparse_counts((pair_group * n_events + from_local) * n_events + to_local)
+    for key, count in zip(all_keys.tolist(), all_counts.tolist()):
+        g, rest = divmod(key, n_events * n_events)
+        out[g]["all_tasks"].append([rest // n_events, rest % n_events, count])
+
+    task_keys, task_counts = _sparse_counts(
+        ((pair_group[in_task] * n_tasks + task_to[in_task]) * n_events + from_local[in_task]) * n_events + to_local[in_task]
+    )
+    for key, count in zip(task_keys.tolist(), task_counts.tolist()):
+        scope, rest = divmod(key, n_events * n_events)
+        g, task_code = divmod(scope, n_tasks)
+        out[g]["by_task"].setdefault(str(task_ids[task_code]), []).append([rest // n_events, rest % n_events, count])
+
+    if group is None:
+        return out.get(0) or {"events": [], "by_task": {}, "all_tasks": []}
+    return {str(group_ids[g]): payload for g, payload in out.items()}
+
+
+def sum_transitions(payloads: Iterable[Any], task_id: Optional[str] = None) -> Dict[str, Any]:
+    """Dense matrix over the union of event names, summing each session's stored triplets."""
+    scoped = []
+    for payload in payloads:
+        if not isinstance(payload, dict):
+            continue
+        triplets = (payload.get("by_task") or {}).get(task_id) if task_id else payload.get("all_tasks")
+        if triplets:
+            scoped.append((payload.get("events") or [], triplets))
+
+    events = sorted({str(name) for names, _ in scoped for name in names})
+    index = {name: i for i, name in enumerate(events)}
+    matrix = np.zeros((len(events), len(events)), dtype=np.int64)
+    for names, triplets in scoped:
+        arr = np.asarray(triplets, dtype=np.int64).reshape(-1, 3)
+        local_to_global = np.asarray([index[str(name)] for name in names], dtype=np.int64)
+        np.add.at(matrix, (local_to_global[arr[:, 0]], local_to_global[arr[:, 1]]), arr[:, 2])
+
+    row_totals = matrix.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        probabilities = np.where(row_totals[:, None] > 0, matrix / row_totals[:, None], 0.0)
+    return {
+        "task_id": task_id,
+        "sessions_count": len(scoped),
+        "events": events,
+        "counts": matrix.tolist(),
+        "probabilities": probabilities.tolist(),
+        "total": int(matrix.sum()),
+    }
@@ -0,0 +1,342 @@
+"""
+Async read path over the same tables as app.storage.
+Read-heavy API routes await these queries on the event loop instead of holding a threadpool worker.
+Schema bootstrapping and all writes stay in app.storage; this module only mirrors its read functions.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import selectinload
+
+from app.config import STORAGE_SHARDING
+from app.storage import (
+    DATABASE_URL,
+    GroupRecord,
+    GroupRouteRecord,
+    GroupSessionRecord,
+    MetricAggregateRecord,
+    SessionData,
+    SessionRecord,
+    SessionRouteRecord,
+    TestAnswerRecord,
+    TestRecord,
+    shard_path_for_test,
+    _build_pool_kwargs,
+    _group_payload_from_row,
+    _group_version_token,
+    _normalize_session_ids,
+    _normalize_test_id,
+    _answer_evals_query,
+    _answers_eval_by_session,
+    _expected_answers_query,
+    _group_wordcloud_query,
+    _session_data_from_row,
+    _session_factory_for_test,
+    _test_payload_from_row,
+    _test_version_token,
+)
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgres": "postgresql+asyncpg",
+}
+
+
+def _build_async_database_url(url: str) -> str:
+    """Swap the sync driver for its asyncio counterpart (aiosqlite / asyncpg)."""
+    scheme, sep, rest = url.partition("://")
+    if not sep:
+        return url
+    backend = scheme.split("+", 1)[0]
+    async_scheme = _ASYNC_DRIVERS.get(backend)
+    if not async_scheme:
+        return url
+    return f"{async_scheme}://{rest}"
+
+
+def _create_async_engine(database_url: str) -> AsyncEngine:
+    created = create_async_engine(database_url, **_build_pool_kwargs(database_url))
+    if database_url.startswith("sqlite"):
+        @event.listens_for(created.sync_engine, "connect")
+        def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:  # type: ignore[no-untyped-def]
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA foreign_keys=ON")
+            cursor.close()
+    return created
+
+
+ASYNC_DATABASE_URL = _build_async_database_url(DATABASE_URL)
+
+async_engine: AsyncEngine = _create_async_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+_async_shard_factories: Dict[str, async_sessionmaker] = {}
+
+
+async def _session_factory_for_test_async(test_id: str) -> async_sessionmaker:
+    if not STORAGE_SHARDING:
+        return AsyncSessionLocal
+
+    normalized_test_id = _normalize_test_id(test_id)
+    factory = _async_shard_factories.get(normalized_test_id)
+    if factory is not None:
+        return factory
+
+    # The sync side creates and migrates the shard file once per process.
+    await asyncio.to_thread(_session_factory_for_test, normalized_test_id)
+    factory = _async_shard_factories.get(normalized_test_id)
+    if factory is None:
+        shard_engine = _create_async_engine(f"sqlite+aiosqlite:///{shard_path_for_test(normalized_test_id)}")
+        factory = async_sessionmaker(bind=shard_engine, autoflush=False, expire_on_commit=False)
+        _async_shard_factories[normalized_test_id] = factory
+    return factory
+
+
+async def _session_factories_for_read_async(
+    test_id: Optional[str] = None,
+    session_ids: Optional[List[str]] = None,
+) -> List[async_sessionmaker]:
+    if not STORAGE_SHARDING:
+        return [AsyncSessionLocal]
+    if isinstance(test_id, str) and test_id.strip():
+        return [await _session_factory_for_test_async(test_id)]
+
+    async with AsyncSessionLocal() as db:
+        if session_ids:
+            stmt = select(SessionRouteRecord.test_id).where(SessionRouteRecord.session_id.in_(session_ids)).distinct()
+        else:
+            stmt = select(TestRecord.id)
+        test_ids = sorted((await db.execute(stmt)).scalars().all())
+    return [await _session_factory_for_test_async(tid) for tid in test_ids]
+
+
+async def _session_data_with_answers_eval(db: AsyncSession, rows: List[SessionRecord], session_filter: Any) -> List[SessionData]:
+    if not rows:
+        return []
+    evals = _answers_eval_by_session(
+        rows,
+        (await db.execute(_answer_evals_query(session_filter))).all(),
+        (await db.execute(_expected_answers_query(sorted({row.test_id for row in rows})))).all(),
+    )
+    return [_session_data_from_row(row, evals[row.session_id]) for row in rows]
+
+
+async def _group_ids_by_factory_async(group_ids: List[str]) -> Dict[async_sessionmaker, List[str]]:
+    """Requested group ids grouped by the database holding them; unrouted groups are dropped when sharding."""
+    normalized_ids = list(dict.fromkeys(str(gid).strip() for gid in group_ids if str(gid or "").strip()))
+    if not normalized_ids:
+        return {}
+    if not STORAGE_SHARDING:
+        return {AsyncSessionLocal: normalized_ids}
+
+    async with AsyncSessionLocal() as db:
+        routes = (
+            await db.execute(select(GroupRouteRecord).where(GroupRouteRecord.group_id.in_(normalized_ids)))
+        ).scalars().all()
+    ids_by_factory: Dict[async_sessionmaker, List[str]] = {}
+    for route in routes:
+        ids_by_factory.setdefault(await _session_factory_for_test_async(route.test_id), []).append(route.group_id)
+    return ids_by_factory
+
+
+class AsyncDatabaseStore:
+    async def get(self, session_id: str) -> Optional[SessionData]:
+        for factory in await _session_factories_for_read_async(session_ids=[session_id]):
+            async with factory() as db:
+                row = await db.get(SessionRecord, session_id)
+                if row:
+                    return (await _session_data_with_answers_eval(db, [row], [session_id]))[0]
+        return None
+
+    async def list_sessions(
+        self,
+        *,
+        test_id: Optional[str] = None,
+        session_ids: Optional[List[str]] = None,
+    ) -> Dict[str, SessionData]:
+        stmt = select(SessionRecord)
+
+        if isinstance(test_id, str) and test_id.strip():
+            stmt = stmt.where(SessionRecord.test_id == _normalize_test_id(test_id))
+
+        normalized_ids = _normalize_session_ids(session_ids or [])
+        if session_ids is not None and not normalized_ids:
+            return {}
+        if normalized_ids:
+            stmt = stmt.where(SessionRecord.session_id.in_(normalized_ids))
+        stmt = stmt.order_by(SessionRecord.test_id.asc(), SessionRecord.session_id.asc())
+
+        session_filter = stmt.with_only_columns(SessionRecord.session_id).order_by(None)
+        factories = await _session_factories_for_read_async(test_id=test_id, session_ids=normalized_ids)
+        sessions: List[SessionData] = []
+        for factory in factories:
+            async with factory() as db:
+                rows = (await db.execute(stmt)).scalars().all()
+                sessions.extend(await _session_data_with_answers_eval(db, rows, session_filter))
+        if len(factories) > 1:
+            sessions.sort(key=lambda session: (session.test_id, session.session_id))
+        return {session.session_id: session for session in sessions}
+
+    async def list_session_transitions(
+        self,
+        *,
+        test_id: Optional[str] = None,
+        session_ids: Optional[List[str]] = None,
+    ) -> List[Any]:
+        """stats["transitions"] of the selected sessions, read as one JSON path instead of the whole stats."""
+        stmt = select(SessionRecord.stats["transitions"])
+        if isinstance(test_id, str) and test_id.strip():
+            stmt = stmt.where(SessionRecord.test_id == _normalize_test_id(test_id))
+        normalized_ids = _normalize_session_ids(session_ids or [])
+        if session_ids is not None and not normalized_ids:
+            return []
+        if normalized_ids:
+            stmt = stmt.where(SessionRecord.session_id.in_(normalized_ids))
+
+        out: List[Any] = []
+        for factory in await _session_factories_for_read_async(test_id=test_id, session_ids=normalized_ids):
+            async with factory() as db:
+                out.extend((await db.execute(stmt)).scalars().all())
+        return out
+
+    async def get_test_answers(self, test_id: str) -> Dict[str, str]:
+        normalized_test_id = _normalize_test_id(test_id)
+        async with (await _session_factory_for_test_async(normalized_test_id))() as db:
+            rows = (
+                await db.execute(select(TestAnswerRecord).where(TestAnswerRecord.test_id == normalized_test_id))
+            ).scalars().all()
+            return {row.task_id: row.answer for row in rows}
+
+    async def list_groups(self, test_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        stmt = select(GroupRecord).options(selectinload(GroupRecord.session_links))
+        if isinstance(test_id, str) and test_id.strip():
+            stmt = stmt.where(GroupRecord.test_id == test_id.strip())
+        stmt = stmt.order_by(GroupRecord.name.asc(), GroupRecord.id.asc())
+
+        factories = await _session_factories_for_read_async(test_id=test_id)
+        out: List[Dict[str, Any]] = []
+        for factory in factories:
+            async with factory() as db:
+                out.extend(_group_payload_from_row(group) for group in (await db.execute(stmt)).scalars().all())
+        if len(factories) > 1:
+            out.sort(key=lambda group: (group["name"], group["id"]))
+        return out
+
+    async def get_group(self, group_id: str) -> Optional[Dict[str, Any]]:
+        normalized_group_id = str(group_id or "").strip()
+        if not normalized_group_id:
+            return None
+
+        factory = AsyncSessionLocal
+        if STORAGE_SHARDING:
+            async with AsyncSessionLocal() as db:
+                route = await db.get(GroupRouteRecord, normalized_group_id)
+            if not route:
+                return None
+            factory = await _session_factory_for_test_async(route.test_id)
+
+        async with factory() as db:
+            group = (
+                await db.execute(
+                    select(GroupRecord)
+                    .options(selectinload(GroupRecord.session_links))
+                    .where(GroupRecord.id == normalized_group_id)
+                )
+            ).scalar_one_or_none()
+            return _group_payload_from_row(group) if group else None
+
+    async def get_group_versions(self, group_ids: List[str]) -> Dict[str, str]:
+        """Version token per existing group, from membership_version and member sessions' data_version."""
+        ids_by_factory = await _group_ids_by_factory_async(group_ids)
+        out: Dict[str, str] = {}
+        for factory, ids in ids_by_factory.items():
+            async with factory() as db:
+                groups = (
+                    await db.execute(
+                        select(GroupRecord.id, GroupRecord.test_id, GroupRecord.membership_version).where(GroupRecord.id.in_(ids))
+                    )
+                ).all()
+                member_rows = (
+                    await db.execute(
+                        select(GroupSessionRecord.group_id, SessionRecord.session_id, SessionRecord.data_version)
+                        .join(SessionRecord, SessionRecord.session_id == GroupSessionRecord.session_id)
+                        .where(GroupSessionRecord.group_id.in_(ids))
+                    )
+                ).all()
+            members: Dict[str, List[Any]] = {}
+            for group_id, session_id, data_version in member_rows:
+                members.setdefault(group_id, []).append((session_id, data_version))
+            for group_id, test_id, membership_version in groups:
+                out[group_id] = _group_version_token(test_id, membership_version, members.get(group_id, []))
+        return out
+
+    async def get_group_wordclouds(
+        self,
+        group_ids: List[str],
+        *,
+        task_id: Optional[str] = None,
+        limit: int = 80,
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Top `limit` answers with counts per existing group, counted over the members' stored answers.
+
+        Spellings with the same fold_text form count as one word, labelled with the most frequent spelling.
+        """
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for factory, ids in (await _group_ids_by_factory_async(group_ids)).items():
+            async with factory() as db:
+                existing = (await db.execute(select(GroupRecord.id).where(GroupRecord.id.in_(ids)))).scalars().all()
+                for group_id in existing:
+                    rows = (await db.execute(_group_wordcloud_query(group_id, task_id, limit))).all()
+                    out[group_id] = [{"text": text, "count": int(count)} for text, count in rows]
+        return out
+
+    async def get_test_version(self, test_id: str) -> str:
+        """Version token over the test's sessions and their data_version."""
+        normalized_test_id = _normalize_test_id(test_id)
+        factory = await _session_factory_for_test_async(normalized_test_id)
+        async with factory() as db:
+            members = (
+                await db.execute(
+                    select(SessionRecord.session_id, SessionRecord.data_version)
+                    .where(SessionRecord.test_id == normalized_test_id)
+                )
+            ).all()
+        return _test_version_token(normalized_test_id, members)
+
+    async def get_metric_aggregate(self, test_id: str, scope: str, scope_id: str) -> Optional[Dict[str, Any]]:
+        """Stored aggregate with its version, read from the database holding the test."""
+        factory = await _session_factory_for_test_async(_normalize_test_id(test_id))
+        async with factory() as db:
+            row = await db.get(MetricAggregateRecord, (scope, scope_id))
+            if row is None:
+                return None
+            return {"version": row.version, "payload": row.payload if isinstance(row.payload, dict) else {}}
+
+    async def list_tests(self) -> List[Dict[str, Optional[str]]]:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(select(TestRecord).order_by(TestRecord.id.asc()))).scalars().all()
+            return [_test_payload_from_row(row) for row in rows]
+
+    async def get_test_settings(self, test_id: str) -> Dict[str, Optional[str]]:
+        normalized_test_id = _normalize_test_id(test_id)
+        async with AsyncSessionLocal() as db:
+            row = await db.get(TestRecord, normalized_test_id)
+            return {
+                "name": row.name if row else None,
+                "note": row.note if row else None,
+            }
+
+    async def drop_shard(self, test_id: str) -> None:
+        """Close the async engine of a deleted test's shard so a recreated test opens its new file."""
+        factory = _async_shard_factories.pop(_normalize_test_id(test_id), None)
+        if factory is not None:
+            await factory.kw["bind"].dispose()
+
+
+ASYNC_STORE = AsyncDatabaseStore()
@@ -0,0 +1,53 @@
+"""
+In-process memo for derived payloads keyed by the version of the data they were built from.
+A hit requires the stored version to equal the caller's current one, so any write to the source data invalidates it.
+Entries are bounded LRU and idle ones are dropped by the compaction worker.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional, Tuple
+
+
+class VersionedCache:
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[str, Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] != version:
+                del self._entries[key]
+                return None
+            self._entries[key] = (entry[0], entry[1], time.time())
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: Hashable, version: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (version, value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def prune_idle(self, max_idle_seconds: float) -> int:
+        """Drop entries not read or written within max_idle_seconds; returns how many were removed."""
+        cutoff = time.time() - max_idle_seconds
+        with self._lock:
+            stale = [key for key, (_, _, used_at) in self._entries.items() if used_at < cutoff]
+            for key in stale:
+                del self._entries[key]
+            return len(stale)
+
+    def clear(self) -> int:
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
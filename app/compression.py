@@ -0,0 +1,61 @@
+"""
+Compressed at-rest storage for uploaded session CSV files.
+Uploads are written zstd- or gzip-compressed and named with the codec suffix (.csv.zst / .csv.gz).
+pandas infers the codec from that suffix, so every reader decompresses as a stream without extra code.
+"""
+
+from __future__ import annotations
+
+import gzip
+import logging
+from pathlib import Path
+from typing import BinaryIO
+
+from app.config import UPLOAD_COMPRESSION, UPLOAD_COMPRESSION_LEVEL
+
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover
+    zstandard = None  # type: ignore
+
+logger = logging.getLogger(__name__)
+
+_SUFFIXES = {
+    "zstd": ".csv.zst",
+    "gzip": ".csv.gz",
+    "none": ".csv",
+}
+
+
+def _resolve_codec(requested: str) -> str:
+    if requested == "zstd" and zstandard is None:
+        logger.warning("zstandard is not installed, storing uploads gzip-compressed instead")
+        return "gzip"
+    return requested
+
+
+UPLOAD_CODEC = _resolve_codec(UPLOAD_COMPRESSION)
+UPLOAD_FILE_SUFFIX = _SUFFIXES[UPLOAD_CODEC]
+
+
+def upload_file_path(directory: Path, stem: str) -> Path:
+    return directory / f"{stem}{UPLOAD_FILE_SUFFIX}"
+
+
+def upload_file_stem(path: Path) -> str:
+    """File name without the .csv / .csv.gz / .csv.zst suffix."""
+    name = path.name
+    for suffix in _SUFFIXES.values():
+        if name.endswith(suffix):
+            return name[: -len(suffix)]
+    return path.stem
+
+
+def open_upload_writer(path: Path) -> BinaryIO:
+    """Binary writer that compresses with the configured codec."""
+    if UPLOAD_CODEC == "zstd":
+        cctx = zstandard.ZstdCompressor(level=UPLOAD_COMPRESSION_LEVEL)
+        return zstandard.open(path, "wb", cctx=cctx)  # type: ignore[return-value]
+    if UPLOAD_CODEC == "gzip":
+        return gzip.open(path, "wb", compresslevel=min(UPLOAD_COMPRESSION_LEVEL, 9))  # type: ignore[return-value]
+    return path.open("wb")
@@ -43,6 +43,18 @@ def _get_positive_int_env(name: str, default: int) -> int:
         raise RuntimeError(f"Environment variable {name} must be greater than 0.")
     return value
 
+def _get_percent_env(name: str, default: float) -> float:
+    raw = (os.getenv(name) or "").strip()
+    if not raw:
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:
+        raise RuntimeError(f"Environment variable {name} must be a number.") from exc
+    if not 0 < value <= 100:
+        raise RuntimeError(f"Environment variable {name} must be greater than 0 and at most 100.")
+    return value
+
 def _get_bool_env(name: str, default: bool) -> bool:
     raw = (os.getenv(name) or "").strip().lower()
     if not raw:
@@ -53,10 +65,22 @@ def _get_bool_env(name: str, default: bool) -> bool:
         return False
     raise RuntimeError(f"Environment variable {name} must be a boolean.")
 
+def _get_choice_env(name: str, default: str, choices: set[str]) -> str:
+    raw = (os.getenv(name) or "").strip().lower()
+    if not raw:
+        return default
+    if raw not in choices:
+        raise RuntimeError(f"Environment variable {name} must be one of: {', '.join(sorted(choices))}.")
+    return raw
+
 
 DATA_DIR = _resolve_path(os.getenv("APP_DATA_DIR"), default=BASE_DIR / "data")
 DB_PATH = _resolve_path(os.getenv("DB_PATH"), default=DATA_DIR / "app.db")
 UPLOAD_DIR = _resolve_path(os.getenv("UPLOAD_DIR"), default=DATA_DIR / "uploads")
+SHARD_DIR = _resolve_path(os.getenv("SHARD_DIR"), default=DATA_DIR / "shards")
+
+# One SQLite file per user experiment, with app.db kept as the catalog of tests.
+STORAGE_SHARDING = _get_bool_env("APP_STORAGE_SHARDING", False)
 
 LOGIN_PASSWORD = _get_required_env("APP_LOGIN_PASSWORD")
 SESSION_SECRET = _get_required_env("APP_SESSION_SECRET")
@@ -64,5 +88,41 @@ SESSION_DURATION_HOURS = _get_positive_int_env("APP_SESSION_HOURS", 2)
 SESSION_DURATION_SECONDS = SESSION_DURATION_HOURS * 60 * 60
 SESSION_COOKIE_SECURE = _get_bool_env("APP_SESSION_SECURE", False)
 
+# Codec for uploaded session CSVs at rest; zstd falls back to gzip when zstandard is missing.
+UPLOAD_COMPRESSION = _get_choice_env("APP_UPLOAD_COMPRESSION", "zstd", {"zstd", "gzip", "none"})
+UPLOAD_COMPRESSION_LEVEL = _get_positive_int_env("APP_UPLOAD_COMPRESSION_LEVEL", 6)
+
+# Background compaction of orphaned uploads and database free pages.
+COMPACTION_ENABLED = _get_bool_env("APP_COMPACTION_ENABLED", True)
+COMPACTION_INTERVAL_MINUTES = _get_positive_int_env("APP_COMPACTION_INTERVAL_MINUTES", 360)
+UPLOAD_GC_GRACE_MINUTES = _get_positive_int_env("APP_UPLOAD_GC_GRACE_MINUTES", 60)
+
+# Background recomputation of sessions whose stats predate the current metric plugin versions.
+METRICS_SWEEP_ENABLED = _get_bool_env("APP_METRICS_SWEEP_ENABLED", True)
+METRICS_SWEEP_INTERVAL_MINUTES = _get_positive_int_env("APP_METRICS_SWEEP_INTERVAL_MINUTES", 30)
+METRICS_SWEEP_BATCH_SIZE = _get_positive_int_env("APP_METRICS_SWEEP_BATCH_SIZE", 50)
+
+# In-process memo of /api/groups/compare payloads, keyed by group and data versions.
+GROUP_COMPARE_CACHE_SIZE = _get_positive_int_env("APP_GROUP_COMPARE_CACHE_SIZE", 64)
+
+# In-process memo of /api/groups/{id}/answers payloads, keyed by group, member and answer-key versions.
+GROUP_ANSWERS_CACHE_SIZE = _get_positive_int_env("APP_GROUP_ANSWERS_CACHE_SIZE", 128)
+
+# Bootstrap resamples behind the confidence intervals of /api/groups/compare; requests may override it.
+COMPARE_BOOTSTRAP_RESAMPLES = _get_positive_int_env("APP_COMPARE_BOOTSTRAP_RESAMPLES", 2000)
+
+# Trajectory similarity: worker processes for large groups and memoized pair distances.
+SIMILARITY_WORKERS = _get_positive_int_env("APP_SIMILARITY_WORKERS", os.cpu_count() or 1)
+SIMILARITY_CACHE_SIZE = _get_positive_int_env("APP_SIMILARITY_CACHE_SIZE", 20000)
+
+# Fuzzy similarity (0-100) an answer needs to count as correct; 100 accepts only answers equal after folding.
+ANSWER_MATCH_THRESHOLD = _get_percent_env("APP_ANSWER_MATCH_THRESHOLD", 100.0)
+
+# Connection pool settings, only used for server databases (DATABASE_URL=postgresql://...).
+DB_POOL_SIZE = _get_positive_int_env("DB_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = _get_positive_int_env("DB_MAX_OVERFLOW", 20)
+DB_POOL_TIMEOUT_SECONDS = _get_positive_int_env("DB_POOL_TIMEOUT_SECONDS", 30)
+DB_POOL_RECYCLE_SECONDS = _get_positive_int_env("DB_POOL_RECYCLE_SECONDS", 1800)
+
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
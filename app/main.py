@@ -12,13 +12,14 @@ from fastapi.responses import FileResponse, Response, JSONResponse, RedirectResp
 from fastapi.staticfiles import StaticFiles
 from fastapi import Body
 
+from contextlib import asynccontextmanager
+from dataclasses import replace
 from pathlib import Path
+import asyncio
 import re
 import threading
-import unicodedata
-from collections import Counter
 from io import StringIO, BytesIO
-import shutil
+import os
 import time
 import hmac
 import hashlib
@@ -26,13 +27,14 @@ import base64
 import json
 import zipfile
 import logging
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from uuid import uuid4
 
 import csv
 import pandas as pd
 
 from app.storage import STORE, SessionData
+from app.async_storage import ASYNC_STORE
 from app.config import (
     WEB_DIR,
     UPLOAD_DIR,
@@ -41,39 +43,107 @@ from app.config import (
     SESSION_DURATION_HOURS,
     SESSION_DURATION_SECONDS,
     SESSION_COOKIE_SECURE,
+    COMPACTION_ENABLED,
+    COMPACTION_INTERVAL_MINUTES,
+    GROUP_COMPARE_CACHE_SIZE,
+    GROUP_ANSWERS_CACHE_SIZE,
+    COMPARE_BOOTSTRAP_RESAMPLES,
+    METRICS_SWEEP_ENABLED,
+    SIMILARITY_CACHE_SIZE,
+    SIMILARITY_WORKERS,
+    ANSWER_MATCH_THRESHOLD,
 )
 from app.storage import get_test_answers, set_test_answer, list_test_tasks, set_test_answers_bulk
 from app.storage import list_groups, upsert_group, delete_sessions, delete_all_sessions_for_test
-from app.storage import get_test_settings, update_test_settings, delete_test, update_group_settings, delete_group
+from app.storage import update_test_settings, delete_test, update_group_settings, delete_group
 from app.storage import list_tests, create_test
+from app.storage import get_upload_ingest, record_upload_ingest, prune_upload_ingests
+from app.storage import search_documents, put_metric_aggregate, rescore_answer_evals
 from app.parsing.maptrack_csv import (
-    parse_session,
-    parse_session_df,
-    list_task_ids,
-    ParsedSession,
     get_user_id_column,
     infer_session_id_from_filename,
     validate_maptrack_df,
     build_spatial_trace_for_user,
-    _normalize_task_id,
 )
 from app.parsing.column_aliases import SOC_DEMO_COLUMN_ALIASES, resolve_column_aliases, resolve_single_column
-from app.analysis.metrics import (
-    compute_session_metrics,
-    compute_all_task_metrics,
-    SOC_DEMO_KEYS,
+from app.analysis.metrics import SOC_DEMO_KEYS, aggregate_sessions, merge_aggregates, summarize_aggregate
+from app.analysis.engine import (
+    compute_session_stats,
+    iter_session_frames,
+    load_session_frame,
+    metrics_version,
+    stale_metric_plugins,
 )
-from app.normalization.nationality import normalize_nationality
+from app.analysis.answers import (
+    AnswerScorer,
+    answers_eval_payload,
+    build_answers_eval,
+    expected_answer_count,
+    prepare_sessions,
+    session_answers,
+)
+from app.analysis.bootstrap import DEFAULT_CONFIDENCE
+from app.analysis.group_stats import build_group_compare, build_group_stats
+from app.analysis.transitions import sum_transitions
+from app.analysis.segmentation import segment_events, segment_timeline_items
+from app.analysis.similarity import ALGORITHMS, compute_pair_distances, shutdown_pool
+from app.analysis.timeline import (
+    _build_timeline_items_from_events_df,
+    _normalize_interval_event_ratios_payload,
+    interval_ratios_for_window,
+    prepare_events_df,
+)
+from app.maintenance import CompactionWorker, register_compaction_hook
+from app.normalization.nationality import normalize_nationalities
+from app.normalization.text import fold_text
+from app.compression import open_upload_writer, upload_file_path, upload_file_stem
+from app.cache import VersionedCache
+from app.metrics_refresh import MetricsSweeper
+
+UPLOAD_JOBS: Dict[str, Dict[str, Any]] = {}
+UPLOAD_JOBS_LOCK = threading.Lock()
+# Source files of jobs still being processed; compaction must not remove them.
+IN_FLIGHT_UPLOAD_PATHS: set[str] = set()
+
+def _in_flight_upload_paths() -> List[str]:
+    with UPLOAD_JOBS_LOCK:
+        return list(IN_FLIGHT_UPLOAD_PATHS)
+
+COMPACTOR = CompactionWorker(protected_paths=_in_flight_upload_paths)
+register_compaction_hook(prune_upload_ingests)
 
-app = FastAPI(title="Mishpink data explorer")
+GROUP_COMPARE_CACHE = VersionedCache(GROUP_COMPARE_CACHE_SIZE)
+# Upper bound for per-request bootstrap resamples; replicates are held in memory as one matrix.
+MAX_BOOTSTRAP_RESAMPLES = 20000
+register_compaction_hook(lambda: GROUP_COMPARE_CACHE.prune_idle(COMPACTION_INTERVAL_MINUTES * 60))
+
+# Group answers payloads keyed by group id; the version adds the test's answer key to the group version.
+GROUP_ANSWERS_CACHE = VersionedCache(GROUP_ANSWERS_CACHE_SIZE)
+register_compaction_hook(lambda: GROUP_ANSWERS_CACHE.prune_idle(COMPACTION_INTERVAL_MINUTES * 60))
+
+# Pair distances keyed by (session pair, task, algorithm, window); the version is both sessions' data versions.
+SIMILARITY_CACHE = VersionedCache(SIMILARITY_CACHE_SIZE)
+register_compaction_hook(lambda: SIMILARITY_CACHE.prune_idle(COMPACTION_INTERVAL_MINUTES * 60))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if COMPACTION_ENABLED:
+        COMPACTOR.start()
+    if METRICS_SWEEP_ENABLED:
+        METRICS_SWEEPER.start()
+    yield
+    COMPACTOR.stop()
+    METRICS_SWEEPER.stop()
+    shutdown_pool()
+
+
+app = FastAPI(title="Mishpink data explorer", lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory=str(WEB_DIR)), name="static")
 
 logger = logging.getLogger(__name__)
 
-UPLOAD_JOBS: Dict[str, Dict[str, Any]] = {}
-UPLOAD_JOBS_LOCK = threading.Lock()
-
 AUTH_COOKIE_NAME = "diplomka_auth"
 AUTH_EXEMPT_PATHS = {
     "/login",
@@ -187,7 +257,7 @@ def login_page(request: Request):
 
 
 @app.get("/api/auth/me")
-def auth_me(request: Request):
+async def auth_me(request: Request):
     if not _is_authenticated(request):
         return _unauthorized_response("/api/auth/me")
 
@@ -280,27 +350,6 @@ def _raise_api_error(status_code: int, message: str, *, error_code: Optional[str
         payload["error_code"] = error_code
     raise HTTPException(status_code=status_code, detail=payload)
 
-def _read_soc_demo_row(csv_path: Path) -> Dict[str, Any]:
-    """
-    Read soc-demographic fields from the first CSV row only.
-    """
-    try:
-        df0 = pd.read_csv(csv_path, nrows=1)
-    except Exception:
-        return {}
-
-    if df0.empty:
-        return {}
-
-    row = df0.iloc[0].to_dict()
-    resolved = resolve_column_aliases(df0.columns, SOC_DEMO_COLUMN_ALIASES)
-    out: Dict[str, Any] = {}
-    for k in SOC_DEMO_KEYS:
-        source_col = resolved.get(k)
-        if source_col:
-            out[k] = row.get(source_col)
-    return out
-
 def _normalize_user_id(value: Any) -> Optional[str]:
     if value is None or (isinstance(value, float) and pd.isna(value)):
         return None
@@ -310,21 +359,22 @@ def _normalize_user_id(value: Any) -> Optional[str]:
 
 def _read_soc_demo_rows_by_user(df: pd.DataFrame, user_col: str) -> Dict[str, Dict[str, Any]]:
     """Capture first seen socio-demographic row per user id."""
-    out: Dict[str, Dict[str, Any]] = {}
     resolved = resolve_column_aliases(df.columns, SOC_DEMO_COLUMN_ALIASES)
+    source_cols = {k: resolved[k] for k in SOC_DEMO_KEYS if resolved.get(k)}
+    first_rows = df.drop_duplicates(subset=[user_col], keep="first")
 
-    for _, row in df.iterrows():
+    out: Dict[str, Dict[str, Any]] = {}
+    for row in first_rows[list(dict.fromkeys([user_col, *source_cols.values()]))].to_dict("records"):
         user_id = _normalize_user_id(row.get(user_col))
         if not user_id or user_id in out:
             continue
+        out[user_id] = {k: row.get(col) for k, col in source_cols.items()}
 
-        row_dict = row.to_dict()
-        soc: Dict[str, Any] = {}
-        for k in SOC_DEMO_KEYS:
-            source_col = resolved.get(k)
-            if source_col:
-                soc[k] = row_dict.get(source_col)
-        out[user_id] = soc
+    if "nationality" in source_cols:
+        # One batch over the column's distinct values; extract_soc_demo then finds them canonical already.
+        rows = [row for row in out.values() if row.get("nationality") is not None]
+        for row, nationality in zip(rows, normalize_nationalities(row["nationality"] for row in rows)):
+            row["nationality"] = nationality
     return out
 
 
@@ -356,233 +406,12 @@ def _read_session_events_df(csv_path: Path) -> pd.DataFrame:
     if "timestamp" not in df.columns or "event_name" not in df.columns:
         raise HTTPException(status_code=400, detail="CSV does not contain required columns.")
 
-    df = df[df["timestamp"].notna() & df["event_name"].notna()].copy()
-    if df.empty:
-        return df
-
-    df["timestamp"] = pd.to_numeric(df["timestamp"], errors="coerce")
-    df = df[df["timestamp"].notna()].copy()
-    if df.empty:
-        return df
-
-    df["timestamp"] = df["timestamp"].astype(int)
-    df = df.sort_values(by=["timestamp"], kind="stable").reset_index(drop=True)
-
-    if "task" not in df.columns:
-        df["task"] = None
-
-    inferred_tasks: List[Optional[str]] = []
-    current_task: Optional[str] = None
-    for _, row in df.iterrows():
-        raw_task = row.get("task")
-        task = _normalize_task_id(raw_task)
-
-        if task:
-            current_task = task
-            inferred_tasks.append(task)
-            continue
-
-        event_name = str(row.get("event_name") or "").strip()
-        raw_detail = row.get("event_detail")
-        detail = None if pd.isna(raw_detail) else str(raw_detail).strip() or None
-
-        if event_name == "setting task" and detail:
-            normalized_detail_task = _normalize_task_id(detail)
-            current_task = normalized_detail_task
-            inferred_tasks.append(normalized_detail_task)
-            continue
-
-        inferred_tasks.append(current_task)
-
-    df["task"] = inferred_tasks
-    return df
-
-def _to_text_detail(value: Any) -> Optional[str]:
-    if value is None or (isinstance(value, float) and pd.isna(value)):
-        return None
-    text = str(value).strip()
-    if not text:
-        return None
-    if re.match(r"^-?\d+(\.\d+)?\s*,\s*-?\d+(\.\d+)?$", text):
-        return None
-    return text
+    return prepare_events_df(df)
 
 # =========================
 # Timeline + GazePlotter
 # =========================
 
-def _build_timeline_items_from_events_df(df: pd.DataFrame) -> List[Dict[str, Any]]:
-    """Collapse raw events into instant and interval timeline items."""
-    events = []
-    for _, row in df.iterrows():
-        task = row.get("task") if "task" in df.columns else None
-        events.append({
-            "timestamp": int(row["timestamp"]),
-            "event_name": str(row["event_name"]),
-            "event_detail": row.get("event_detail") if "event_detail" in df.columns else None,
-            "task": None if pd.isna(task) else str(task),
-        })
-
-    items: List[Dict[str, Any]] = []
-    open_move: Optional[Dict[str, Any]] = None
-    open_popup: Optional[Dict[str, Any]] = None
-
-    for event in events:
-        ts = int(event["timestamp"])
-        name = str(event["event_name"])
-        detail = _to_text_detail(event.get("event_detail"))
-        task = event.get("task")
-
-        if name == "movestart":
-            if open_move:
-                items.append({
-                    "type": "interval",
-                    "name": "ZOOM" if open_move.get("hadZoom") else "MOVE",
-                    "startTs": int(open_move["startTs"]),
-                    "endTs": ts,
-                    "task": open_move.get("task") or task,
-                })
-            open_move = {"startTs": ts, "hadZoom": False, "task": task, "details": []}
-            continue
-
-        if name in {"zoom in", "zoom out"}:
-            if open_move:
-                open_move["hadZoom"] = True
-                if not open_move.get("task") and task:
-                    open_move["task"] = task
-                if detail:
-                    open_move["details"].append(f"{name}: {detail}")
-            else:
-                items.append({"type": "instant", "name": name, "ts": ts, "task": task})
-            continue
-
-        if name == "moveend":
-            if open_move:
-                items.append({
-                    "type": "interval",
-                    "name": "ZOOM" if open_move.get("hadZoom") else "MOVE",
-                    "startTs": int(open_move["startTs"]),
-                    "endTs": ts,
-                    "task": open_move.get("task") or task,
-                })
-                open_move = None
-            else:
-                items.append({"type": "instant", "name": name, "ts": ts, "task": task})
-            continue
-
-        if name == "popupopen":
-            if open_popup:
-                items.append({
-                    "type": "interval",
-                    "name": "POPUP",
-                    "startTs": int(open_popup["startTs"]),
-                    "endTs": ts,
-                    "task": open_popup.get("task") or task,
-                })
-            open_popup = {"startTs": ts, "task": task, "details": []}
-            if detail:
-                open_popup["details"].append(f"popupopen: {detail}")
-            continue
-
-        if name == "popupclose":
-            if open_popup:
-                items.append({
-                    "type": "interval",
-                    "name": "POPUP",
-                    "startTs": int(open_popup["startTs"]),
-                    "endTs": ts,
-                    "task": open_popup.get("task") or task,
-                })
-                open_popup = None
-            else:
-                items.append({"type": "instant", "name": name, "ts": ts, "task": task})
-            continue
-        
-        # Close dangling popup interval when task changes mid-popup.
-        if name == "setting task" and open_popup:
-            items.append({
-                "type": "interval",
-                "name": "POPUP",
-                "startTs": int(open_popup["startTs"]),
-                "endTs": ts,
-                "task": open_popup.get("task") or task,
-            })
-            open_popup = None
-
-        if open_popup and not open_popup.get("task") and task:
-            open_popup["task"] = task
-
-        items.append({"type": "instant", "name": name, "ts": ts, "task": task})
-
-    last_ts = int(events[-1]["timestamp"]) if events else 0
-
-    if open_move:
-        items.append({
-            "type": "interval",
-            "name": "ZOOM" if open_move.get("hadZoom") else "MOVE",
-            "startTs": int(open_move["startTs"]),
-            "endTs": last_ts,
-            "task": open_move.get("task"),
-        })
-
-    if open_popup:
-        items.append({
-            "type": "interval",
-            "name": "POPUP",
-            "startTs": int(open_popup["startTs"]),
-            "endTs": last_ts,
-            "task": open_popup.get("task"),
-        })
-
-    first_task_id: Optional[str] = None
-    setting_task_start_by_task: Dict[str, int] = {}
-    question_closed_by_task: Dict[str, int] = {}
-    for event in events:
-        task_raw = event.get("task")
-        task_id = str(task_raw).strip() if task_raw is not None else ""
-        if not task_id:
-            continue
-        if first_task_id is None:
-            first_task_id = task_id
-        event_name = str(event.get("event_name") or "")
-        ts = int(event.get("timestamp", 0))
-        if event_name == "setting task" and task_id not in setting_task_start_by_task:
-            setting_task_start_by_task[task_id] = ts
-        if event_name == "question dialog closed" and task_id not in question_closed_by_task:
-            question_closed_by_task[task_id] = ts
-
-    intro_items: List[Dict[str, Any]] = []
-    for task_id, end_ts in question_closed_by_task.items():
-        if task_id in setting_task_start_by_task:
-            start_ts = setting_task_start_by_task[task_id]
-        elif task_id == first_task_id:
-            start_ts = 0
-        else:
-            continue
-        if end_ts < start_ts:
-            continue
-        intro_items.append({
-            "type": "interval",
-            "name": "INTRO",
-            "startTs": int(start_ts),
-            "endTs": int(end_ts),
-            "task": task_id,
-        })
-
-    if intro_items:
-        intro_items.sort(key=lambda item: (int(item.get("startTs", 0)), int(item.get("endTs", 0))))
-        items = intro_items + items
-
-    items.sort(
-        key=lambda item: (
-            int(item.get("startTs", item.get("ts", 0))),
-            int(item.get("endTs", item.get("ts", 0))),
-            0 if str(item.get("type") or "") == "interval" else 1,
-        )
-    )
-   
-    return items
-
 def _build_task_start_offsets(events: List[Dict[str, Any]]) -> Dict[str, int]:
     """Compute per-task timestamp offsets for task-relative exports."""
     task_offsets: Dict[str, int] = {}
@@ -607,8 +436,8 @@ def _build_task_start_offsets(events: List[Dict[str, Any]]) -> Dict[str, int]:
 
     return task_offsets
 
-def _build_gazeplotter_segments_for_session(session: SessionData) -> List[Dict[str, Any]]:
-    """Build AOI segments compatible with GazePlotter import format."""
+def _build_gazeplotter_segments_for_session(session: SessionData, include_segments: bool = False) -> List[Dict[str, Any]]:
+    """Build AOI segments compatible with GazePlotter import format; optionally with IDLE/DWELL intervals."""
     csv_path = Path(session.file_path)
     if not csv_path.exists():
         raise HTTPException(status_code=404, detail=f"CSV file for session '{session.session_id}' not found.")
@@ -619,6 +448,16 @@ def _build_gazeplotter_segments_for_session(session: SessionData) -> List[Dict[s
         participant = "unknown"
 
     timeline_items = _build_timeline_items_from_events_df(df)
+    if include_segments:
+        stored = session.stats.get("segments")
+        timeline_items = sorted(
+            timeline_items + segment_timeline_items(stored if isinstance(stored, dict) else segment_events(df)),
+            key=lambda item: (
+                int(item.get("startTs", item.get("ts", 0))),
+                int(item.get("endTs", item.get("ts", 0))),
+                0 if str(item.get("type") or "") == "interval" else 1,
+            ),
+        )
     task_start_offsets = _build_task_start_offsets(df.to_dict("records"))
 
     filtered_instant_events = {"movestart", "moveend", "zoom in", "zoom out", "popupopen:name", "popupclose", "setting task", "question dialog closed"}
@@ -898,81 +737,6 @@ def _build_spatial_export_zip(filename_base: str, collections: Dict[str, Dict[st
 # Movement Ratios
 # =========================
 
-INTERVAL_EVENT_NAME_MAP: Dict[str, str] = {
-    "MOVE": "move",
-    "ZOOM": "zoom",
-    "POPUP": "popup",
-}
-
-def _empty_interval_duration_bucket() -> Dict[str, int]:
-    return {event_key: 0 for event_key in INTERVAL_EVENT_NAME_MAP.values()}
-
-def _compute_dominant_behavior(events: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-    dominant_key: Optional[str] = None
-    dominant_duration = -1
-
-    for event_key in INTERVAL_EVENT_NAME_MAP.values():
-        payload = events.get(event_key) if isinstance(events, dict) else {}
-        duration_ms = int(payload.get("duration_ms", 0)) if isinstance(payload, dict) else 0
-        if duration_ms > dominant_duration:
-            dominant_duration = duration_ms
-            dominant_key = event_key
-
-    if dominant_key is None or dominant_duration <= 0:
-        return None
-
-    payload = events.get(dominant_key) if isinstance(events, dict) else {}
-    ratio = payload.get("ratio") if isinstance(payload, dict) else None
-
-    return {
-        "event_key": dominant_key,
-        "label": dominant_key.capitalize(),
-        "duration_ms": dominant_duration,
-        "ratio": ratio,
-    }
-
-def _enrich_interval_ratio_scope(scope_payload: Dict[str, Any]) -> Dict[str, Any]:
-    events_payload = scope_payload.get("events") if isinstance(scope_payload.get("events"), dict) else {}
-    normalized_events: Dict[str, Any] = {}
-
-    for event_key in INTERVAL_EVENT_NAME_MAP.values():
-        event_row = events_payload.get(event_key) if isinstance(events_payload.get(event_key), dict) else {}
-        normalized_events[event_key] = {
-            "duration_ms": int(event_row.get("duration_ms", 0)) if event_row.get("duration_ms") is not None else 0,
-            "ratio": event_row.get("ratio"),
-        }
-
-    out = dict(scope_payload)
-    out["events"] = normalized_events
-    out["dominant_behavior"] = _compute_dominant_behavior(normalized_events)
-    return out
-
-def _normalize_interval_event_ratios_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
-    by_task_raw = payload.get("by_task") if isinstance(payload.get("by_task"), dict) else {}
-    all_tasks_raw = payload.get("all_tasks") if isinstance(payload.get("all_tasks"), dict) else {}
-
-    by_task: Dict[str, Any] = {}
-    for task_id, scope_payload in by_task_raw.items():
-        if not isinstance(scope_payload, dict):
-            continue
-        by_task[str(task_id)] = _enrich_interval_ratio_scope(scope_payload)
-
-    normalized_all_tasks = _enrich_interval_ratio_scope(all_tasks_raw) if all_tasks_raw else {
-        "task_id": "ALL_TASKS",
-        "task_duration_ms": 0,
-        "events": {
-            event_key: {"duration_ms": 0, "ratio": None}
-            for event_key in INTERVAL_EVENT_NAME_MAP.values()
-        },
-        "dominant_behavior": None,
-    }
-
-    return {
-        "event_order": list(INTERVAL_EVENT_NAME_MAP.values()),
-        "by_task": by_task,
-        "all_tasks": normalized_all_tasks,
-    }
-
 def _refresh_session_interval_event_ratios(session: SessionData, persist: bool = False) -> Optional[Dict[str, Any]]:
     stats = session.stats if isinstance(session.stats, dict) else {}
     payload = stats.get("interval_event_ratios") if isinstance(stats.get("interval_event_ratios"), dict) else None
@@ -987,299 +751,55 @@ def _refresh_session_interval_event_ratios(session: SessionData, persist: bool =
             STORE.upsert(session)
     return normalized
 
-def _compute_interval_event_ratios(
-    timeline_items: List[Dict[str, Any]],
-    task_metrics: Dict[str, Dict[str, Any]],
-) -> Dict[str, Any]:
-    session_duration_ms = 0
-    for item in timeline_items:
-        if item.get("type") == "interval":
-            end_ts = int(item.get("endTs", item.get("startTs", 0)))
-            session_duration_ms = max(session_duration_ms, end_ts)
-        else:
-            ts = int(item.get("ts", 0))
-            session_duration_ms = max(session_duration_ms, ts)
-
-    by_task_durations: Dict[str, Dict[str, int]] = {
-        str(task_id): _empty_interval_duration_bucket()
-        for task_id in task_metrics.keys()
-    }
-
-    for item in timeline_items:
-        if item.get("type") != "interval":
-            continue
-
-        raw_name = str(item.get("name") or "").strip().upper()
-        event_key = INTERVAL_EVENT_NAME_MAP.get(raw_name)
-        if not event_key:
-            continue
-
-        task_id = str(item.get("task") or "").strip()
-        if not task_id:
-            continue
-
-        if task_id not in by_task_durations:
-            by_task_durations[task_id] = _empty_interval_duration_bucket()
-
-        start_ts = int(item.get("startTs", 0))
-        end_ts = int(item.get("endTs", start_ts))
-        duration_ms = max(0, end_ts - start_ts)
-        by_task_durations[task_id][event_key] += duration_ms
-
-    by_task: Dict[str, Any] = {}
-    all_tasks_durations = _empty_interval_duration_bucket()
-
-    for task_id, metrics in task_metrics.items():
-        task_id_str = str(task_id)
-        task_duration_ms = metrics.get("duration_ms")
-        task_duration_int = int(task_duration_ms) if isinstance(task_duration_ms, int) else 0
-
-        event_rows: Dict[str, Any] = {}
-        durations = by_task_durations.get(task_id_str, _empty_interval_duration_bucket())
-        for event_key, duration_ms in durations.items():
-            all_tasks_durations[event_key] += duration_ms
-            ratio = (duration_ms / task_duration_int) if task_duration_int > 0 else None
-            event_rows[event_key] = {
-                "duration_ms": duration_ms,
-                "ratio": ratio,
-            }
-
-        by_task[task_id_str] = {
-            "task_id": task_id_str,
-            "task_duration_ms": task_duration_int if task_duration_ms is not None else None,
-            "events": event_rows,
-        }
-
-    all_tasks_events: Dict[str, Any] = {}
-    for event_key, duration_ms in all_tasks_durations.items():
-        ratio = (duration_ms / session_duration_ms) if session_duration_ms > 0 else None
-        all_tasks_events[event_key] = {
-            "duration_ms": duration_ms,
-            "ratio": ratio,
-        }
-
-    return _normalize_interval_event_ratios_payload({
-        "event_order": list(INTERVAL_EVENT_NAME_MAP.values()),
-        "by_task": by_task,
-        "all_tasks": {
-            "task_id": "ALL_TASKS",
-            "task_duration_ms": session_duration_ms,
-            "events": all_tasks_events,
-        },
-    })
-
-# =========================
-# Helpers
-# =========================
-
-def _read_csv_flexible(path: Path) -> pd.DataFrame:
-    """
-    Tries common delimiters (comma/tab/auto) to support slightly different CSV exports.
-    """
-    attempts = [
-        {"kwargs": {"low_memory": False}},
-        {"kwargs": {"sep": "	", "low_memory": False}},
-        {"kwargs": {"sep": None, "engine": "python", "low_memory": False}},
-    ]
-
-    for attempt in attempts:
-        try:
-            df = pd.read_csv(path, **attempt["kwargs"])
-        except Exception:
-            continue
-        if {"timestamp", "event_name"}.issubset(set(df.columns)):
-            return df
-
-    # last resort: return default read result (will fail later with clearer message if invalid)
-    return pd.read_csv(path, low_memory=False)
-
-def _normalize_text(value: Any) -> str:
-    text = str(value or "").strip().lower()
-    if not text:
-        return ""
-    text = unicodedata.normalize("NFKD", text)
-    text = "".join(ch for ch in text if not unicodedata.combining(ch))
-    text = re.sub(r"[^a-z0-9\s]", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    return text.strip()
-
-
-def _extract_answers_by_task_from_df(df: pd.DataFrame) -> Dict[str, str]:
-    if df.empty or "event_name" not in df.columns:
-        return {}
-    
-    answer_event_names = {"answer selected", "polygon selected"}
-
-    if "task" not in df.columns:
-        return {}
-
-    finalized: Dict[str, str] = {}
-    for row in df.to_dict("records"):
-        event_name_raw = row.get("event_name")
-        if event_name_raw is None or (isinstance(event_name_raw, float) and pd.isna(event_name_raw)):
-            continue
-
-        event_name = str(event_name_raw).strip().lower()
-        if event_name not in answer_event_names:
-            continue
-
-        task_raw = row.get("task")
-        if task_raw is None or (isinstance(task_raw, float) and pd.isna(task_raw)):
-            continue
-
-        task_id = str(task_raw).strip()
-        if not task_id:
-            continue
-
-        event_detail_raw = row.get("event_detail") if "event_detail" in df.columns else None
-        answer_text = "" if event_detail_raw is None or (isinstance(event_detail_raw, float) and pd.isna(event_detail_raw)) else str(event_detail_raw).strip()
-        if not answer_text:
-            continue
-
-        # Keep latest explicit answer event per task.
-        finalized[task_id] = answer_text
-
-    return finalized
-
 # =========================
 # Correctness Evaluation
 # =========================
 
-def _evaluate_answer(correct_answer: str, user_answer: str) -> tuple[bool, float]:
-    if not correct_answer or not user_answer:
-        return False, 0.0
-
-    norm_correct = _normalize_text(correct_answer)
-    norm_user = _normalize_text(user_answer)
-    is_match = norm_correct == norm_user
-    return is_match, (100.0 if is_match else 0.0)
+# Re-scores read the key once; running them one at a time keeps an older key from overwriting a newer one.
+ANSWERS_RESCORE_LOCK = threading.Lock()
 
 
-def _build_answers_eval_for_session(
-    answers_by_task: Dict[str, str],
-    answer_key: Dict[str, str],
-) -> Dict[str, Any]:
-    task_records: Dict[str, Dict[str, Any]] = {}
-    answered_count = 0
-    correct_count = 0
-
-    for task_id, user_answer in answers_by_task.items():
-        task = str(task_id or "").strip()
-        if not task:
-            continue
-        answer_text = str(user_answer or "").strip()
-        if not answer_text:
-            continue
+def _recompute_answers_eval_for_test(test_id: str, task_ids: List[str]) -> Dict[str, int]:
+    """Re-score the stored answers to the edited tasks; evaluations of other tasks are unaffected by the edit."""
+    with ANSWERS_RESCORE_LOCK:
+        return rescore_answer_evals(str(test_id or "TEST").strip() or "TEST", task_ids)
 
-        answered_count += 1
-        correct_answer = answer_key.get(task)
-        is_correct = False
-        similarity = None
-        if isinstance(correct_answer, str) and correct_answer.strip():
-            is_correct, score = _evaluate_answer(correct_answer, answer_text)
-            similarity = score
-            if is_correct:
-                correct_count += 1
-
-        task_records[task] = {
-            "task_id": task,
-            "answer": answer_text,
-            "correct_answer": correct_answer,
-            "is_correct": is_correct,
-            "similarity_score": similarity,
-        }
-
-    expected_count = len([
-        t for t, val in answer_key.items()
-        if str(t).strip() and isinstance(val, str) and val.strip()
-    ])
-    accuracy = (correct_count / answered_count) if answered_count else None
-    coverage = (answered_count / expected_count) if expected_count else None
-
-    return {
-        "by_task": task_records,
-        "summary": {
-            "answered_count": answered_count,
-            "correct_count": correct_count,
-            "expected_count": expected_count,
-            "accuracy": accuracy,
-            "coverage": coverage,
-        },
-    }
 
-def _ensure_session_answers_eval(session_data: SessionData) -> Dict[str, Any]:
-    stats = session_data.stats if isinstance(session_data.stats, dict) else {}
-    answers_by_task = stats.get("answers_by_task") if isinstance(stats.get("answers_by_task"), dict) else {}
-    answer_key = get_test_answers(getattr(session_data, "test_id", "TEST") or "TEST")
-    eval_payload = _build_answers_eval_for_session(answers_by_task, answer_key)
-    stats = {**stats, "answers_by_task": answers_by_task, "answers_eval": eval_payload}
-    session_data.stats = stats
-    return eval_payload
-
-def _refresh_session_answers_eval(session_data: SessionData, persist: bool = False) -> Dict[str, Any]:
-    prev_stats = session_data.stats if isinstance(session_data.stats, dict) else {}
-    prev_eval = prev_stats.get("answers_eval") if isinstance(prev_stats.get("answers_eval"), dict) else None
-    prev_answers = prev_stats.get("answers_by_task") if isinstance(prev_stats.get("answers_by_task"), dict) else {}
-
-    payload = _ensure_session_answers_eval(session_data)
-    new_stats = session_data.stats if isinstance(session_data.stats, dict) else {}
-    new_answers = new_stats.get("answers_by_task") if isinstance(new_stats.get("answers_by_task"), dict) else {}
-
-    nationality_changed = _normalize_session_nationality(session_data, persist=False)
-    changed = prev_eval != payload or prev_answers != new_answers or nationality_changed
-    if persist and changed:
-        STORE.upsert(session_data)
-
-    return payload
-
-def _normalize_session_nationality(session_data: SessionData, persist: bool = False) -> bool:
-    stats = session_data.stats if isinstance(session_data.stats, dict) else {}
-    session_stats = stats.get("session") if isinstance(stats.get("session"), dict) else {}
-    soc_demo = session_stats.get("soc_demo") if isinstance(session_stats.get("soc_demo"), dict) else {}
-
-    if not soc_demo:
-        return False
-
-    original = soc_demo.get("nationality")
-    normalized = normalize_nationality(original)
-    if normalized == original:
-        return False
-
-    updated_soc_demo = {**soc_demo, "nationality": normalized}
-    updated_session_stats = {**session_stats, "soc_demo": updated_soc_demo}
-    session_data.stats = {**stats, "session": updated_session_stats}
-
-    if persist:
-        STORE.upsert(session_data)
-
-    return True
-
-def _recompute_answers_eval_for_test(test_id: str) -> Dict[str, int]:
-    normalized_test_id = str(test_id or "TEST").strip() or "TEST"
-    sessions = STORE.list_sessions(test_id=normalized_test_id)
-    matched = 0
-    updated = 0
-
-    for session in sessions.values():
-        if (getattr(session, "test_id", "TEST") or "TEST") != normalized_test_id:
-            continue
-        matched += 1
-        prev_stats = session.stats if isinstance(session.stats, dict) else {}
-        prev_eval = prev_stats.get("answers_eval") if isinstance(prev_stats.get("answers_eval"), dict) else None
-        prev_answers = prev_stats.get("answers_by_task") if isinstance(prev_stats.get("answers_by_task"), dict) else {}
+def _run_answers_rescore_job(job_id: str, *, test_id: str, task_ids: List[str]) -> None:
+    _update_upload_job(job_id, status="processing", message="Re-scoring stored answers...")
+    try:
+        result = _recompute_answers_eval_for_test(test_id, task_ids)
+        _update_upload_job(job_id, status="completed", message="Answers re-scored.", result=result)
+    except Exception:
+        logger.exception("Unexpected error while re-scoring answers", extra={"job_id": job_id, "test_id": test_id})
+        _update_upload_job(
+            job_id,
+            status="failed",
+            message="Re-scoring answers failed.",
+            error="Unexpected server error while re-scoring answers.",
+            error_code="ANSWERS_RESCORE_ERROR",
+        )
 
-        payload = _refresh_session_answers_eval(session, persist=True)
-        new_stats = session.stats if isinstance(session.stats, dict) else {}
-        new_answers = new_stats.get("answers_by_task") if isinstance(new_stats.get("answers_by_task"), dict) else {}
-        if prev_eval != payload or prev_answers != new_answers:
-            updated += 1
 
-    return {"matched": matched, "updated": updated}
+def _start_answers_rescore_job(*, test_id: str, filename: str, task_ids: List[str]) -> str:
+    job_id = _create_upload_job(kind="answers", filename=filename, test_id=test_id)
+    worker = threading.Thread(
+        target=_run_answers_rescore_job,
+        args=(job_id,),
+        kwargs={"test_id": test_id, "task_ids": task_ids},
+        daemon=True,
+    )
+    worker.start()
+    return job_id
 
 # =========================
 # Payload Builders
 # =========================
 
+# Stats blocks only read server-side (window ratios, summed transition matrices); kept out of session payloads.
+SERVER_ONLY_STATS_KEYS = {"interval_index", "transitions"}
+
+
 def _serialize_session_payload(session: SessionData, *, include_file_path: bool = False) -> Dict[str, Any]:
     stats = session.stats if isinstance(session.stats, dict) else {}
     task_metrics = stats.get("tasks", {}) if isinstance(stats.get("tasks"), dict) else {}
@@ -1289,7 +809,7 @@ def _serialize_session_payload(session: SessionData, *, include_file_path: bool
         "user_id": session.user_id,
         "task": session.task,
         "tasks": list(task_metrics.keys()),
-        "stats": stats,
+        "stats": {key: value for key, value in stats.items() if key not in SERVER_ONLY_STATS_KEYS},
         "session_stats": stats.get("session", {}) if isinstance(stats.get("session"), dict) else {},
     }
     if include_file_path:
@@ -1318,23 +838,61 @@ def _serialize_group_sessions_payload(
         out.append(_serialize_session_payload(session))
     return out
 
-def _build_group_answers_payload(group: Dict[str, Any]) -> Dict[str, Any]:
+def _with_current_answers_eval(sessions: List[Dict[str, Any]], answer_key: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Re-evaluate stored answers against the current key so accuracy matches /answers."""
+    scorer = AnswerScorer(answer_key, ANSWER_MATCH_THRESHOLD)
+    prepare_sessions(scorer, (session["stats"].get("answers_by_task") for session in sessions))
+    out: List[Dict[str, Any]] = []
+    for session in sessions:
+        stats = session["stats"]
+        answers_by_task = stats.get("answers_by_task") if isinstance(stats.get("answers_by_task"), dict) else {}
+        out.append({**session, "stats": {**stats, "answers_eval": build_answers_eval(answers_by_task, scorer)}})
+    return out
+
+
+def _group_stats(sessions: List[Dict[str, Any]], answer_key: Dict[str, str]) -> Dict[str, Any]:
+    """build_group_stats over the sessions with answers scored against the current key (CPU-bound, run off the event loop)."""
+    return build_group_stats(_with_current_answers_eval(sessions, answer_key))
+
+
+def _answer_key_version(answer_key: Dict[str, str]) -> str:
+    return hashlib.sha1(json.dumps(answer_key, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _group_answers_version(group_version: Optional[str], answer_key: Dict[str, str]) -> str:
+    """Changes with the group's members, any member's stats, or the test's answer key."""
+    return f"{group_version}:{_answer_key_version(answer_key)}"
+
+
+def _build_group_answers_payload(
+    group: Dict[str, Any],
+    answer_key: Optional[Dict[str, str]] = None,
+) -> Dict[str, Any]:
     sessions = group.get("sessions", []) if isinstance(group.get("sessions"), list) else []
     test_id = str(group.get("test_id") or "TEST")
-    answer_key = get_test_answers(test_id)
+    if answer_key is None:
+        answer_key = get_test_answers(test_id)
 
-    by_task: Dict[str, Dict[str, Any]] = {}
+    # Every distinct (task, answer) of the group is scored in one batch before the records are built.
+    # Task and user blocks come from the same pass, so the payload only depends on the stats and the key.
+    session_rows: List[Tuple[str, str, List[Tuple[str, str, str]]]] = []
     for session in sessions:
-        user_id = str(session.get("user_id") or "").strip()
         stats = session.get("stats") if isinstance(session.get("stats"), dict) else {}
         answers_map = stats.get("answers_by_task") if isinstance(stats.get("answers_by_task"), dict) else {}
+        session_rows.append((
+            str(session.get("session_id") or "").strip(),
+            str(session.get("user_id") or "").strip(),
+            [(task, answer, fold_text(answer)) for task, answer in session_answers(answers_map).items()],
+        ))
+    scorer = AnswerScorer(answer_key, ANSWER_MATCH_THRESHOLD)
+    scorer.prepare((task, folded) for _, _, answers in session_rows for task, _, folded in answers)
+    expected_count = expected_answer_count(answer_key)
 
-        for task_id, answer_text in answers_map.items():
-            task = str(task_id).strip()
-            answer = str(answer_text).strip()
-            if not task or not answer:
-                continue
-
+    by_task: Dict[str, Dict[str, Any]] = {}
+    by_user: Dict[str, Dict[str, Any]] = {}
+    for sid, user_id, answers in session_rows:
+        session_records: List[Dict[str, Any]] = []
+        for task, answer, folded in answers:
             correct = answer_key.get(task)
             record = by_task.setdefault(task, {
                 "task_id": task,
@@ -1343,7 +901,9 @@ def _build_group_answers_payload(group: Dict[str, Any]) -> Dict[str, Any]:
                 "correct_count": 0,
                 "total_count": 0,
             })
-            is_correct, similarity = _evaluate_answer(correct or "", answer) if isinstance(correct, str) else (False, 0.0)
+            scored = scorer.score(task, folded)
+            session_records.append({"task_id": task, "answer": answer, **scored})
+            is_correct, similarity = scored["is_correct"], scored["similarity_score"]
             record["answers"].append({
                 "user_id": user_id or None,
                 "answer": answer,
@@ -1354,6 +914,16 @@ def _build_group_answers_payload(group: Dict[str, Any]) -> Dict[str, Any]:
             if is_correct:
                 record["correct_count"] += 1
 
+        summary = answers_eval_payload(session_records, expected_count)["summary"]
+        by_user[sid or user_id or f"session_{len(by_user)+1}"] = {
+            "session_id": sid or None,
+            "user_id": user_id or None,
+            "answered_count": summary["answered_count"],
+            "correct_count": summary["correct_count"],
+            "accuracy": summary["accuracy"],
+            "coverage": summary["coverage"],
+        }
+
     for record in by_task.values():
         total = record.get("total_count") or 0
         correct_count = record.get("correct_count") or 0
@@ -1361,27 +931,6 @@ def _build_group_answers_payload(group: Dict[str, Any]) -> Dict[str, Any]:
     
     answered_total = sum(record.get("total_count", 0) for record in by_task.values())
     correct_total = sum(record.get("correct_count", 0) for record in by_task.values())
-    expected_count = len([
-        t for t, val in answer_key.items()
-        if str(t).strip() and isinstance(val, str) and val.strip()
-    ])
-
-    by_user: Dict[str, Dict[str, Any]] = {}
-    for session in sessions:
-        sid = str(session.get("session_id") or "").strip()
-        uid = str(session.get("user_id") or "").strip()
-        stats = session.get("stats") if isinstance(session.get("stats"), dict) else {}
-        eval_payload = stats.get("answers_eval") if isinstance(stats.get("answers_eval"), dict) else {}
-        summary = eval_payload.get("summary") if isinstance(eval_payload.get("summary"), dict) else {}
-
-        by_user[sid or uid or f"session_{len(by_user)+1}"] = {
-            "session_id": sid or None,
-            "user_id": uid or None,
-            "answered_count": summary.get("answered_count", 0),
-            "correct_count": summary.get("correct_count", 0),
-            "accuracy": summary.get("accuracy"),
-            "coverage": summary.get("coverage"),
-        }
 
     return {
         "group_id": group.get("id"),
@@ -1396,37 +945,81 @@ def _build_group_answers_payload(group: Dict[str, Any]) -> Dict[str, Any]:
         "users": by_user,
     }
 
+# =========================
+# Metrics Refresh
+# =========================
+
+def _recompute_stale_stats(session: SessionData) -> Dict[str, Any]:
+    stats = session.stats if isinstance(session.stats, dict) else {}
+    plugins = stale_metric_plugins(stats)
+    if not plugins:
+        return stats
+
+    csv_path = Path(session.file_path)
+    if not csv_path.exists():
+        raise FileNotFoundError(f"CSV file for session '{session.session_id}' not found.")
+
+    # Keep the identifiers the session was first computed with.
+    previous = stats.get("session") if isinstance(stats.get("session"), dict) else {}
+    frame = load_session_frame(csv_path, session_id=str(previous.get("session_id") or session.session_id), plugins=plugins)
+    if previous.get("user_id") is not None:
+        frame.user_id = previous["user_id"]
+
+    stats = compute_session_stats(frame, plugins, stats)
+    if any(plugin.key == "answers_by_task" for plugin in plugins):
+        if "answers" in stats:
+            stats["answers"] = stats["answers_by_task"]
+    return stats
+
+
+def _refresh_session_metrics(session: SessionData) -> SessionData:
+    """Recompute the stale metric families of one session from its CSV and store the result.
+
+    A failure is recorded on the session so it is not retried until re-upload or a plugin change. The write only
+    applies if the session is unchanged since it was read; otherwise the newer stored session is returned.
+    """
+    current = metrics_version()
+    try:
+        stats = _recompute_stale_stats(session)
+    except Exception:
+        STORE.mark_metrics_failed(session, current)
+        raise
+
+    refreshed = replace(session, stats=stats, metrics_version=current, metrics_failed_version=None)
+    if not STORE.put_refreshed_stats(refreshed, session.data_version):
+        return STORE.get(session.session_id) or session
+    refreshed.data_version += 1
+    return refreshed
+
+
+async def _get_session_with_current_metrics(session_id: str) -> Optional[SessionData]:
+    """Single-session reads refresh stale stats inline; list views rely on the background sweeper."""
+    session = await ASYNC_STORE.get(session_id)
+    current = metrics_version()
+    if session is not None and current not in (session.metrics_version, session.metrics_failed_version):
+        try:
+            session = await asyncio.to_thread(_refresh_session_metrics, session)
+        except Exception:
+            logger.exception("Metrics refresh failed", extra={"session_id": session_id})
+    return session
+
+
+METRICS_SWEEPER = MetricsSweeper(_refresh_session_metrics)
+
 # =========================
 # Data Uploads
 # =========================
 
 def _process_single_csv(dst: Path, filename: str, test_id: str) -> Dict[str, Any]:
-    parsed_session = parse_session(str(dst), filename)
+    frame = load_session_frame(dst, session_id=infer_session_id_from_filename(filename))
     normalized_test_id = str(test_id or "TEST").strip() or "TEST"
-    resolved_user_id = _normalize_user_id(parsed_session.user_id)
+    resolved_user_id = _normalize_user_id(frame.user_id)
     session_id = _build_session_id_for_test_user(normalized_test_id, resolved_user_id)
 
-    tasks: List[str] = list_task_ids(parsed_session)
+    tasks: List[str] = frame.task_ids
     primary_task: Optional[str] = tasks[0] if tasks else None
 
-    soc_row = _read_soc_demo_row(dst)
-    session_metrics = compute_session_metrics(session=parsed_session, raw_row=soc_row)
-    task_metrics = compute_all_task_metrics(parsed_session)
-
-    source_df = _read_csv_flexible(dst)
-    answers_by_task = _extract_answers_by_task_from_df(source_df)
-    answers_eval = _build_answers_eval_for_session(answers_by_task, get_test_answers(test_id or "TEST"))
-
-    stats: Dict[str, Any] = {
-        "session": session_metrics,
-        "tasks": task_metrics,
-        "answers_by_task": answers_by_task,
-        "answers_eval": answers_eval,
-    }
-    stats["interval_event_ratios"] = _compute_interval_event_ratios(
-        _build_timeline_items_from_events_df(_read_session_events_df(dst)),
-        task_metrics,
-    )
+    stats: Dict[str, Any] = compute_session_stats(frame)
 
     session_meta = SessionData(
         session_id=session_id,
@@ -1435,6 +1028,7 @@ def _process_single_csv(dst: Path, filename: str, test_id: str) -> Dict[str, Any
         user_id=resolved_user_id,
         task=primary_task,
         stats=stats,
+        metrics_version=metrics_version(),
     )
     STORE.upsert(session_meta)
 
@@ -1468,58 +1062,39 @@ def _process_bulk_csv(dst: Path, filename: str, test_id: str) -> Dict[str, Any]:
     
     sessions_out: List[Dict[str, Any]] = []
 
-    for user_id, df_user in df.groupby("_user_id_norm", sort=False):
-        df_user = df_user.drop(columns=["_user_id_norm"])
-
-        user_suffix = _sanitize_filename_component(str(user_id))
-        user_filename = f"{dst.stem}__{user_suffix}.csv"
-        user_path = UPLOAD_DIR / user_filename
-        df_user.to_csv(user_path, index=False)
-
-        session_id = _build_session_id_for_test_user(normalized_test_id, user_id)
-        parsed_session = parse_session_df(
-            df_user,
-            user_filename,
-            user_id_override=str(user_id),
-            session_id_override=session_id,
-        )
+    frames = iter_session_frames(
+        df,
+        "_user_id_norm",
+        session_id_for=lambda user_id: _build_session_id_for_test_user(normalized_test_id, user_id),
+        soc_rows=soc_rows,
+    )
+    for user_id, frame in frames:
+        user_suffix = _sanitize_filename_component(user_id)
+        user_stem = f"{upload_file_stem(dst)}__{user_suffix}"
+        user_path = upload_file_path(UPLOAD_DIR, user_stem)
+        frame.df.to_csv(user_path, index=False)
 
-        tasks: List[str] = list_task_ids(parsed_session)
+        tasks: List[str] = frame.task_ids
         primary_task: Optional[str] = tasks[0] if tasks else None
 
-        soc_row = soc_rows.get(str(user_id), {})
-        session_metrics = compute_session_metrics(session=parsed_session, raw_row=soc_row)
-        task_metrics = compute_all_task_metrics(parsed_session)
-        answers_by_task = _extract_answers_by_task_from_df(df_user)
-        answers_eval = _build_answers_eval_for_session(answers_by_task, get_test_answers(test_id or "TEST"))
-
-        stats: Dict[str, Any] = {
-            "session": session_metrics,
-            "tasks": task_metrics,
-            "answers": answers_by_task,
-            "answers_by_task": answers_by_task,
-            "answers_eval": answers_eval,
-        }
-
-        stats["interval_event_ratios"] = _compute_interval_event_ratios(
-            _build_timeline_items_from_events_df(_read_session_events_df(user_path)),
-            task_metrics,
-        )
+        stats: Dict[str, Any] = compute_session_stats(frame)
+        stats["answers"] = stats["answers_by_task"]
 
         session_meta = SessionData(
-            session_id=parsed_session.session_id,
+            session_id=frame.session_id,
             test_id=normalized_test_id,
             file_path=str(user_path),
-            user_id=parsed_session.user_id,
+            user_id=frame.user_id,
             task=primary_task,
             stats=stats,
+            metrics_version=metrics_version(),
         )
         STORE.upsert(session_meta)
 
         sessions_out.append({
-            "session_id": parsed_session.session_id,
+            "session_id": frame.session_id,
             "test_id": normalized_test_id,
-            "user_id": parsed_session.user_id,
+            "user_id": frame.user_id,
             "task": primary_task,
             "tasks": tasks,
         })
@@ -1531,12 +1106,29 @@ def _process_bulk_csv(dst: Path, filename: str, test_id: str) -> Dict[str, Any]:
     }
 
 
-def _run_upload_job(job_id: str, *, kind: str, dst: Path, filename: str, test_id: str) -> None:
+def _ingest_result_session_ids(result: Dict[str, Any]) -> List[str]:
+    if isinstance(result.get("sessions"), list):
+        return [str(item.get("session_id")) for item in result["sessions"] if isinstance(item, dict) and item.get("session_id")]
+    session_id = result.get("session_id")
+    return [str(session_id)] if session_id else []
+
+
+def _run_upload_job(
+    job_id: str,
+    *,
+    kind: str,
+    dst: Path,
+    filename: str,
+    test_id: str,
+    content_hash: Optional[str] = None,
+) -> None:
     _update_upload_job(
         job_id,
         status="processing",
         message="Processing CSV... this might take a while for large files.",
     )
+    with UPLOAD_JOBS_LOCK:
+        IN_FLIGHT_UPLOAD_PATHS.add(str(dst))
     try:
         if kind == "single":
             result = _process_single_csv(dst, filename, test_id)
@@ -1545,6 +1137,16 @@ def _run_upload_job(job_id: str, *, kind: str, dst: Path, filename: str, test_id
         else:
             raise RuntimeError(f"Unsupported upload kind: {kind}")
 
+        if content_hash:
+            record_upload_ingest(
+                content_hash,
+                test_id,
+                kind,
+                filename=filename,
+                session_ids=_ingest_result_session_ids(result),
+                result=result,
+            )
+
         _update_upload_job(
             job_id,
             status="completed",
@@ -1568,25 +1170,78 @@ def _run_upload_job(job_id: str, *, kind: str, dst: Path, filename: str, test_id
             error="Unexpected server error while processing CSV.",
             error_code="UPLOAD_PROCESSING_ERROR",
         )
+    finally:
+        with UPLOAD_JOBS_LOCK:
+            IN_FLIGHT_UPLOAD_PATHS.discard(str(dst))
 
 # =========================
 # Wordcloud Data
 # =========================
 
-def _build_wordcloud_from_group_payload(payload: Dict[str, Any], task_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    tasks = payload.get("tasks", {}) if isinstance(payload.get("tasks"), dict) else {}
-    counter: Counter[str] = Counter()
+WORDCLOUD_MAX_WORDS = 80
 
-    for t_id, record in tasks.items():
-        if task_id and t_id != task_id:
-            continue
-        answers = record.get("answers", []) if isinstance(record.get("answers"), list) else []
-        for item in answers:
-            answer = str(item.get("answer") or "").strip()
-            if answer:
-                counter[answer] += 1
 
-    return [{"text": text, "count": count} for text, count in counter.most_common(80)]
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+EXPORT_CSV_CHUNK_ROWS = 50_000
+SEARCH_MAX_RESULTS = 200
+
+async def _save_upload_by_content(file: UploadFile) -> tuple[Path, str]:
+    """Stream an upload to disk compressed while hashing it; the stored file is named by its SHA-256."""
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    incoming_path = UPLOAD_DIR / f".incoming_{uuid4().hex}.part"
+    digest = hashlib.sha256()
+    try:
+        with open_upload_writer(incoming_path) as f:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                f.write(chunk)
+        content_hash = digest.hexdigest()
+        dst = upload_file_path(UPLOAD_DIR, content_hash)
+        os.replace(incoming_path, dst)
+    finally:
+        incoming_path.unlink(missing_ok=True)
+    return dst, content_hash
+
+
+def _start_upload_job(*, kind: str, dst: Path, filename: str, test_id: str, content_hash: str) -> Dict[str, Any]:
+    previous_result = get_upload_ingest(content_hash, test_id, kind)
+    job_id = _create_upload_job(kind=kind, filename=filename, test_id=test_id)
+
+    if previous_result is not None:
+        _update_upload_job(
+            job_id,
+            status="completed",
+            message="This file was already processed for this user experiment. Reusing stored results.",
+            result=previous_result,
+        )
+        return {
+            "job_id": job_id,
+            "status": "completed",
+            "message": "Upload successful. File was already processed.",
+            "test_id": test_id,
+            "filename": filename,
+            "deduplicated": True,
+        }
+
+    worker = threading.Thread(
+        target=_run_upload_job,
+        args=(job_id,),
+        kwargs={"kind": kind, "dst": dst, "filename": filename, "test_id": test_id, "content_hash": content_hash},
+        daemon=True,
+    )
+    worker.start()
+
+    return {
+        "job_id": job_id,
+        "status": "uploaded",
+        "message": "Upload successful.",
+        "test_id": test_id,
+        "filename": filename,
+        "deduplicated": False,
+    }
 
 
 # =========================
@@ -1602,32 +1257,19 @@ async def upload_csv(
     if not filename.lower().endswith(".csv"):
         _raise_api_error(400, "Please upload a CSV file.", error_code="INVALID_FILE_TYPE")
 
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    dst = UPLOAD_DIR / filename
-
     try:
-        with dst.open("wb") as f:
-            shutil.copyfileobj(file.file, f)
+        dst, content_hash = await _save_upload_by_content(file)
     except Exception:
         logger.exception("Failed to save uploaded CSV", extra={"filename": filename, "kind": "single"})
         _raise_api_error(500, "Could not save the uploaded file. Please try again.", error_code="FILE_SAVE_FAILED")
 
-    job_id = _create_upload_job(kind="single", filename=filename, test_id=test_id or "TEST")
-    worker = threading.Thread(
-        target=_run_upload_job,
-        args=(job_id,),
-        kwargs={"kind": "single", "dst": dst, "filename": filename, "test_id": test_id or "TEST"},
-        daemon=True,
+    return _start_upload_job(
+        kind="single",
+        dst=dst,
+        filename=filename,
+        test_id=test_id or "TEST",
+        content_hash=content_hash,
     )
-    worker.start()
-
-    return {
-        "job_id": job_id,
-        "status": "uploaded",
-        "message": "Upload successful.",
-        "test_id": test_id or "TEST",
-        "filename": filename,
-    }
 
 @app.post("/api/upload/bulk")
 async def upload_bulk_csv(
@@ -1638,16 +1280,22 @@ async def upload_bulk_csv(
     if not filename.lower().endswith(".csv"):
         _raise_api_error(400, "Please upload a CSV file.", error_code="INVALID_FILE_TYPE")
 
-    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
-    dst = UPLOAD_DIR / filename
-
     try:
-        with dst.open("wb") as f:
-            shutil.copyfileobj(file.file, f)
+        dst, content_hash = await _save_upload_by_content(file)
     except Exception:
         logger.exception("Failed to save uploaded CSV", extra={"filename": filename, "kind": "bulk"})
         _raise_api_error(500, "Could not save the uploaded file. Please try again.", error_code="FILE_SAVE_FAILED")
 
+    previous_result = get_upload_ingest(content_hash, test_id or "TEST", "bulk")
+    if previous_result is not None:
+        return _start_upload_job(
+            kind="bulk",
+            dst=dst,
+            filename=filename,
+            test_id=test_id or "TEST",
+            content_hash=content_hash,
+        )
+
     try:
         df = pd.read_csv(dst, low_memory=False)
         age_col = resolve_single_column(df.columns, "age", SOC_DEMO_COLUMN_ALIASES["age"])
@@ -1667,31 +1315,17 @@ async def upload_bulk_csv(
     if df.empty:
         _raise_api_error(400, "CSV does not contain valid values in the 'userid' column.", error_code="INVALID_USERID_VALUES")
 
-    soc_rows = _read_soc_demo_rows_by_user(df, "_user_id_norm")
-    base_session_id = infer_session_id_from_filename(file.filename)
-
-    sessions_out: List[Dict[str, Any]] = []
-
-    job_id = _create_upload_job(kind="bulk", filename=filename, test_id=test_id or "TEST")
-    worker = threading.Thread(
-        target=_run_upload_job,
-        args=(job_id,),
-        kwargs={"kind": "bulk", "dst": dst, "filename": filename, "test_id": test_id or "TEST"},
-        daemon=True,
+    return _start_upload_job(
+        kind="bulk",
+        dst=dst,
+        filename=filename,
+        test_id=test_id or "TEST",
+        content_hash=content_hash,
     )
-    worker.start()
-
-    return {
-        "job_id": job_id,
-        "status": "uploaded",
-        "message": "Upload successful.",
-        "test_id": test_id or "TEST",
-        "filename": filename,
-    }
 
 
 @app.get("/api/upload/jobs/{job_id}")
-def get_upload_job(job_id: str):
+async def get_upload_job(job_id: str):
     job = _get_upload_job(job_id)
     if not job:
         raise HTTPException(status_code=404, detail="Upload job not found.")
@@ -1699,14 +1333,20 @@ def get_upload_job(job_id: str):
 
 
 @app.get("/api/sessions")
-def list_sessions(test_id: Optional[str] = None):
-    sessions = STORE.list_sessions(test_id=test_id)
+async def list_sessions(test_id: Optional[str] = None):
+    sessions = await ASYNC_STORE.list_sessions(test_id=test_id)
     return {"sessions": [_serialize_session_payload(session) for session in sessions.values()]}
 
 
+@app.get("/api/search")
+def api_search(q: str = "", test_id: Optional[str] = None, limit: int = 50):
+    limit = max(1, min(limit, SEARCH_MAX_RESULTS))
+    return {"query": q, "results": search_documents(q, test_id=test_id, limit=limit)}
+
+
 @app.get("/api/sessions/{session_id}")
-def get_session(session_id: str):
-    s = STORE.get(session_id)
+async def get_session(session_id: str):
+    s = await _get_session_with_current_metrics(session_id)
     if not s:
         raise HTTPException(status_code=404, detail="Session not found.")
 
@@ -1714,8 +1354,8 @@ def get_session(session_id: str):
 
 
 @app.get("/api/sessions/{session_id}/tasks/{task_id}/metrics")
-def get_task_metrics(session_id: str, task_id: str):
-    s = STORE.get(session_id)
+async def get_task_metrics(session_id: str, task_id: str):
+    s = await _get_session_with_current_metrics(session_id)
     if not s:
         raise HTTPException(status_code=404, detail="Session not found.")
 
@@ -1739,8 +1379,8 @@ def get_task_metrics(session_id: str, task_id: str):
     }
 
 @app.get("/api/sessions/{session_id}/answers-eval")
-def get_session_answers_eval(session_id: str):
-    s = STORE.get(session_id)
+async def get_session_answers_eval(session_id: str):
+    s = await _get_session_with_current_metrics(session_id)
     if not s:
         raise HTTPException(status_code=404, detail="Session not found.")
 
@@ -1757,8 +1397,8 @@ def get_session_answers_eval(session_id: str):
     }
 
 @app.get("/api/sessions/{session_id}/interval-event-ratios")
-def get_session_interval_event_ratios(session_id: str):
-    s = STORE.get(session_id)
+async def get_session_interval_event_ratios(session_id: str):
+    s = await _get_session_with_current_metrics(session_id)
     if not s:
         raise HTTPException(status_code=404, detail="Session not found.")
 
@@ -1774,6 +1414,46 @@ def get_session_interval_event_ratios(session_id: str):
         **payload,
     }
 
+@app.get("/api/sessions/{session_id}/interval-event-ratios/window")
+async def get_session_interval_window_ratios(
+    session_id: str,
+    t0: int,
+    t1: int,
+    task_id: Optional[str] = None,
+    relative: bool = False,
+):
+    if t1 <= t0:
+        raise HTTPException(status_code=400, detail="t1 must be greater than t0.")
+
+    s = await _get_session_with_current_metrics(session_id)
+    if not s:
+        raise HTTPException(status_code=404, detail="Session not found.")
+
+    stats = s.stats if isinstance(s.stats, dict) else {}
+    index = stats.get("interval_index") if isinstance(stats.get("interval_index"), dict) else None
+    if index is None:
+        raise HTTPException(status_code=404, detail="Interval index not available for this session.")
+
+    task_id = str(task_id).strip() if task_id is not None and str(task_id).strip() else None
+    if task_id:
+        task_metrics = stats.get("tasks", {}).get(task_id) if isinstance(stats.get("tasks"), dict) else None
+        if not isinstance(task_metrics, dict):
+            raise HTTPException(status_code=404, detail="Task not found in session.")
+        task_start = int(task_metrics.get("time_min_ms") or 0)
+        task_end = int(task_metrics.get("time_max_ms") or task_start)
+        # Relative windows are offsets from the task start; either way the window is clipped to the task.
+        if relative:
+            t0, t1 = task_start + t0, task_start + t1
+        t0, t1 = max(t0, task_start), min(t1, task_end)
+        t1 = max(t0, t1)
+
+    return {
+        "session_id": s.session_id,
+        "user_id": s.user_id,
+        "test_id": getattr(s, "test_id", "TEST") or "TEST",
+        **interval_ratios_for_window(index, t0, t1, task_id),
+    }
+
 @app.get("/api/sessions/{session_id}/events")
 def get_session_events(session_id: str):
     s = STORE.get(session_id)
@@ -1806,11 +1486,11 @@ def get_session_events(session_id: str):
 
 
 @app.get("/api/sessions/{session_id}/events/export")
-def export_session_events_gazeplotter_csv(session_id: str):
+def export_session_events_gazeplotter_csv(session_id: str, include_segments: bool = False):
     s = STORE.get(session_id)
     if not s:
         raise HTTPException(status_code=404, detail="Session not found.")
-    segments = _build_gazeplotter_segments_for_session(s)
+    segments = _build_gazeplotter_segments_for_session(s, include_segments)
 
     export_df = pd.DataFrame(segments, columns=["From", "To", "Participant", "Stimulus", "AOI"])
     csv_data = export_df.to_csv(index=False, sep=',')
@@ -1822,14 +1502,14 @@ def export_session_events_gazeplotter_csv(session_id: str):
 
 
 @app.get("/api/tests/{test_id}/sessions/events/export")
-def export_test_events_gazeplotter_csv(test_id: str):
+def export_test_events_gazeplotter_csv(test_id: str, include_segments: bool = False):
     sessions = list(STORE.list_sessions(test_id=test_id).values())
     if not sessions:
         raise HTTPException(status_code=404, detail="No sessions found for this user experiment.")
 
     segments: List[Dict[str, Any]] = []
     for session in sessions:
-        segments.extend(_build_gazeplotter_segments_for_session(session))
+        segments.extend(_build_gazeplotter_segments_for_session(session, include_segments))
 
     export_df = pd.DataFrame(segments, columns=["From", "To", "Participant", "Stimulus", "AOI"])
     csv_data = export_df.to_csv(index=False, sep=',')
@@ -1841,7 +1521,7 @@ def export_test_events_gazeplotter_csv(test_id: str):
 
 
 @app.get("/api/groups/{group_id}/events/export")
-def export_group_events_gazeplotter_csv(group_id: str):
+def export_group_events_gazeplotter_csv(group_id: str, include_segments: bool = False):
     group = next((g for g in list_groups() if g.get("id") == group_id), None)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found.")
@@ -1857,7 +1537,7 @@ def export_group_events_gazeplotter_csv(group_id: str):
 
     segments: List[Dict[str, Any]] = []
     for session in ordered_sessions:
-        segments.extend(_build_gazeplotter_segments_for_session(session))
+        segments.extend(_build_gazeplotter_segments_for_session(session, include_segments))
 
     export_df = pd.DataFrame(segments, columns=["From", "To", "Participant", "Stimulus", "AOI"])
     csv_data = export_df.to_csv(index=False, sep=',')
@@ -1932,6 +1612,8 @@ def api_delete_test_sessions(test_id: str, payload: dict = Body(...)):
         raise HTTPException(status_code=400, detail="session_ids must contain valid values")
 
     deleted_count = delete_sessions(test_id=test_id, session_ids=normalized_ids)
+    if deleted_count:
+        COMPACTOR.request()
     return {
         "test_id": test_id,
         "requested_count": len(normalized_ids),
@@ -1942,6 +1624,8 @@ def api_delete_test_sessions(test_id: str, payload: dict = Body(...)):
 @app.delete("/api/tests/{test_id}/sessions/all")
 def api_delete_all_test_sessions(test_id: str):
     deleted_count = delete_all_sessions_for_test(test_id=test_id)
+    if deleted_count:
+        COMPACTOR.request()
     return {
         "test_id": test_id,
         "deleted_count": deleted_count,
@@ -1949,8 +1633,8 @@ def api_delete_all_test_sessions(test_id: str):
 
 
 @app.get("/api/tests/{test_id}/answers")
-def api_get_test_answers(test_id: str):
-    return {"test_id": test_id, "answers": get_test_answers(test_id)}
+async def api_get_test_answers(test_id: str):
+    return {"test_id": test_id, "answers": await ASYNC_STORE.get_test_answers(test_id)}
 
 
 @app.put("/api/tests/{test_id}/answers/{task_id}")
@@ -1970,7 +1654,7 @@ def api_put_test_answer(
             raise HTTPException(status_code=400, detail="'answer' must be a string or null.")
         updated = set_test_answer(test_id, task_id, answer)
 
-    recalc = _recompute_answers_eval_for_test(test_id)
+    recalc = _recompute_answers_eval_for_test(test_id, [task_id])
 
     return {
         "test_id": test_id,
@@ -2058,20 +1742,20 @@ async def api_upload_test_answers_csv(test_id: str, file: UploadFile = File(...)
         answer_text = str(answer_raw).strip() if answer_raw is not None else ""
         updates[task_id] = answer_text if answer_text else None
 
-    updated_answers = set_test_answers_bulk(test_id, updates)
-    recalc = _recompute_answers_eval_for_test(test_id)
+    updated_answers = await asyncio.to_thread(set_test_answers_bulk, test_id, updates)
+    job_id = _start_answers_rescore_job(test_id=test_id, filename=file.filename or "", task_ids=list(updates))
     return {
         "test_id": test_id,
         "rows_total": total_rows,
         "rows_valid": len(updates),
         "answers": updated_answers,
-        "recalculation": recalc,
+        "job_id": job_id,
     }
 
 
 @app.get("/api/tests/{test_id}/settings")
-def api_get_test_settings(test_id: str):
-    settings = get_test_settings(test_id)
+async def api_get_test_settings(test_id: str):
+    settings = await ASYNC_STORE.get_test_settings(test_id)
     return {
         "test_id": test_id,
         "name": settings.get("name"),
@@ -2079,9 +1763,37 @@ def api_get_test_settings(test_id: str):
     }
 
 
+@app.get("/api/tests/{test_id}/aggregate")
+async def api_test_aggregate(test_id: str):
+    normalized_test_id = str(test_id or "").strip() or "TEST"
+    if normalized_test_id not in {test["id"] for test in await ASYNC_STORE.list_tests()}:
+        raise HTTPException(status_code=404, detail="Test not found.")
+
+    version = await ASYNC_STORE.get_test_version(normalized_test_id)
+    aggregate = await _stored_metric_aggregate(normalized_test_id, "test", normalized_test_id, version)
+    return {
+        "test_id": normalized_test_id,
+        **summarize_aggregate(aggregate),
+    }
+
+
+@app.get("/api/tests/{test_id}/transitions")
+async def api_test_transitions(test_id: str, task_id: Optional[str] = None):
+    normalized_test_id = str(test_id or "").strip() or "TEST"
+    if normalized_test_id not in {test["id"] for test in await ASYNC_STORE.list_tests()}:
+        raise HTTPException(status_code=404, detail="Test not found.")
+
+    transitions = await ASYNC_STORE.list_session_transitions(test_id=normalized_test_id)
+    task_id = str(task_id).strip() if task_id is not None and str(task_id).strip() else None
+    return {
+        "test_id": normalized_test_id,
+        **(await asyncio.to_thread(sum_transitions, transitions, task_id)),
+    }
+
+
 @app.get("/api/tests")
-def api_list_tests():
-    return {"tests": list_tests()}
+async def api_list_tests():
+    return {"tests": await ASYNC_STORE.list_tests()}
 
 
 @app.post("/api/tests")
@@ -2122,10 +1834,12 @@ def api_update_test_settings(test_id: str, payload: dict = Body(...)):
 
 
 @app.delete("/api/tests/{test_id}")
-def api_delete_test(test_id: str):
-    deleted = delete_test(test_id=test_id)
+async def api_delete_test(test_id: str):
+    deleted = await asyncio.to_thread(delete_test, test_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="User experiment not found.")
+    await ASYNC_STORE.drop_shard(test_id)
+    COMPACTOR.request()
     return {
         "test_id": test_id,
         "deleted": True,
@@ -2133,8 +1847,8 @@ def api_delete_test(test_id: str):
 
 
 @app.get("/api/groups")
-def api_list_groups(test_id: Optional[str] = None):
-    groups = list_groups(test_id=test_id)
+async def api_list_groups(test_id: Optional[str] = None):
+    groups = await ASYNC_STORE.list_groups(test_id=test_id)
 
     all_session_ids = [
         str(session_id).strip()
@@ -2142,7 +1856,7 @@ def api_list_groups(test_id: Optional[str] = None):
         for session_id in (group.get("session_ids", []) if isinstance(group.get("session_ids"), list) else [])
         if isinstance(session_id, str) and str(session_id).strip()
     ]
-    sessions_by_id = STORE.list_sessions(session_ids=list(dict.fromkeys(all_session_ids)))
+    sessions_by_id = await ASYNC_STORE.list_sessions(session_ids=list(dict.fromkeys(all_session_ids)))
     return {
         "groups": [
             {
@@ -2169,10 +1883,10 @@ def api_export_group_csv(group_id: str):
     if not session_ids:
         raise HTTPException(status_code=400, detail="Group contains no sessions.")
 
-    csv_frames: List[pd.DataFrame] = []
-    user_id_values: List[str] = []
+    sources: List[tuple[str, SessionData, Path]] = []
     all_columns: List[str] = []
 
+    # Headers first, so chunks from every session can be written with one shared column order.
     for sid in session_ids:
         session = STORE.get(sid)
         if not session:
@@ -2183,44 +1897,45 @@ def api_export_group_csv(group_id: str):
             continue
 
         try:
-            df = pd.read_csv(csv_path, dtype=str, keep_default_na=False)
+            header_df = pd.read_csv(csv_path, dtype=str, nrows=0)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Cannot load CSV for session '{sid}': {e}")
 
-        if df.empty:
-            continue
+        sources.append((sid, session, csv_path))
+        for col in header_df.columns:
+            if col not in all_columns:
+                all_columns.append(col)
 
-        user_col = get_user_id_column(df)
-        user_id = _normalize_user_id(session.user_id)
-        if not user_id and user_col and not df.empty:
-            user_id = _normalize_user_id(df.iloc[0].get(user_col))
+    output = StringIO()
+    rows_written = 0
 
-        if user_col and user_id:
-            filtered = df[df[user_col].astype(str).str.strip() == user_id]
-        elif user_col:
-            filtered = df
-        else:
-            filtered = df
+    for sid, session, csv_path in sources:
+        user_id = _normalize_user_id(session.user_id)
+        try:
+            with pd.read_csv(csv_path, dtype=str, keep_default_na=False, chunksize=EXPORT_CSV_CHUNK_ROWS) as reader:
+                for df in reader:
+                    if df.empty:
+                        continue
 
-        if filtered.empty:
-            continue
+                    user_col = get_user_id_column(df)
+                    if not user_id and user_col:
+                        user_id = _normalize_user_id(df.iloc[0].get(user_col))
 
-        csv_frames.append(filtered)
-        if user_id:
-            user_id_values.append(user_id)
-        for col in filtered.columns:
-            if col not in all_columns:
-                all_columns.append(col)
+                    if user_col and user_id:
+                        filtered = df[df[user_col].astype(str).str.strip() == user_id]
+                    else:
+                        filtered = df
 
-    if not csv_frames:
-        raise HTTPException(status_code=404, detail="No CSV data found for this group.")
+                    if filtered.empty:
+                        continue
 
-    export_df = pd.concat(csv_frames, ignore_index=True, sort=False)
-    if all_columns:
-        export_df = export_df.reindex(columns=all_columns)
+                    filtered.reindex(columns=all_columns).to_csv(output, index=False, header=rows_written == 0)
+                    rows_written += len(filtered)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Cannot load CSV for session '{sid}': {e}")
 
-    output = StringIO()
-    export_df.to_csv(output, index=False)
+    if not rows_written:
+        raise HTTPException(status_code=404, detail="No CSV data found for this group.")
 
     group_name = str(group.get("name") or group_id)
     filename = f"group_export_{_sanitize_filename_component(group_name)}.csv"
@@ -2229,20 +1944,37 @@ def api_export_group_csv(group_id: str):
 
 
 @app.get("/api/groups/{group_id}/answers")
-def api_group_answers(group_id: str):
-    group = next((g for g in list_groups() if g.get("id") == group_id), None)
+async def api_group_answers(group_id: str):
+    group = await ASYNC_STORE.get_group(group_id)
     if not group:
         raise HTTPException(status_code=404, detail="Group not found.")
 
+    answer_key = await ASYNC_STORE.get_test_answers(str(group.get("test_id") or "TEST"))
+    versions = await ASYNC_STORE.get_group_versions([group["id"]])
+    version = _group_answers_version(versions.get(group["id"]), answer_key)
+    payload = GROUP_ANSWERS_CACHE.get(group["id"], version)
+    if payload is not None:
+        return payload
+
     session_ids = group.get("session_ids", []) if isinstance(group.get("session_ids"), list) else []
-    payload = _build_group_answers_payload({**group, "sessions": _build_group_sessions_payload(session_ids)})
+    sessions_by_id = await ASYNC_STORE.list_sessions(session_ids=session_ids)
+    payload = await asyncio.to_thread(
+        _build_group_answers_payload,
+        {**group, "sessions": _serialize_group_sessions_payload(sessions_by_id, session_ids)},
+        answer_key,
+    )
+    GROUP_ANSWERS_CACHE.put(group["id"], version, payload)
     return payload
 
 
 @app.get("/api/groups/{group_id}/wordcloud")
-def api_group_wordcloud(group_id: str, task_id: Optional[str] = None):
-    answers_payload = api_group_answers(group_id)
-    words = _build_wordcloud_from_group_payload(answers_payload, task_id=task_id)
+async def api_group_wordcloud(group_id: str, task_id: Optional[str] = None):
+    """Answer counts of the group's members. Case and accent variants of an answer (same fold_text form) are
+    merged into one word, shown with its most frequent spelling."""
+    wordclouds = await ASYNC_STORE.get_group_wordclouds([group_id], task_id=task_id, limit=WORDCLOUD_MAX_WORDS)
+    words = wordclouds.get(str(group_id or "").strip())
+    if words is None:
+        raise HTTPException(status_code=404, detail="Group not found.")
     return {
         "group_id": group_id,
         "task_id": task_id,
@@ -2250,6 +1982,217 @@ def api_group_wordcloud(group_id: str, task_id: Optional[str] = None):
     }
 
 
+@app.get("/api/groups/{group_id}/stats")
+async def api_group_stats(group_id: str):
+    group = await ASYNC_STORE.get_group(group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found.")
+
+    session_ids = group.get("session_ids", []) if isinstance(group.get("session_ids"), list) else []
+    sessions_by_id = await ASYNC_STORE.list_sessions(session_ids=session_ids)
+    answer_key = await ASYNC_STORE.get_test_answers(str(group.get("test_id") or "TEST"))
+
+    stats = await asyncio.to_thread(_group_stats, _serialize_group_sessions_payload(sessions_by_id, session_ids), answer_key)
+    return {
+        "group_id": group.get("id"),
+        "test_id": group.get("test_id"),
+        **stats,
+    }
+
+
+async def _stored_metric_aggregate(test_id: str, scope: str, scope_id: str, version: str, session_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Stored aggregate of a test or group, rebuilt from its sessions when the version token moved on."""
+    stored = await ASYNC_STORE.get_metric_aggregate(test_id, scope, scope_id)
+    if stored and stored["version"] == version:
+        return stored["payload"]
+
+    if session_ids is None:
+        sessions_by_id = await ASYNC_STORE.list_sessions(test_id=test_id)
+    else:
+        sessions_by_id = await ASYNC_STORE.list_sessions(session_ids=session_ids)
+    aggregate = aggregate_sessions([session.stats for session in sessions_by_id.values()])
+    await asyncio.to_thread(put_metric_aggregate, test_id, scope, scope_id, version, aggregate)
+    return aggregate
+
+
+async def _group_metric_aggregate(group: Dict[str, Any], version: str) -> Dict[str, Any]:
+    session_ids = group.get("session_ids", []) if isinstance(group.get("session_ids"), list) else []
+    return await _stored_metric_aggregate(str(group.get("test_id") or "TEST"), "group", group["id"], version, session_ids)
+
+
+@app.get("/api/groups/{group_id}/aggregate")
+async def api_group_aggregate(group_id: str):
+    group = await ASYNC_STORE.get_group(group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found.")
+
+    versions = await ASYNC_STORE.get_group_versions([group["id"]])
+    aggregate = await _group_metric_aggregate(group, versions.get(group["id"], ""))
+    return {
+        "group_id": group.get("id"),
+        "test_id": group.get("test_id"),
+        **summarize_aggregate(aggregate),
+    }
+
+
+@app.post("/api/groups/aggregate")
+async def api_groups_union_aggregate(payload: dict = Body(...)):
+    group_ids = payload.get("group_ids", [])
+    if not isinstance(group_ids, list) or not group_ids:
+        raise HTTPException(status_code=400, detail="group_ids must be non-empty list")
+    group_ids = list(dict.fromkeys(str(gid).strip() for gid in group_ids if str(gid or "").strip()))
+
+    groups = [group for group in [await ASYNC_STORE.get_group(gid) for gid in group_ids] if group]
+    if not groups:
+        raise HTTPException(status_code=404, detail="Group not found.")
+
+    member_ids = [sid for group in groups for sid in group.get("session_ids", [])]
+    union_ids = list(dict.fromkeys(member_ids))
+    if len(union_ids) < len(member_ids):
+        # Merged sketches would count shared members twice, so overlapping groups are aggregated from their union.
+        sessions_by_id = await ASYNC_STORE.list_sessions(session_ids=union_ids)
+        aggregate = aggregate_sessions([session.stats for session in sessions_by_id.values()])
+    else:
+        versions = await ASYNC_STORE.get_group_versions([group["id"] for group in groups])
+        aggregate = merge_aggregates([await _group_metric_aggregate(group, versions.get(group["id"], "")) for group in groups])
+
+    return {
+        "group_ids": [group["id"] for group in groups],
+        **summarize_aggregate(aggregate),
+    }
+
+
+@app.get("/api/groups/{group_id}/transitions")
+async def api_group_transitions(group_id: str, task_id: Optional[str] = None):
+    group = await ASYNC_STORE.get_group(group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found.")
+
+    session_ids = group.get("session_ids", []) if isinstance(group.get("session_ids"), list) else []
+    transitions = await ASYNC_STORE.list_session_transitions(session_ids=session_ids)
+    task_id = str(task_id).strip() if task_id is not None and str(task_id).strip() else None
+    return {
+        "group_id": group.get("id"),
+        "test_id": group.get("test_id"),
+        **(await asyncio.to_thread(sum_transitions, transitions, task_id)),
+    }
+
+
+def _group_similarity(
+    sessions: List[SessionData],
+    task_id: Optional[str],
+    algorithm: str,
+    window: Optional[int],
+    max_distance: Optional[float],
+) -> Dict[str, Any]:
+    """Symmetric distance matrix over the sessions; only pairs missing from SIMILARITY_CACHE are computed."""
+    index = {session.session_id: i for i, session in enumerate(sessions)}
+    by_id = {session.session_id: session for session in sessions}
+    matrix: List[List[Optional[float]]] = [
+        [0.0 if i == j else None for j in range(len(sessions))] for i in range(len(sessions))
+    ]
+    stats = {"pairs": 0, "cached": 0, "computed": 0, "pruned": 0, "workers": SIMILARITY_WORKERS}
+
+    def cache_entry(sid_a: str, sid_b: str):
+        key = (sid_a, sid_b, task_id or "", algorithm, window)
+        version = f"{by_id[sid_a].data_version}:{by_id[sid_b].data_version}"
+        return key, version
+
+    pending: List[Tuple[str, str]] = []
+    ordered_ids = sorted(index)
+    for pos, sid_a in enumerate(ordered_ids):
+        for sid_b in ordered_ids[pos + 1:]:
+            stats["pairs"] += 1
+            cached = SIMILARITY_CACHE.get(*cache_entry(sid_a, sid_b))
+            if cached is None:
+                pending.append((sid_a, sid_b))
+                continue
+            distance = cached["distance"]
+            if distance is None and not cached.get("empty"):
+                # Pruned under an earlier threshold; still pruned only if its bound exceeds this one.
+                if max_distance is None or cached["lower_bound"] <= max_distance:
+                    pending.append((sid_a, sid_b))
+                    continue
+                stats["pruned"] += 1
+            elif distance is not None and max_distance is not None and distance > max_distance:
+                distance = None
+                stats["pruned"] += 1
+            matrix[index[sid_a]][index[sid_b]] = matrix[index[sid_b]][index[sid_a]] = distance
+            stats["cached"] += 1
+
+    if pending:
+        needed = sorted({sid for pair in pending for sid in pair})
+        points = {
+            sid: _load_spatial_trace_for_session(by_id[sid], task_id=task_id)["spatial"]["track"]["points"]
+            for sid in needed
+        }
+        tracks = {sid: pts for sid, pts in points.items() if pts}
+        computable = [pair for pair in pending if pair[0] in tracks and pair[1] in tracks]
+        results = compute_pair_distances(
+            computable,
+            tracks,
+            algorithm,
+            window=window,
+            max_distance=max_distance,
+            workers=SIMILARITY_WORKERS,
+        )
+        for (sid_a, sid_b), result in zip(computable, results):
+            # The exact distance is cached even above max_distance, so a looser threshold can reuse it.
+            SIMILARITY_CACHE.put(*cache_entry(sid_a, sid_b), result)
+            distance = result["distance"]
+            if distance is not None and max_distance is not None and distance > max_distance:
+                distance = None
+            matrix[index[sid_a]][index[sid_b]] = matrix[index[sid_b]][index[sid_a]] = distance
+            stats["computed"] += 1
+            stats["pruned"] += 1 if distance is None else 0
+        for sid_a, sid_b in pending:
+            if sid_a not in tracks or sid_b not in tracks:
+                # A session without moveend positions in this task has no trajectory to compare.
+                SIMILARITY_CACHE.put(*cache_entry(sid_a, sid_b), {"distance": None, "lower_bound": 0.0, "empty": True})
+
+    return {
+        "session_ids": [session.session_id for session in sessions],
+        "distances": matrix,
+        "stats": stats,
+    }
+
+
+@app.get("/api/groups/{group_id}/similarity")
+async def api_group_similarity(
+    group_id: str,
+    task_id: Optional[str] = None,
+    algorithm: str = "dtw",
+    window: Optional[int] = None,
+    max_distance: Optional[float] = None,
+):
+    algorithm = str(algorithm or "").strip().lower()
+    if algorithm not in ALGORITHMS:
+        raise HTTPException(status_code=400, detail=f"algorithm must be one of: {', '.join(ALGORITHMS)}")
+    if window is not None and window < 0:
+        raise HTTPException(status_code=400, detail="window must be >= 0")
+    if max_distance is not None and max_distance < 0:
+        raise HTTPException(status_code=400, detail="max_distance must be >= 0")
+
+    group = await ASYNC_STORE.get_group(group_id)
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found.")
+
+    session_ids = group.get("session_ids", []) if isinstance(group.get("session_ids"), list) else []
+    sessions_by_id = await ASYNC_STORE.list_sessions(session_ids=session_ids)
+    sessions = [sessions_by_id[sid] for sid in session_ids if sid in sessions_by_id]
+    task_id = str(task_id).strip() if task_id is not None and str(task_id).strip() else None
+    result = await asyncio.to_thread(_group_similarity, sessions, task_id, algorithm, window, max_distance)
+    return {
+        "group_id": group.get("id"),
+        "test_id": group.get("test_id"),
+        "task_id": task_id,
+        "algorithm": algorithm,
+        "window": window,
+        "max_distance": max_distance,
+        **result,
+    }
+
+
 @app.put("/api/groups/{group_id}/settings")
 def api_update_group_settings(group_id: str, payload: dict = Body(...)):
     name = payload.get("name")
@@ -2274,26 +2217,21 @@ def api_delete_group(group_id: str):
 
 
 @app.post("/api/groups/compare/wordcloud")
-def api_compare_wordcloud(payload: dict = Body(...)):
+async def api_compare_wordcloud(payload: dict = Body(...)):
+    """Word clouds of several groups, merged per fold_text form like /api/groups/{group_id}/wordcloud."""
     group_ids = payload.get("group_ids", [])
     task_id = payload.get("task_id")
     if not isinstance(group_ids, list) or not group_ids:
         raise HTTPException(status_code=400, detail="group_ids must be non-empty list")
 
-    out_groups = []
-    for gid in group_ids:
-        gid_str = str(gid).strip()
-        if not gid_str:
-            continue
-        try:
-            answers_payload = api_group_answers(gid_str)
-        except HTTPException:
-            continue
-        words = _build_wordcloud_from_group_payload(answers_payload, task_id=str(task_id).strip() if isinstance(task_id, str) and task_id.strip() else None)
-        out_groups.append({
-            "group_id": gid_str,
-            "words": words,
-        })
+    normalized_task_id = str(task_id).strip() if isinstance(task_id, str) and task_id.strip() else None
+    requested_ids = [str(gid).strip() for gid in group_ids if str(gid).strip()]
+    wordclouds = await ASYNC_STORE.get_group_wordclouds(requested_ids, task_id=normalized_task_id, limit=WORDCLOUD_MAX_WORDS)
+    out_groups = [
+        {"group_id": gid, "words": wordclouds[gid]}
+        for gid in requested_ids
+        if gid in wordclouds
+    ]
 
     return {
         "task_id": task_id if isinstance(task_id, str) and task_id.strip() else None,
@@ -2301,6 +2239,71 @@ def api_compare_wordcloud(payload: dict = Body(...)):
     }
 
 
+@app.post("/api/groups/compare")
+async def api_compare_groups(payload: dict = Body(...)):
+    group_ids = payload.get("group_ids", [])
+    if not isinstance(group_ids, list) or not group_ids:
+        raise HTTPException(status_code=400, detail="group_ids must be non-empty list")
+    group_ids = list(dict.fromkeys(str(gid).strip() for gid in group_ids if str(gid or "").strip()))
+
+    try:
+        resamples = int(payload.get("resamples", COMPARE_BOOTSTRAP_RESAMPLES))
+        confidence = float(payload.get("confidence", DEFAULT_CONFIDENCE))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="resamples and confidence must be numbers")
+    if not 0 <= resamples <= MAX_BOOTSTRAP_RESAMPLES:
+        raise HTTPException(status_code=400, detail=f"resamples must be between 0 and {MAX_BOOTSTRAP_RESAMPLES}")
+    if not 0 < confidence < 1:
+        raise HTTPException(status_code=400, detail="confidence must be between 0 and 1")
+
+    groups = [group for group in [await ASYNC_STORE.get_group(gid) for gid in group_ids] if group]
+    if not groups:
+        raise HTTPException(status_code=404, detail="Group not found.")
+
+    test_ids = sorted({str(group.get("test_id") or "TEST") for group in groups})
+    answer_keys = {test_id: await ASYNC_STORE.get_test_answers(test_id) for test_id in test_ids}
+    group_versions = await ASYNC_STORE.get_group_versions([group["id"] for group in groups])
+    cache_key = tuple(group["id"] for group in groups)
+    version = json.dumps({
+        "groups": [group_versions.get(group["id"]) for group in groups],
+        "answers": {test_id: _answer_key_version(answer_key) for test_id, answer_key in answer_keys.items()},
+        "bootstrap": [resamples, confidence],
+    })
+
+    compare = GROUP_COMPARE_CACHE.get(cache_key, version)
+    if compare is None:
+        all_session_ids = list(dict.fromkeys(sid for group in groups for sid in group.get("session_ids", [])))
+        sessions_by_id = await ASYNC_STORE.list_sessions(session_ids=all_session_ids)
+        members = []
+        for group in groups:
+            answer_key = answer_keys[str(group.get("test_id") or "TEST")]
+            sessions = _serialize_group_sessions_payload(sessions_by_id, group.get("session_ids", []))
+            answers_version = _group_answers_version(group_versions.get(group["id"]), answer_key)
+            answers = GROUP_ANSWERS_CACHE.get(group["id"], answers_version)
+            if answers is None:
+                answers = await asyncio.to_thread(_build_group_answers_payload, {**group, "sessions": sessions}, answer_key)
+                GROUP_ANSWERS_CACHE.put(group["id"], answers_version, answers)
+            members.append({
+                "id": group["id"],
+                "sessions": await asyncio.to_thread(_with_current_answers_eval, sessions, answer_key),
+                "answers": answers,
+            })
+        compare = await asyncio.to_thread(build_group_compare, members, resamples, confidence)
+        GROUP_COMPARE_CACHE.put(cache_key, version, compare)
+
+    # Names and notes are not part of the version, so they are attached fresh on every request.
+    groups_by_id = {group["id"]: group for group in groups}
+    return {
+        "group_ids": list(cache_key),
+        "task_ids": compare["task_ids"],
+        "groups": [
+            {**item, "name": groups_by_id[item["group_id"]].get("name"), "test_id": groups_by_id[item["group_id"]].get("test_id")}
+            for item in compare["groups"]
+        ],
+        "bootstrap": compare["bootstrap"],
+    }
+
+
 @app.post("/api/groups")
 def api_create_group(payload: dict = Body(...)):
     name = str(payload.get("name", "")).strip()
@@ -0,0 +1,129 @@
+"""
+Background compaction for upload files and database storage.
+Deleting sessions or tests only removes rows, so this job sweeps UPLOAD_DIR for files no session references.
+It also clears registered derived caches and runs incremental VACUUM so disk use stays bounded.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.config import (
+    UPLOAD_DIR,
+    COMPACTION_INTERVAL_MINUTES,
+    UPLOAD_GC_GRACE_MINUTES,
+)
+from app.storage import compact_databases, list_session_file_paths
+
+logger = logging.getLogger(__name__)
+
+# Derived caches register a pruner here; each returns how many entries it removed.
+COMPACTION_HOOKS: List[Callable[[], int]] = []
+
+
+def register_compaction_hook(hook: Callable[[], int]) -> Callable[[], int]:
+    COMPACTION_HOOKS.append(hook)
+    return hook
+
+
+def remove_orphaned_uploads(
+    *,
+    protected_paths: Iterable[str] = (),
+    grace_seconds: int = UPLOAD_GC_GRACE_MINUTES * 60,
+) -> Dict[str, int]:
+    """Delete upload files that no session references and that are older than the grace period."""
+    referenced = {str(Path(p).resolve()) for p in list_session_file_paths() if p}
+    referenced.update(str(Path(p).resolve()) for p in protected_paths if p)
+    cutoff = time.time() - grace_seconds
+
+    files_removed = 0
+    bytes_freed = 0
+    if not UPLOAD_DIR.exists():
+        return {"files_removed": 0, "bytes_freed": 0}
+
+    for path in UPLOAD_DIR.rglob("*"):
+        if not path.is_file():
+            continue
+        resolved = str(path.resolve())
+        if resolved in referenced:
+            continue
+        try:
+            stat = path.stat()
+            # recent files may belong to an upload that is still being processed
+            if stat.st_mtime > cutoff:
+                continue
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        except OSError:
+            logger.warning("Could not remove orphaned upload", extra={"path": resolved})
+            continue
+        files_removed += 1
+        bytes_freed += stat.st_size
+
+    return {"files_removed": files_removed, "bytes_freed": bytes_freed}
+
+
+def run_compaction(*, protected_paths: Iterable[str] = ()) -> Dict[str, Any]:
+    uploads = remove_orphaned_uploads(protected_paths=protected_paths)
+
+    cache_entries_removed = 0
+    for hook in COMPACTION_HOOKS:
+        try:
+            cache_entries_removed += int(hook() or 0)
+        except Exception:
+            logger.exception("Compaction hook failed", extra={"hook": getattr(hook, "__name__", repr(hook))})
+
+    databases_vacuumed = compact_databases()
+    return {
+        **uploads,
+        "cache_entries_removed": cache_entries_removed,
+        "databases_vacuumed": databases_vacuumed,
+    }
+
+
+class CompactionWorker:
+    """Daemon thread that compacts on an interval, or sooner when request() is called."""
+
+    def __init__(
+        self,
+        *,
+        interval_seconds: int = COMPACTION_INTERVAL_MINUTES * 60,
+        protected_paths: Optional[Callable[[], Iterable[str]]] = None,
+    ) -> None:
+        self._interval_seconds = interval_seconds
+        self._protected_paths = protected_paths or (lambda: ())
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="storage-compaction", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def request(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self._interval_seconds)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                self.last_result = run_compaction(protected_paths=list(self._protected_paths()))
+                logger.info("Storage compaction finished", extra={"result": self.last_result})
+            except Exception:
+                logger.exception("Storage compaction failed")
@@ -0,0 +1,87 @@
+"""
+Background recomputation of sessions whose stats were computed by older metric plugin versions.
+Each sweep walks stale sessions in session_id order, one batch at a time, and hands each to a refresh callback.
+Single-session reads refresh lazily on their own, so the sweeper only has to keep list and group views current.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+from app.analysis.engine import metrics_version
+from app.config import METRICS_SWEEP_BATCH_SIZE, METRICS_SWEEP_INTERVAL_MINUTES
+from app.storage import STORE, SessionData
+
+logger = logging.getLogger(__name__)
+
+
+def sweep_stale_sessions(
+    refresh: Callable[[SessionData], Any],
+    *,
+    batch_size: int = METRICS_SWEEP_BATCH_SIZE,
+    stop: Optional[threading.Event] = None,
+) -> Dict[str, int]:
+    """Refresh every stale session once; sessions that fail are marked and skipped until re-upload or a plugin change."""
+    current = metrics_version()
+    cursor: Optional[str] = None
+    refreshed = 0
+    failed = 0
+
+    while not (stop and stop.is_set()):
+        batch = STORE.list_stale_sessions(current, after_session_id=cursor, limit=batch_size)
+        for session in batch:
+            try:
+                refresh(session)
+                refreshed += 1
+            except Exception:
+                failed += 1
+                logger.exception("Metrics refresh failed", extra={"session_id": session.session_id})
+        if len(batch) < batch_size:
+            break
+        cursor = batch[-1].session_id
+
+    return {"refreshed": refreshed, "failed": failed}
+
+
+class MetricsSweeper:
+    """Daemon thread that sweeps at start-up and then on an interval, or sooner when request() is called."""
+
+    def __init__(
+        self,
+        refresh: Callable[[SessionData], Any],
+        *,
+        interval_seconds: int = METRICS_SWEEP_INTERVAL_MINUTES * 60,
+    ) -> None:
+        self._refresh = refresh
+        self._interval_seconds = interval_seconds
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_result: Optional[Dict[str, int]] = None
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def request(self) -> None:
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.last_result = sweep_stale_sessions(self._refresh, stop=self._stop)
+                if self.last_result["refreshed"] or self.last_result["failed"]:
+                    logger.info("Metrics sweep finished", extra={"result": self.last_result})
+            except Exception:
+                logger.exception("Metrics sweep failed")
+            self._wake.wait(self._interval_seconds)
+            self._wake.clear()
@@ -8,9 +8,11 @@ Output is a canonical country name whenever a reliable match is found.
 from __future__ import annotations
 
 import re
+import threading
 import unicodedata
+from collections import OrderedDict
 from difflib import get_close_matches
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 try:
     import pycountry  # type: ignore
@@ -94,33 +96,102 @@ for alias, canonical_country in _DEMONYM_ALIASES.items():
 
 _KNOWN_TOKENS = sorted(_COUNTRY_BY_TOKEN.keys())
 
+# Canonical country per normalized token (None when nothing matched), shared by single and batch lookups.
+_MEMO_MAX_ENTRIES = 4096
+_memo: "OrderedDict[str, Optional[str]]" = OrderedDict()
+_memo_lock = threading.Lock()
+_MISSING = object()
+
+
+def _memo_get(token: str) -> Any:
+    with _memo_lock:
+        if token not in _memo:
+            return _MISSING
+        _memo.move_to_end(token)
+        return _memo[token]
+
+
+def _memo_put(token: str, canonical: Optional[str]) -> None:
+    with _memo_lock:
+        _memo[token] = canonical
+        _memo.move_to_end(token)
+        while len(_memo) > _MEMO_MAX_ENTRIES:
+            _memo.popitem(last=False)
+
+
+def _lookup_pycountry(value: str) -> Optional[str]:
+    # pycountry lookup catches exact identifiers not covered in local alias map
+    if pycountry is None:
+        return None
+    try:
+        looked_up = pycountry.countries.lookup(value)
+    except Exception:
+        return None
+    return str(getattr(looked_up, "name", "")).strip() or None
+
+
+def _close_match(token: str) -> Optional[str]:
+    close = get_close_matches(token, _KNOWN_TOKENS, n=1, cutoff=0.8)
+    return _COUNTRY_BY_TOKEN[close[0]] if close else None
+
+
+def _resolve_tokens(raw_by_token: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Canonical country for tokens missing from the memo: aliases, pycountry, then one fuzzy cdist over the rest."""
+    out: Dict[str, Optional[str]] = {}
+    fuzzy: List[str] = []
+    for token, raw in raw_by_token.items():
+        canonical = _COUNTRY_BY_TOKEN.get(token) or _lookup_pycountry(raw)
+        if canonical:
+            out[token] = canonical
+        else:
+            fuzzy.append(token)
+
+    if fuzzy and process is not None and fuzz is not None and _KNOWN_TOKENS:
+        scores = process.cdist(fuzzy, _KNOWN_TOKENS, scorer=fuzz.WRatio, score_cutoff=86)
+        best = scores.argmax(axis=1)
+        for row, token in enumerate(fuzzy):
+            if scores[row, best[row]] > 0:
+                out[token] = _COUNTRY_BY_TOKEN[_KNOWN_TOKENS[best[row]]]
+
+    for token in fuzzy:
+        if token not in out:
+            out[token] = _close_match(token)
+    for token, canonical in out.items():
+        _memo_put(token, canonical)
+    return out
+
+
 """Normalize free-text nationality values to canonical country names."""
 def normalize_nationality(value: Any) -> Optional[str]:
     token = _normalize_token(value)
     if not token:
         return None
 
-    direct = _COUNTRY_BY_TOKEN.get(token)
-    if direct:
-        return direct
+    canonical = _memo_get(token)
+    if canonical is _MISSING:
+        canonical = _resolve_tokens({token: str(value).strip()})[token]
+    return canonical or str(value).strip() or None
 
-    # pycountry lookup catches exact identifiers not covered in local alias map
-    if pycountry is not None:
-        try:
-            looked_up = pycountry.countries.lookup(str(value).strip())
-            looked_up_name = str(getattr(looked_up, "name", "")).strip()
-            if looked_up_name:
-                return looked_up_name
-        except Exception:
-            pass
-
-    if process is not None and fuzz is not None and _KNOWN_TOKENS:
-        matched = process.extractOne(token, _KNOWN_TOKENS, scorer=fuzz.WRatio, score_cutoff=86)
-        if matched:
-            return _COUNTRY_BY_TOKEN[matched[0]]
 
-    close = get_close_matches(token, _KNOWN_TOKENS, n=1, cutoff=0.8)
-    if close:
-        return _COUNTRY_BY_TOKEN[close[0]]
+def normalize_nationalities(values: Iterable[Any]) -> List[Optional[str]]:
+    """normalize_nationality over a whole column; each distinct unseen token is resolved once, fuzzy misses in one batch."""
+    values = list(values)
+    tokens = [_normalize_token(value) for value in values]
 
-    return str(value).strip() or None
\ No newline at end of file
+    known: Dict[str, Optional[str]] = {}
+    missing: Dict[str, str] = {}
+    for value, token in zip(values, tokens):
+        if not token or token in known or token in missing:
+            continue
+        canonical = _memo_get(token)
+        if canonical is _MISSING:
+            missing[token] = str(value).strip()
+        else:
+            known[token] = canonical
+    if missing:
+        known.update(_resolve_tokens(missing))
+
+    return [
+        (known[token] or str(value).strip() or None) if token else None
+        for value, token in zip(values, tokens)
+    ]
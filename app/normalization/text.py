@@ -0,0 +1,22 @@
+"""
+Text folding shared by answer evaluation and the search index.
+Values are lowercased, stripped of diacritics and reduced to ASCII letters, digits and single spaces.
+Both sides of a comparison or search must be folded the same way, so this is the only implementation.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from typing import Any
+
+
+def fold_text(value: Any) -> str:
+    text = str(value or "").strip().lower()
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip()
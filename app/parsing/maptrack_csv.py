@@ -304,6 +304,11 @@ def _normalize_task_id(v: Any) -> Optional[str]:
         return "00"
     return s
 
+def normalize_task_series(values: pd.Series) -> pd.Series:
+    """_normalize_task_id over a whole column in one pass; missing values come back as None."""
+    normalized = [_normalize_task_id(value) for value in values.to_numpy(dtype=object)]
+    return pd.Series(normalized, index=values.index, dtype=object)
+
 def _resolve_row_task_id(row: pd.Series, current_task: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
     event_name = str(row.get("event_name", "")).strip()
     parsed = parse_event_detail(event_name, row.get("event_detail"))
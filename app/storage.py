@@ -1,7 +1,7 @@
 
 """
 Persistence layer for experiments, sessions, groups, and answer data.
-The module defines SQLAlchemy models, schema bootstrapping, and compatibility migrations.
+The module defines SQLAlchemy models, schema bootstrapping, and versioned schema migrations.
 It exposes a store API used by the FastAPI layer for reads and writes.
 """
 
@@ -9,23 +9,47 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List
+import hashlib
 import json
 import os
+import re
 import threading
+import time
 
 from sqlalchemy import String, Text, create_engine, select, delete, update, event, inspect, text, func, Integer, cast
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker, selectinload
+from sqlalchemy import Boolean, Float, Index, bindparam
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship, sessionmaker, selectinload, Session
 from sqlalchemy.types import JSON
-from sqlalchemy.schema import ForeignKey
-
-from app.config import DATA_DIR, DB_PATH, UPLOAD_DIR
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.schema import ForeignKey, UniqueConstraint
+
+from app.analysis.answers import AnswerScorer, answers_eval_payload, is_match, prepare_sessions, session_answers
+from app.normalization.text import fold_text
+from app.config import (
+    DATA_DIR,
+    DB_PATH,
+    UPLOAD_DIR,
+    SHARD_DIR,
+    STORAGE_SHARDING,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT_SECONDS,
+    DB_POOL_RECYCLE_SECONDS,
+    ANSWER_MATCH_THRESHOLD,
+)
 
 TEST_ANSWERS_FILE = DATA_DIR / "test_answers.json"
 GROUPS_FILE = DATA_DIR / "groups.json"
 DEFAULT_TEST_ID = os.getenv("DEFAULT_TEST_ID", "TEST")
 
 
+# Plain JSON on SQLite, binary JSONB on PostgreSQL so stats can be GIN-indexed.
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+
+
 @dataclass
 class SessionData:
     session_id: str
@@ -34,6 +58,9 @@ class SessionData:
     user_id: Optional[str]
     task: Optional[str]
     stats: Dict[str, Any]
+    metrics_version: Optional[str] = None
+    data_version: int = 0
+    metrics_failed_version: Optional[str] = None
 
 
 class Base(DeclarativeBase):
@@ -72,7 +99,13 @@ class SessionRecord(Base):
     file_path: Mapped[str] = mapped_column(Text())
     user_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
     task: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
-    stats: Mapped[Dict[str, Any]] = mapped_column(JSON, default=dict)
+    stats: Mapped[Dict[str, Any]] = mapped_column(JSONDocument, default=dict)
+    # Bumped on every stats rewrite so derived caches can tell when a session changed.
+    data_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+    # Metric plugin versions the stats were computed with; NULL for sessions stored before versioning.
+    metrics_version: Mapped[Optional[str]] = mapped_column(String(255), nullable=True, index=True)
+    # Metrics version whose refresh failed (e.g. CSV gone); the session is not retried until it changes or is re-uploaded.
+    metrics_failed_version: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
 
 
 class TestAnswerRecord(Base):
@@ -87,6 +120,27 @@ class TestAnswerRecord(Base):
     answer: Mapped[str] = mapped_column(Text())
 
 
+class AnswerEvalRecord(Base):
+    """One session's answer to one task, scored against the current answer key of its test."""
+    __tablename__ = "answer_evals"
+    __table_args__ = (Index("ix_answer_evals_test_task", "test_id", "task_id"),)
+
+    session_id: Mapped[str] = mapped_column(
+        String(255),
+        ForeignKey("sessions.session_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    task_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    test_id: Mapped[str] = mapped_column(String(100))
+    answer: Mapped[str] = mapped_column(Text())
+    # fold_text(answer); a key change scores each distinct folded answer of a task once.
+    answer_folded: Mapped[str] = mapped_column(Text())
+    correct_answer: Mapped[Optional[str]] = mapped_column(Text(), nullable=True)
+    # Correctness under the threshold at scoring time; reads re-apply the configured threshold to similarity_score.
+    is_correct: Mapped[bool] = mapped_column(Boolean, default=False)
+    similarity_score: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+
+
 class GroupRecord(Base):
     __tablename__ = "groups"
 
@@ -99,6 +153,8 @@ class GroupRecord(Base):
     )
     name: Mapped[str] = mapped_column(String(255))
     note: Mapped[Optional[str]] = mapped_column(Text(), nullable=True)
+    # Bumped whenever the member list is rewritten.
+    membership_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
 
     session_links: Mapped[List["GroupSessionRecord"]] = relationship(
         back_populates="group",
@@ -123,6 +179,70 @@ class GroupSessionRecord(Base):
     group: Mapped[GroupRecord] = relationship(back_populates="session_links")
 
 
+class SessionRouteRecord(Base):
+    """Catalog entry pointing a session to the shard of its test (sharded mode only)."""
+    __tablename__ = "session_routes"
+
+    session_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    test_id: Mapped[str] = mapped_column(String(100), index=True)
+
+
+class GroupRouteRecord(Base):
+    """Catalog entry pointing a group to the shard of its test (sharded mode only)."""
+    __tablename__ = "group_routes"
+
+    group_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    test_id: Mapped[str] = mapped_column(String(100), index=True)
+
+
+class UploadIngestRecord(Base):
+    """Upload content already ingested into a test, with the job result it produced."""
+    __tablename__ = "upload_ingests"
+
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    test_id: Mapped[str] = mapped_column(String(100), primary_key=True)
+    kind: Mapped[str] = mapped_column(String(20), primary_key=True)
+    filename: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    session_ids: Mapped[List[str]] = mapped_column(JSONDocument, default=list)
+    # file_path of each session when recorded; a session re-ingested from another upload no longer matches.
+    session_files: Mapped[Dict[str, str]] = mapped_column(JSONDocument, default=dict)
+    result: Mapped[Dict[str, Any]] = mapped_column(JSONDocument, default=dict)
+    ingested_at: Mapped[int] = mapped_column(Integer)
+
+
+class SearchDocumentRecord(Base):
+    """Folded searchable text for one session, group or test, kept in the database that holds it."""
+    __tablename__ = "search_documents"
+    __table_args__ = (UniqueConstraint("kind", "ref_id", name="uq_search_documents_kind_ref"),)
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(20))
+    ref_id: Mapped[str] = mapped_column(String(255))
+    test_id: Mapped[str] = mapped_column(String(100), index=True)
+    label: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    body: Mapped[str] = mapped_column(Text(), default="")
+
+
+class MetricAggregateRecord(Base):
+    """Mergeable metric summaries of one test or group, valid while `version` matches its current token."""
+    __tablename__ = "metric_aggregates"
+
+    scope: Mapped[str] = mapped_column(String(20), primary_key=True)
+    scope_id: Mapped[str] = mapped_column(String(255), primary_key=True)
+    test_id: Mapped[str] = mapped_column(String(100), index=True)
+    version: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[Dict[str, Any]] = mapped_column(JSONDocument, default=dict)
+    updated_at: Mapped[int] = mapped_column(Integer)
+
+
+class SchemaMigrationRecord(Base):
+    __tablename__ = "schema_migrations"
+
+    version: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    name: Mapped[str] = mapped_column(String(255))
+    applied_at: Mapped[int] = mapped_column(Integer)
+
+
 def _build_database_url() -> str:
     """Prefer DATABASE_URL when set, otherwise use local SQLite path."""
     configured_url = os.getenv("DATABASE_URL")
@@ -131,22 +251,46 @@ def _build_database_url() -> str:
     return f"sqlite:///{DB_PATH}"
 
 
-DATABASE_URL = _build_database_url()
-_engine_kwargs: Dict[str, Any] = {"future": True}
-if DATABASE_URL.startswith("sqlite"):
-    _engine_kwargs["connect_args"] = {"check_same_thread": False}
+def _build_pool_kwargs(database_url: str) -> Dict[str, Any]:
+    """Pool tuning for server databases; SQLite keeps SQLAlchemy's file-based defaults."""
+    if database_url.startswith("sqlite"):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": True,
+    }
 
-engine = create_engine(DATABASE_URL, **_engine_kwargs)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
 
-if DATABASE_URL.startswith("sqlite"):
-    @event.listens_for(engine, "connect")
+def _enable_sqlite_foreign_keys(target_engine: Engine) -> None:
+    @event.listens_for(target_engine, "connect")
     def _set_sqlite_pragma(dbapi_connection, connection_record) -> None:  # type: ignore[no-untyped-def]
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
         cursor.close()
 
 
+def _create_engine(database_url: str) -> Engine:
+    engine_kwargs: Dict[str, Any] = {"future": True, **_build_pool_kwargs(database_url)}
+    if database_url.startswith("sqlite"):
+        engine_kwargs["connect_args"] = {"check_same_thread": False}
+
+    created = create_engine(database_url, **engine_kwargs)
+    if database_url.startswith("sqlite"):
+        _enable_sqlite_foreign_keys(created)
+    return created
+
+
+DATABASE_URL = _build_database_url()
+if STORAGE_SHARDING and not DATABASE_URL.startswith("sqlite"):
+    raise RuntimeError("APP_STORAGE_SHARDING requires the SQLite backend (unset DATABASE_URL).")
+
+engine = _create_engine(DATABASE_URL)
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+
+
 def _normalize_test_answers_data(raw: Any) -> Dict[str, Dict[str, str]]:
     """Coerce legacy JSON answers into {test_id: {task_id: answer}} shape."""
     if not isinstance(raw, dict):
@@ -246,61 +390,574 @@ def _ensure_task(db, test_id: str, task_id: str) -> None:
 _migration_lock = threading.Lock()
 
 
-def _migrate_json_seed_data() -> None:
+@dataclass(frozen=True)
+class _Migration:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+    # Catalog-only migrations are recorded but not executed on per-test shard databases.
+    catalog_only: bool = False
+
+
+def _add_column_if_missing(conn: Connection, table_name: str, column_name: str, ddl: str) -> None:
+    """Additive column change that tolerates databases created by a newer model."""
+    columns = {col["name"] for col in inspect(conn).get_columns(table_name)}
+    if column_name not in columns:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl}"))
+
+
+def _create_base_tables(conn: Connection) -> None:
+    Base.metadata.create_all(
+        bind=conn,
+        tables=[
+            TestRecord.__table__,
+            TaskRecord.__table__,
+            SessionRecord.__table__,
+            TestAnswerRecord.__table__,
+            GroupRecord.__table__,
+            GroupSessionRecord.__table__,
+        ],
+    )
+
+
+def _add_note_columns(conn: Connection) -> None:
+    _add_column_if_missing(conn, "tests", "note", "TEXT")
+    _add_column_if_missing(conn, "groups", "note", "TEXT")
+
+
+def _migrate_json_seed_data(conn: Connection) -> None:
     """One-time migration from JSON seed files into relational tables."""
-    with _migration_lock:
-        with SessionLocal() as db:
-            answers_seed = _load_test_answers_from_json()
-            groups_seed = _load_groups_from_json()
-
-            all_test_ids = set()
-            all_test_ids.update(tid.strip() for tid in answers_seed.keys() if isinstance(tid, str) and tid.strip())
-            all_test_ids.update(str(g.get("test_id") or "").strip() for g in groups_seed if str(g.get("test_id") or "").strip())
-            for test_id in all_test_ids:
-                _ensure_test(db, test_id)
+    with Session(bind=conn, autoflush=False) as db:
+        answers_seed = _load_test_answers_from_json()
+        groups_seed = _load_groups_from_json()
+
+        all_test_ids = set()
+        all_test_ids.update(tid.strip() for tid in answers_seed.keys() if isinstance(tid, str) and tid.strip())
+        all_test_ids.update(str(g.get("test_id") or "").strip() for g in groups_seed if str(g.get("test_id") or "").strip())
+        for test_id in all_test_ids:
+            _ensure_test(db, test_id)
+        db.flush()
+
+        has_answers = db.execute(select(TestAnswerRecord).limit(1)).scalar_one_or_none() is not None
+        if not has_answers:
+            for test_id, answers in answers_seed.items():
+                for task_id, answer in answers.items():
+                    _ensure_task(db, test_id, task_id)
+                    db.add(TestAnswerRecord(test_id=test_id, task_id=task_id, answer=answer))
             db.flush()
 
-            has_answers = db.execute(select(TestAnswerRecord).limit(1)).scalar_one_or_none() is not None
-            if not has_answers:
-                for test_id, answers in answers_seed.items():
-                    for task_id, answer in answers.items():
-                        _ensure_task(db, test_id, task_id)
-                        db.add(TestAnswerRecord(test_id=test_id, task_id=task_id, answer=answer))
-                db.flush()
-
-            has_groups = db.execute(select(GroupRecord).limit(1)).scalar_one_or_none() is not None
-            if not has_groups:
-                for group in groups_seed:
-                    normalized_test_id = _normalize_test_id(group.get("test_id"))
-                    db.add(
-                        GroupRecord(
-                            id=group["id"],
-                            test_id=normalized_test_id,
-                            name=group["name"],
-                        )
+        has_groups = db.execute(select(GroupRecord).limit(1)).scalar_one_or_none() is not None
+        if not has_groups:
+            for group in groups_seed:
+                normalized_test_id = _normalize_test_id(group.get("test_id"))
+                db.add(
+                    GroupRecord(
+                        id=group["id"],
+                        test_id=normalized_test_id,
+                        name=group["name"],
                     )
-                db.flush()
+                )
+            db.flush()
 
-            db.commit()
+
+def _use_postgres_jsonb_stats(conn: Connection) -> None:
+    """Move stats to JSONB with a GIN index; SQLite keeps its JSON text column."""
+    if conn.dialect.name != "postgresql":
+        return
+    stats_type = conn.execute(
+        text(
+            "SELECT data_type FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = 'sessions' AND column_name = 'stats'"
+        )
+    ).scalar_one_or_none()
+    if stats_type == "json":
+        conn.execute(text("ALTER TABLE sessions ALTER COLUMN stats TYPE JSONB USING stats::jsonb"))
+    conn.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_sessions_stats_gin ON sessions USING gin (stats jsonb_path_ops)")
+    )
+
+
+def _add_version_columns(conn: Connection) -> None:
+    _add_column_if_missing(conn, "sessions", "data_version", "INTEGER NOT NULL DEFAULT 0")
+    _add_column_if_missing(conn, "groups", "membership_version", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _add_metrics_version_column(conn: Connection) -> None:
+    _add_column_if_missing(conn, "sessions", "metrics_version", "VARCHAR(255)")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sessions_metrics_version ON sessions (metrics_version)"))
+    _add_column_if_missing(conn, "sessions", "metrics_failed_version", "VARCHAR(255)")
+
+
+def _create_metric_aggregates_table(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn, tables=[MetricAggregateRecord.__table__])
+
+
+def _create_shard_route_tables(conn: Connection) -> None:
+    Base.metadata.create_all(
+        bind=conn,
+        tables=[SessionRouteRecord.__table__, GroupRouteRecord.__table__],
+    )
+
+
+def _create_upload_ingests_table(conn: Connection) -> None:
+    Base.metadata.create_all(bind=conn, tables=[UploadIngestRecord.__table__])
+
+
+def _create_answer_evals_table(conn: Connection) -> None:
+    """answer_evals backfilled from the answers stored in each session's stats."""
+    Base.metadata.create_all(bind=conn, tables=[AnswerEvalRecord.__table__])
+    with Session(bind=conn, autoflush=False) as db:
+        answer_keys: Dict[str, Dict[str, str]] = {}
+        for row in db.execute(select(TestAnswerRecord)).scalars():
+            answer_keys.setdefault(row.test_id, {})[row.task_id] = row.answer
+        rows = db.execute(select(SessionRecord)).scalars().all()
+        scorers: Dict[str, AnswerScorer] = {}
+        for test_id in {row.test_id for row in rows}:
+            scorers[test_id] = AnswerScorer(answer_keys.get(test_id, {}), ANSWER_MATCH_THRESHOLD)
+            prepare_sessions(scorers[test_id], (_stats_answers(row) for row in rows if row.test_id == test_id))
+        for row in rows:
+            _put_answer_evals(db, row, scorers[row.test_id])
+        db.flush()
+
+
+def _create_search_index(conn: Connection) -> None:
+    """search_documents plus FTS5 (SQLite) or a tsvector GIN index (PostgreSQL), backfilled from sessions and groups."""
+    Base.metadata.create_all(bind=conn, tables=[SearchDocumentRecord.__table__])
+    if conn.dialect.name == "sqlite":
+        # External-content FTS table; triggers keep it in step with search_documents.
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_documents_fts "
+            "USING fts5(body, content='search_documents', content_rowid='id')"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_documents_ai AFTER INSERT ON search_documents BEGIN "
+            "INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_documents_ad AFTER DELETE ON search_documents BEGIN "
+            "INSERT INTO search_documents_fts(search_documents_fts, rowid, body) VALUES ('delete', old.id, old.body); END"
+        ))
+        conn.execute(text(
+            "CREATE TRIGGER IF NOT EXISTS search_documents_au AFTER UPDATE ON search_documents BEGIN "
+            "INSERT INTO search_documents_fts(search_documents_fts, rowid, body) VALUES ('delete', old.id, old.body); "
+            "INSERT INTO search_documents_fts(rowid, body) VALUES (new.id, new.body); END"
+        ))
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_search_documents_tsv "
+            "ON search_documents USING gin (to_tsvector('simple', body))"
+        ))
+
+    with Session(bind=conn, autoflush=False) as db:
+        for row in db.execute(select(SessionRecord)).scalars():
+            _index_session(db, row)
+        for group in db.execute(select(GroupRecord)).scalars():
+            _index_group(db, group)
+        db.flush()
+
+
+def _index_test_notes(conn: Connection) -> None:
+    with Session(bind=conn, autoflush=False) as db:
+        for row in db.execute(select(TestRecord)).scalars():
+            _index_test(db, row)
+        db.flush()
+
+
+# Ordered schema history. Append new entries with the next version number;
+# never edit or reorder entries that may already be applied somewhere.
+MIGRATIONS: List[_Migration] = [
+    _Migration(1, "create_base_tables", _create_base_tables),
+    _Migration(2, "add_note_columns", _add_note_columns),
+    _Migration(3, "consume_json_seed_data", _migrate_json_seed_data, catalog_only=True),
+    _Migration(4, "postgres_jsonb_stats", _use_postgres_jsonb_stats),
+    _Migration(5, "create_shard_routes", _create_shard_route_tables, catalog_only=True),
+    _Migration(6, "create_upload_ingests", _create_upload_ingests_table, catalog_only=True),
+    _Migration(7, "create_search_index", _create_search_index),
+    _Migration(8, "index_test_notes", _index_test_notes, catalog_only=True),
+    _Migration(9, "add_version_columns", _add_version_columns),
+    _Migration(10, "add_metrics_version", _add_metrics_version_column),
+    _Migration(11, "create_metric_aggregates", _create_metric_aggregates_table),
+    _Migration(12, "create_answer_evals", _create_answer_evals_table),
+]
+SCHEMA_VERSION = MIGRATIONS[-1].version
+
+
+def _current_schema_version(target_engine: Engine) -> Optional[int]:
+    """Single cheap query used to skip reflection when the schema is current."""
+    try:
+        with target_engine.connect() as conn:
+            return conn.execute(select(func.max(SchemaMigrationRecord.version))).scalar_one_or_none()
+    except SQLAlchemyError:
+        return None
+
+
+# Arbitrary constant identifying the schema upgrade among PostgreSQL advisory locks.
+_MIGRATION_ADVISORY_LOCK_KEY = 4_271_026
+# How long a second worker waits for the SQLite write lock while another one migrates.
+_MIGRATION_BUSY_TIMEOUT_MS = 10 * 60 * 1000
+# pysqlite's default connect timeout, restored before the connection goes back to the pool.
+_SQLITE_BUSY_TIMEOUT_MS = 5000
+
+
+def _lock_for_migrations(conn: Connection) -> None:
+    """Hold a database-wide lock until the transaction ends, so workers in other processes migrate one at a time."""
+    if conn.dialect.name == "sqlite":
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {_MIGRATION_BUSY_TIMEOUT_MS}")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    elif conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": _MIGRATION_ADVISORY_LOCK_KEY})
+
+
+def _apply_pending_migrations(target_engine: Engine, *, is_shard: bool = False) -> None:
+    """Apply missing migrations in one transaction; versions are re-read under the lock, after any other worker's upgrade."""
+    is_sqlite = target_engine.dialect.name == "sqlite"
+    with target_engine.connect() as conn:
+        try:
+            with conn.begin():
+                _lock_for_migrations(conn)
+                SchemaMigrationRecord.__table__.create(bind=conn, checkfirst=True)
+                applied = set(conn.execute(select(SchemaMigrationRecord.version)).scalars().all())
+
+                for migration in MIGRATIONS:
+                    if migration.version in applied:
+                        continue
+                    if not (is_shard and migration.catalog_only):
+                        migration.apply(conn)
+                    conn.execute(
+                        SchemaMigrationRecord.__table__.insert().values(
+                            version=migration.version,
+                            name=migration.name,
+                            applied_at=int(time.time()),
+                        )
+                    )
+        finally:
+            if is_sqlite:
+                conn.exec_driver_sql(f"PRAGMA busy_timeout = {_SQLITE_BUSY_TIMEOUT_MS}")
 
 
 def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
-    _ensure_schema_updates()
-    _migrate_json_seed_data()
+    if _current_schema_version(engine) == SCHEMA_VERSION:
+        return
+    with _migration_lock:
+        _apply_pending_migrations(engine)
+
+
+_shard_engines: Dict[str, Engine] = {}
+_shard_session_factories: Dict[str, sessionmaker] = {}
+
+
+def shard_path_for_test(test_id: str) -> Path:
+    """Stable per-test file name; the hash keeps ids that sanitize alike apart."""
+    normalized_test_id = _normalize_test_id(test_id)
+    safe_name = re.sub(r"[^a-zA-Z0-9_-]+", "_", normalized_test_id).strip("_") or "test"
+    digest = hashlib.sha1(normalized_test_id.encode("utf-8")).hexdigest()[:8]
+    return SHARD_DIR / f"{safe_name}_{digest}.db"
+
+
+def _session_factory_for_test(test_id: str) -> sessionmaker:
+    """Pick the engine holding this test's sessions, groups, answers and tasks."""
+    if not STORAGE_SHARDING:
+        return SessionLocal
+
+    normalized_test_id = _normalize_test_id(test_id)
+    factory = _shard_session_factories.get(normalized_test_id)
+    if factory is not None:
+        return factory
+
+    with _migration_lock:
+        factory = _shard_session_factories.get(normalized_test_id)
+        if factory is None:
+            SHARD_DIR.mkdir(parents=True, exist_ok=True)
+            shard_engine = _create_engine(f"sqlite:///{shard_path_for_test(normalized_test_id)}")
+            if _current_schema_version(shard_engine) != SCHEMA_VERSION:
+                _apply_pending_migrations(shard_engine, is_shard=True)
+            factory = sessionmaker(bind=shard_engine, autoflush=False, autocommit=False, future=True)
+            _shard_engines[normalized_test_id] = shard_engine
+            _shard_session_factories[normalized_test_id] = factory
+    return factory
+
+
+def _drop_shard(test_id: str) -> None:
+    """Close a deleted test's shard engine and remove its database file."""
+    normalized_test_id = _normalize_test_id(test_id)
+    with _migration_lock:
+        _shard_session_factories.pop(normalized_test_id, None)
+        shard_engine = _shard_engines.pop(normalized_test_id, None)
+        if shard_engine is not None:
+            shard_engine.dispose()
+        shard_path = shard_path_for_test(normalized_test_id)
+        for path in (shard_path, *(shard_path.with_name(shard_path.name + suffix) for suffix in ("-journal", "-wal", "-shm"))):
+            path.unlink(missing_ok=True)
+
+
+def _catalog_test_ids() -> List[str]:
+    with SessionLocal() as db:
+        return list(db.execute(select(TestRecord.id).order_by(TestRecord.id.asc())).scalars().all())
+
+
+def _routed_test_ids_for_sessions(session_ids: List[str]) -> Dict[str, str]:
+    if not session_ids:
+        return {}
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(SessionRouteRecord.session_id, SessionRouteRecord.test_id)
+            .where(SessionRouteRecord.session_id.in_(session_ids))
+        ).all()
+        return {session_id: test_id for session_id, test_id in rows}
+
+
+def _routed_test_id_for_group(group_id: str) -> Optional[str]:
+    with SessionLocal() as db:
+        row = db.get(GroupRouteRecord, group_id)
+        return row.test_id if row else None
+
+
+def _session_factories_for_read(
+    test_id: Optional[str] = None,
+    session_ids: Optional[List[str]] = None,
+) -> List[sessionmaker]:
+    """Engines to query for a read: one shard when scoped, the routed or all shards otherwise."""
+    if not STORAGE_SHARDING:
+        return [SessionLocal]
+    if isinstance(test_id, str) and test_id.strip():
+        return [_session_factory_for_test(test_id)]
+    if session_ids:
+        test_ids = sorted(set(_routed_test_ids_for_sessions(session_ids).values()))
+    else:
+        test_ids = _catalog_test_ids()
+    return [_session_factory_for_test(tid) for tid in test_ids]
+
+
+def _ensure_catalog_test(test_id: str) -> None:
+    """Sharded mode keeps test metadata in the catalog; shards only hold an FK anchor row."""
+    if not STORAGE_SHARDING:
+        return
+    with SessionLocal() as db:
+        _ensure_test(db, test_id)
+        db.commit()
+
+
+def _set_session_routes(test_id: str, session_ids: List[str]) -> None:
+    if not STORAGE_SHARDING or not session_ids:
+        return
+    with SessionLocal() as db:
+        for session_id in session_ids:
+            route = db.get(SessionRouteRecord, session_id)
+            if route:
+                route.test_id = test_id
+            else:
+                db.add(SessionRouteRecord(session_id=session_id, test_id=test_id))
+        db.commit()
+
+
+def _drop_session_routes(session_ids: List[str]) -> None:
+    if not STORAGE_SHARDING or not session_ids:
+        return
+    with SessionLocal() as db:
+        db.execute(delete(SessionRouteRecord).where(SessionRouteRecord.session_id.in_(session_ids)))
+        db.commit()
+
+
+def _session_data_from_row(row: SessionRecord, answers_eval: Optional[Dict[str, Any]] = None) -> SessionData:
+    stats = row.stats if isinstance(row.stats, dict) else {}
+    if answers_eval is not None:
+        stats = {**stats, "answers_eval": answers_eval}
+    return SessionData(
+        session_id=row.session_id,
+        test_id=row.test_id,
+        file_path=row.file_path,
+        user_id=row.user_id,
+        task=row.task,
+        stats=stats,
+        metrics_version=row.metrics_version,
+        data_version=row.data_version or 0,
+        metrics_failed_version=row.metrics_failed_version,
+    )
+
+
+def _group_payload_from_row(group: GroupRecord) -> Dict[str, Any]:
+    return {
+        "id": group.id,
+        "test_id": group.test_id,
+        "name": group.name,
+        "note": group.note,
+        "session_ids": [link.session_id for link in group.session_links],
+    }
+
+
+def _group_version_token(test_id: str, membership_version: int, members: List[Any]) -> str:
+    """Changes whenever the group's test, member list or any member's stats change."""
+    digest = hashlib.sha1(f"{test_id}:{membership_version or 0}".encode("utf-8"))
+    for session_id, data_version in sorted((str(sid), int(version or 0)) for sid, version in members):
+        digest.update(f"|{session_id}:{data_version}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _test_version_token(test_id: str, members: List[Any]) -> str:
+    """Changes whenever a session of the test is added, removed or rewritten."""
+    return _group_version_token(test_id, 0, members)
+
+
+def _test_payload_from_row(row: TestRecord) -> Dict[str, Optional[str]]:
+    return {
+        "id": row.id,
+        "name": row.name,
+        "note": row.note,
+    }
+
+
+def _put_search_document(db: Session, kind: str, ref_id: str, test_id: str, label: Optional[str], parts: List[Any]) -> None:
+    body = " ".join(folded for folded in (fold_text(part) for part in parts) if folded)
+    doc = db.execute(
+        select(SearchDocumentRecord).where(SearchDocumentRecord.kind == kind, SearchDocumentRecord.ref_id == ref_id)
+    ).scalar_one_or_none()
+    if doc:
+        doc.test_id = test_id
+        doc.label = label
+        doc.body = body
+    else:
+        db.add(SearchDocumentRecord(kind=kind, ref_id=ref_id, test_id=test_id, label=label, body=body))
+
+
+def _session_answer_texts(stats: Any) -> List[str]:
+    answers = stats.get("answers_by_task") if isinstance(stats, dict) else None
+    if not isinstance(answers, dict):
+        return []
+    return [str(value) for value in answers.values() if value is not None]
+
+
+def _index_session(db: Session, row: SessionRecord) -> None:
+    _put_search_document(
+        db,
+        "session",
+        row.session_id,
+        row.test_id,
+        row.user_id or row.session_id,
+        [row.session_id, row.user_id, *_session_answer_texts(row.stats)],
+    )
+
+
+def _index_group(db: Session, group: GroupRecord) -> None:
+    _put_search_document(db, "group", group.id, group.test_id, group.name, [group.id, group.name, group.note])
+
+
+def _index_test(db: Session, row: TestRecord) -> None:
+    _put_search_document(db, "test", row.id, row.id, row.name or row.id, [row.id, row.name, row.note])
+
+
+def _stats_answers(row: SessionRecord) -> Any:
+    return row.stats.get("answers_by_task") if isinstance(row.stats, dict) else None
+
+
+def _put_answer_evals(db: Session, row: SessionRecord, scorer: AnswerScorer) -> None:
+    """Replace the session's answer_evals rows with its current answers, scored against the scorer's key."""
+    db.execute(delete(AnswerEvalRecord).where(AnswerEvalRecord.session_id == row.session_id))
+    answers = session_answers(_stats_answers(row))
+    prepare_sessions(scorer, [answers])
+    for task_id, answer in answers.items():
+        answer_folded = fold_text(answer)
+        db.add(
+            AnswerEvalRecord(
+                session_id=row.session_id,
+                task_id=task_id,
+                test_id=row.test_id,
+                answer=answer,
+                answer_folded=answer_folded,
+                **scorer.score(task_id, answer_folded),
+            )
+        )
+
+
+def _answer_evals_query(session_filter: Any):
+    """Stored evaluations of the sessions in `session_filter` (ids or a session_id subquery)."""
+    return (
+        select(
+            AnswerEvalRecord.session_id,
+            AnswerEvalRecord.task_id,
+            AnswerEvalRecord.answer,
+            AnswerEvalRecord.correct_answer,
+            AnswerEvalRecord.similarity_score,
+        )
+        .where(AnswerEvalRecord.session_id.in_(session_filter))
+        .order_by(AnswerEvalRecord.session_id.asc(), AnswerEvalRecord.task_id.asc())
+    )
+
+
+def _group_wordcloud_query(group_id: str, task_id: Optional[str], limit: int):
+    """Most frequent answers of a group's members (indexed join + GROUP BY).
+
+    Answers are counted per fold_text form, so case and accent variants are one word, labelled with
+    its most frequent spelling (ties go to the alphabetically first one).
+    """
+    spellings = (
+        select(AnswerEvalRecord.answer_folded, AnswerEvalRecord.answer, func.count().label("spelling_count"))
+        .join(GroupSessionRecord, GroupSessionRecord.session_id == AnswerEvalRecord.session_id)
+        .where(GroupSessionRecord.group_id == group_id)
+    )
+    if task_id:
+        spellings = spellings.where(AnswerEvalRecord.task_id == task_id)
+    spellings = spellings.group_by(AnswerEvalRecord.answer_folded, AnswerEvalRecord.answer).subquery()
+
+    ranked = select(
+        spellings.c.answer,
+        func.sum(spellings.c.spelling_count).over(partition_by=spellings.c.answer_folded).label("word_count"),
+        func.row_number().over(
+            partition_by=spellings.c.answer_folded,
+            order_by=(spellings.c.spelling_count.desc(), spellings.c.answer.asc()),
+        ).label("spelling_rank"),
+    ).subquery()
+    return (
+        select(ranked.c.answer, ranked.c.word_count)
+        .where(ranked.c.spelling_rank == 1)
+        .order_by(ranked.c.word_count.desc(), ranked.c.answer.asc())
+        .limit(limit)
+    )
+
+
+def _expected_answers_query(test_ids: List[str]):
+    return (
+        select(TestAnswerRecord.test_id, func.count())
+        .where(TestAnswerRecord.test_id.in_(test_ids), TestAnswerRecord.answer != "")
+        .group_by(TestAnswerRecord.test_id)
+    )
+
+
+def _answers_eval_by_session(rows: List[SessionRecord], eval_rows: List[Any], expected_rows: List[Any]) -> Dict[str, Dict[str, Any]]:
+    """answers_eval payload of every session row, built from its answer_evals rows."""
+    records: Dict[str, List[Dict[str, Any]]] = {row.session_id: [] for row in rows}
+    for session_id, task_id, answer, correct_answer, similarity_score in eval_rows:
+        records.setdefault(session_id, []).append({
+            "task_id": task_id,
+            "answer": answer,
+            "correct_answer": correct_answer,
+            "is_correct": is_match(similarity_score, ANSWER_MATCH_THRESHOLD),
+            "similarity_score": similarity_score,
+        })
+    expected = {test_id: int(count) for test_id, count in expected_rows}
+    return {row.session_id: answers_eval_payload(records[row.session_id], expected.get(row.test_id, 0)) for row in rows}
+
+
+def _session_data_with_answers_eval(db: Session, rows: List[SessionRecord], session_filter: Any) -> List[SessionData]:
+    if not rows:
+        return []
+    evals = _answers_eval_by_session(
+        rows,
+        db.execute(_answer_evals_query(session_filter)).all(),
+        db.execute(_expected_answers_query(sorted({row.test_id for row in rows}))).all(),
+    )
+    return [_session_data_from_row(row, evals[row.session_id]) for row in rows]
+
 
-def _ensure_schema_updates() -> None:
-    """Apply additive schema updates for existing databases."""
-    inspector = inspect(engine)
+def _drop_search_documents(db: Session, kind: str, ref_ids: List[str]) -> None:
+    if ref_ids:
+        db.execute(
+            delete(SearchDocumentRecord).where(SearchDocumentRecord.kind == kind, SearchDocumentRecord.ref_id.in_(ref_ids))
+        )
 
-    test_columns = {col["name"] for col in inspector.get_columns("tests")}
-    group_columns = {col["name"] for col in inspector.get_columns("groups")}
 
-    with engine.begin() as conn:
-        if "note" not in test_columns:
-            conn.execute(text("ALTER TABLE tests ADD COLUMN note TEXT"))
-        if "note" not in group_columns:
-            conn.execute(text("ALTER TABLE groups ADD COLUMN note TEXT"))
+def _stored_stats(stats: Any) -> Dict[str, Any]:
+    # Evaluations live in answer_evals and are attached on read, so a key change never rewrites stats.
+    return {key: value for key, value in (stats if isinstance(stats, dict) else {}).items() if key != "answers_eval"}
 
 
 class DatabaseStore:
@@ -308,10 +965,11 @@ class DatabaseStore:
         init_db()
 
     def upsert(self, session: SessionData) -> None:
-        payload_stats = session.stats if isinstance(session.stats, dict) else {}
+        payload_stats = _stored_stats(session.stats)
         normalized_test_id = _normalize_test_id(session.test_id)
+        _ensure_catalog_test(normalized_test_id)
 
-        with SessionLocal() as db:
+        with _session_factory_for_test(normalized_test_id)() as db:
             _ensure_test(db, normalized_test_id)
             db.flush()
 
@@ -322,32 +980,68 @@ class DatabaseStore:
                 existing.user_id = session.user_id
                 existing.task = session.task
                 existing.stats = payload_stats
+                existing.metrics_version = session.metrics_version
+                existing.metrics_failed_version = None
+                existing.data_version = (existing.data_version or 0) + 1
             else:
-                db.add(
-                    SessionRecord(
-                        session_id=session.session_id,
-                        test_id=normalized_test_id,
-                        file_path=session.file_path,
-                        user_id=session.user_id,
-                        task=session.task,
-                        stats=payload_stats,
-                    )
+                existing = SessionRecord(
+                    session_id=session.session_id,
+                    test_id=normalized_test_id,
+                    file_path=session.file_path,
+                    user_id=session.user_id,
+                    task=session.task,
+                    stats=payload_stats,
+                    metrics_version=session.metrics_version,
                 )
+                db.add(existing)
+            db.flush()
+            _index_session(db, existing)
+            _put_answer_evals(db, existing, AnswerScorer(_get_answer_key(db, normalized_test_id), ANSWER_MATCH_THRESHOLD))
             db.commit()
 
-    def get(self, session_id: str) -> Optional[SessionData]:
-        with SessionLocal() as db:
-            row = db.get(SessionRecord, session_id)
-            if not row:
-                return None
-            return SessionData(
-                session_id=row.session_id,
-                test_id=row.test_id,
-                file_path=row.file_path,
-                user_id=row.user_id,
-                task=row.task,
-                stats=row.stats if isinstance(row.stats, dict) else {},
+        _set_session_routes(normalized_test_id, [session.session_id])
+
+    def put_refreshed_stats(self, session: SessionData, read_data_version: int) -> bool:
+        """Store recomputed stats unless the session was rewritten after `read_data_version` was read."""
+        normalized_test_id = _normalize_test_id(session.test_id)
+        with _session_factory_for_test(normalized_test_id)() as db:
+            result = db.execute(
+                update(SessionRecord)
+                .where(SessionRecord.session_id == session.session_id, SessionRecord.data_version == read_data_version)
+                .values(
+                    stats=_stored_stats(session.stats),
+                    metrics_version=session.metrics_version,
+                    metrics_failed_version=None,
+                    data_version=SessionRecord.data_version + 1,
+                )
             )
+            if result.rowcount != 1:
+                db.rollback()
+                return False
+            row = db.get(SessionRecord, session.session_id)
+            _index_session(db, row)
+            _put_answer_evals(db, row, AnswerScorer(_get_answer_key(db, normalized_test_id), ANSWER_MATCH_THRESHOLD))
+            db.commit()
+        return True
+
+    def mark_metrics_failed(self, session: SessionData, metrics_version: str) -> None:
+        """Record a failed refresh, unless the session was rewritten since it was read."""
+        with _session_factory_for_test(session.test_id)() as db:
+            db.execute(
+                update(SessionRecord)
+                .where(SessionRecord.session_id == session.session_id, SessionRecord.data_version == session.data_version)
+                .values(metrics_failed_version=metrics_version)
+            )
+            db.commit()
+
+    def get(self, session_id: str) -> Optional[SessionData]:
+        factories = _session_factories_for_read(session_ids=[session_id])
+        for factory in factories:
+            with factory() as db:
+                row = db.get(SessionRecord, session_id)
+                if row:
+                    return _session_data_with_answers_eval(db, [row], [session_id])[0]
+        return None
 
     def list_sessions(
         self,
@@ -355,32 +1049,58 @@ class DatabaseStore:
         test_id: Optional[str] = None,
         session_ids: Optional[List[str]] = None,
     ) -> Dict[str, SessionData]:
-        with SessionLocal() as db:
-            stmt = select(SessionRecord)
+        stmt = select(SessionRecord)
 
-            if isinstance(test_id, str) and test_id.strip():
-                stmt = stmt.where(SessionRecord.test_id == _normalize_test_id(test_id))
+        if isinstance(test_id, str) and test_id.strip():
+            stmt = stmt.where(SessionRecord.test_id == _normalize_test_id(test_id))
+
+        normalized_ids = _normalize_session_ids(session_ids or [])
+        if session_ids is not None and not normalized_ids:
+            return {}
+        if normalized_ids:
+            stmt = stmt.where(SessionRecord.session_id.in_(normalized_ids))
+        stmt = stmt.order_by(SessionRecord.test_id.asc(), SessionRecord.session_id.asc())
+
+        session_filter = stmt.with_only_columns(SessionRecord.session_id).order_by(None)
+        factories = _session_factories_for_read(test_id=test_id, session_ids=normalized_ids)
+        sessions: List[SessionData] = []
+        for factory in factories:
+            with factory() as db:
+                sessions.extend(_session_data_with_answers_eval(db, db.execute(stmt).scalars().all(), session_filter))
+        if len(factories) > 1:
+            sessions.sort(key=lambda session: (session.test_id, session.session_id))
 
-            normalized_ids = _normalize_session_ids(session_ids or [])
-            if session_ids is not None and not normalized_ids:
-                return {}
-            if normalized_ids:
-                stmt = stmt.where(SessionRecord.session_id.in_(normalized_ids))
+        return {
+            session.session_id: session
+            for session in sessions
+        }
 
-            rows = db.execute(
-                stmt.order_by(SessionRecord.test_id.asc(), SessionRecord.session_id.asc())
-            ).scalars().all()
-            return {
-                row.session_id: SessionData(
-                    session_id=row.session_id,
-                    test_id=row.test_id,
-                    file_path=row.file_path,
-                    user_id=row.user_id,
-                    task=row.task,
-                    stats=row.stats if isinstance(row.stats, dict) else {},
-                )
-                for row in rows
-            }
+    def list_stale_sessions(
+        self,
+        metrics_version: str,
+        *,
+        after_session_id: Optional[str] = None,
+        limit: int = 50,
+    ) -> List[SessionData]:
+        """Sessions computed with another metrics_version, in session_id order after the cursor.
+
+        Sessions whose refresh already failed for this metrics_version are skipped.
+        """
+        stmt = select(SessionRecord).where(
+            (SessionRecord.metrics_version.is_(None)) | (SessionRecord.metrics_version != metrics_version),
+            (SessionRecord.metrics_failed_version.is_(None)) | (SessionRecord.metrics_failed_version != metrics_version),
+        )
+        if after_session_id:
+            stmt = stmt.where(SessionRecord.session_id > after_session_id)
+        stmt = stmt.order_by(SessionRecord.session_id.asc()).limit(limit)
+
+        session_filter = stmt.with_only_columns(SessionRecord.session_id)
+        sessions: List[SessionData] = []
+        for factory in _session_factories_for_read():
+            with factory() as db:
+                sessions.extend(_session_data_with_answers_eval(db, db.execute(stmt).scalars().all(), session_filter))
+        sessions.sort(key=lambda session: session.session_id)
+        return sessions[:limit]
 
     def delete_sessions(self, test_id: str, session_ids: List[str]) -> int:
         normalized_test_id = _normalize_test_id(test_id)
@@ -388,7 +1108,7 @@ class DatabaseStore:
         if not normalized_ids:
             return 0
 
-        with SessionLocal() as db:
+        with _session_factory_for_test(normalized_test_id)() as db:
             rows = db.execute(
                 select(SessionRecord).where(
                     SessionRecord.test_id == normalized_test_id,
@@ -399,14 +1119,17 @@ class DatabaseStore:
             for row in rows:
                 db.delete(row)
 
-            deleted_count = len(rows)
+            deleted_ids = [row.session_id for row in rows]
+            _drop_search_documents(db, "session", deleted_ids)
             db.commit()
-            return deleted_count
+
+        _drop_session_routes(deleted_ids)
+        return len(deleted_ids)
 
     def delete_all_sessions_for_test(self, test_id: str) -> int:
         normalized_test_id = _normalize_test_id(test_id)
 
-        with SessionLocal() as db:
+        with _session_factory_for_test(normalized_test_id)() as db:
             rows = db.execute(
                 select(SessionRecord).where(SessionRecord.test_id == normalized_test_id)
             ).scalars().all()
@@ -414,12 +1137,13 @@ class DatabaseStore:
             for row in rows:
                 db.delete(row)
 
-            deleted_count = len(rows)
+            deleted_ids = [row.session_id for row in rows]
+            _drop_search_documents(db, "session", deleted_ids)
             db.commit()
-            return deleted_count
 
+        _drop_session_routes(deleted_ids)
+        return len(deleted_ids)
 
-STORE = DatabaseStore()
 
 def _normalize_test_id(test_id: Optional[str]) -> str:
     normalized = str(test_id or "").strip()
@@ -429,6 +1153,10 @@ def _normalize_test_id(test_id: Optional[str]) -> str:
 def _normalize_session_ids(session_ids: List[str]) -> List[str]:
     return [str(sid).strip() for sid in session_ids if isinstance(sid, str) and str(sid).strip()]
 
+
+STORE = DatabaseStore()
+
+
 def delete_sessions(test_id: str, session_ids: List[str]) -> int:
     return STORE.delete_sessions(test_id=test_id, session_ids=session_ids)
 
@@ -440,18 +1168,104 @@ def ensure_upload_dir() -> Path:
     return UPLOAD_DIR
 
 
+def _get_answer_key(db: Session, test_id: str) -> Dict[str, str]:
+    rows = db.execute(
+        select(TestAnswerRecord).where(TestAnswerRecord.test_id == test_id)
+    ).scalars().all()
+    return {row.task_id: row.answer for row in rows}
+
+
 def get_test_answers(test_id: str) -> Dict[str, str]:
     normalized_test_id = _normalize_test_id(test_id)
-    with SessionLocal() as db:
-        rows = db.execute(
-            select(TestAnswerRecord).where(TestAnswerRecord.test_id == normalized_test_id)
-        ).scalars().all()
-        return {row.task_id: row.answer for row in rows}
+    with _session_factory_for_test(normalized_test_id)() as db:
+        return _get_answer_key(db, normalized_test_id)
+
+
+def rescore_answer_evals(test_id: str, task_ids: List[str]) -> Dict[str, int]:
+    """Re-score the stored answers to `task_ids` against the test's current key.
+
+    Each distinct folded answer of a task is scored once and written to all its rows with one executemany UPDATE;
+    each task commits on its own so a long re-score never holds the write lock for the whole key.
+    Returns how many stored answers the tasks have and how many of them changed.
+    """
+    normalized_test_id = _normalize_test_id(test_id)
+    normalized_task_ids = sorted({str(task_id).strip() for task_id in task_ids if str(task_id or "").strip()})
+    if not normalized_task_ids:
+        return {"matched": 0, "updated": 0}
+
+    evals = AnswerEvalRecord.__table__
+    stmt = (
+        update(evals)
+        .where(
+            evals.c.test_id == bindparam("b_test_id"),
+            evals.c.task_id == bindparam("b_task_id"),
+            evals.c.answer_folded == bindparam("b_answer_folded"),
+        )
+        .values(
+            correct_answer=bindparam("b_correct_answer"),
+            is_correct=bindparam("b_is_correct"),
+            similarity_score=bindparam("b_similarity_score"),
+        )
+    )
+
+    matched = 0
+    updated = 0
+    with _session_factory_for_test(normalized_test_id)() as db:
+        scorer = AnswerScorer(_get_answer_key(db, normalized_test_id), ANSWER_MATCH_THRESHOLD)
+        for task_id in normalized_task_ids:
+            stored = db.execute(
+                select(
+                    evals.c.answer_folded,
+                    evals.c.correct_answer,
+                    evals.c.is_correct,
+                    evals.c.similarity_score,
+                    func.count(),
+                )
+                .where(evals.c.test_id == normalized_test_id, evals.c.task_id == task_id)
+                .group_by(evals.c.answer_folded, evals.c.correct_answer, evals.c.is_correct, evals.c.similarity_score)
+            ).all()
+            scorer.prepare((task_id, answer_folded) for answer_folded, *_ in stored)
+
+            changes: Dict[str, Dict[str, Any]] = {}
+            for answer_folded, correct_answer, is_correct, similarity_score, count in stored:
+                matched += count
+                values = scorer.score(task_id, answer_folded)
+                if (correct_answer, bool(is_correct), similarity_score) != (
+                    values["correct_answer"], values["is_correct"], values["similarity_score"]
+                ):
+                    updated += count
+                    changes[answer_folded] = values
+
+            if changes:
+                db.execute(stmt, [
+                    {
+                        "b_test_id": normalized_test_id,
+                        "b_task_id": task_id,
+                        "b_answer_folded": answer_folded,
+                        **{f"b_{key}": value for key, value in values.items()},
+                    }
+                    for answer_folded, values in changes.items()
+                ])
+            db.commit()
+
+    return {"matched": matched, "updated": updated}
+
+def _session_task_keys_query(dialect_name: str):
+    """Distinct stats.tasks keys extracted server-side instead of loading every stats document."""
+    if dialect_name == "postgresql":
+        return text(
+            "SELECT DISTINCT jsonb_object_keys(stats -> 'tasks') FROM sessions "
+            "WHERE test_id = :test_id AND jsonb_typeof(stats -> 'tasks') = 'object'"
+        )
+    return text(
+        "SELECT DISTINCT task_keys.key FROM sessions, json_each(sessions.stats, '$.tasks') AS task_keys "
+        "WHERE sessions.test_id = :test_id AND json_type(sessions.stats, '$.tasks') = 'object'"
+    )
 
 def list_test_tasks(test_id: str) -> List[str]:
     normalized_test_id = _normalize_test_id(test_id)
     
-    with SessionLocal() as db:
+    with _session_factory_for_test(normalized_test_id)() as db:
         task_rows = db.execute(
             select(TaskRecord.id)
             .where(TaskRecord.test_id == normalized_test_id)
@@ -464,24 +1278,21 @@ def list_test_tasks(test_id: str) -> List[str]:
             if row and row[0] is not None and str(row[0]).strip()
         }
 
-        session_rows = db.execute(
-            select(SessionRecord.task, SessionRecord.stats)
+        session_task_values = db.execute(
+            select(SessionRecord.task)
             .where(SessionRecord.test_id == normalized_test_id)
-        ).all()
+            .distinct()
+        ).scalars().all()
+        stats_task_keys = db.execute(
+            _session_task_keys_query(db.get_bind().dialect.name),
+            {"test_id": normalized_test_id},
+        ).scalars().all()
 
-        for task_value, stats in session_rows:
+        for task_value in [*session_task_values, *stats_task_keys]:
             task_text = str(task_value).strip() if task_value is not None else ""
             if task_text:
                 discovered_ids.add(task_text)
 
-            stats_dict = stats if isinstance(stats, dict) else {}
-            tasks_payload = stats_dict.get("tasks") if isinstance(stats_dict, dict) else None
-            if isinstance(tasks_payload, dict):
-                for task_id in tasks_payload.keys():
-                    normalized_task = str(task_id).strip()
-                    if normalized_task:
-                        discovered_ids.add(normalized_task)
-
         for task_id in discovered_ids:
             _ensure_task(db, normalized_test_id, task_id)
 
@@ -491,8 +1302,9 @@ def list_test_tasks(test_id: str) -> List[str]:
 def set_test_answer(test_id: str, task_id: str, answer: Optional[str]) -> Dict[str, str]:
     normalized_test_id = _normalize_test_id(test_id)
     normalized_task_id = str(task_id or "unknown").strip() or "unknown"
+    _ensure_catalog_test(normalized_test_id)
 
-    with SessionLocal() as db:
+    with _session_factory_for_test(normalized_test_id)() as db:
         _ensure_task(db, normalized_test_id, normalized_task_id)
 
         row = db.get(TestAnswerRecord, {"test_id": normalized_test_id, "task_id": normalized_task_id})
@@ -529,8 +1341,9 @@ def set_test_answers_bulk(test_id: str, answers_by_task: Dict[str, Optional[str]
         return get_test_answers(normalized_test_id)
 
     valid_task_ids = set(list_test_tasks(normalized_test_id))
+    _ensure_catalog_test(normalized_test_id)
 
-    with SessionLocal() as db:
+    with _session_factory_for_test(normalized_test_id)() as db:
         for task_id_raw, answer in answers_by_task.items():
             normalized_task_id = str(task_id_raw or "").strip()
             if not normalized_task_id or normalized_task_id not in valid_task_ids:
@@ -567,39 +1380,31 @@ def set_test_answers_bulk(test_id: str, answers_by_task: Dict[str, Optional[str]
     return get_test_answers(normalized_test_id)
 
 def list_groups(test_id: Optional[str] = None) -> List[Dict[str, Any]]:
-    with SessionLocal() as db:
-        stmt = select(GroupRecord).options(selectinload(GroupRecord.session_links))
-        if isinstance(test_id, str) and test_id.strip():
-            stmt = stmt.where(GroupRecord.test_id == test_id.strip())
-
-        groups = db.execute(stmt.order_by(GroupRecord.name.asc(), GroupRecord.id.asc())).scalars().all()
-
-        out: List[Dict[str, Any]] = []
-        for group in groups:
-            session_ids = [link.session_id for link in group.session_links]
-            out.append(
-                {
-                    "id": group.id,
-                    "test_id": group.test_id,
-                    "name": group.name,
-                    "note": group.note,
-                    "session_ids": session_ids,
-                }
-            )
+    stmt = select(GroupRecord).options(selectinload(GroupRecord.session_links))
+    if isinstance(test_id, str) and test_id.strip():
+        stmt = stmt.where(GroupRecord.test_id == test_id.strip())
+    stmt = stmt.order_by(GroupRecord.name.asc(), GroupRecord.id.asc())
+
+    factories = _session_factories_for_read(test_id=test_id)
+    out: List[Dict[str, Any]] = []
+    for factory in factories:
+        with factory() as db:
+            out.extend(_group_payload_from_row(group) for group in db.execute(stmt).scalars().all())
+    if len(factories) > 1:
+        out.sort(key=lambda group: (group["name"], group["id"]))
+    return out
+
 
-        return out
+def _session_factory_for_group(group_id: str) -> Optional[sessionmaker]:
+    if not STORAGE_SHARDING:
+        return SessionLocal
+    routed_test_id = _routed_test_id_for_group(group_id)
+    return _session_factory_for_test(routed_test_id) if routed_test_id else None
 
 def list_tests() -> List[Dict[str, Optional[str]]]:
     with SessionLocal() as db:
         rows = db.execute(select(TestRecord).order_by(TestRecord.id.asc())).scalars().all()
-        return [
-            {
-                "id": row.id,
-                "name": row.name,
-                "note": row.note,
-            }
-            for row in rows
-        ]
+        return [_test_payload_from_row(row) for row in rows]
 
 def create_test(test_id: Optional[str] = None, name: Optional[str] = None, note: Optional[str] = None) -> Dict[str, Optional[str]]:
     normalized_test_id = str(test_id or "").strip()
@@ -610,7 +1415,7 @@ def create_test(test_id: Optional[str] = None, name: Optional[str] = None, note:
     with SessionLocal() as db:
         if not normalized_test_id:
             max_numeric_id = db.execute(
-                select(func.max(cast(TestRecord.id, Integer))).where(TestRecord.id.op("GLOB")("[0-9]*"))
+                select(func.max(cast(TestRecord.id, Integer))).where(TestRecord.id.regexp_match("^[0-9]+$"))
             ).scalar_one_or_none()
             normalized_test_id = str((max_numeric_id or 0) + 1)
         else:
@@ -624,6 +1429,7 @@ def create_test(test_id: Optional[str] = None, name: Optional[str] = None, note:
             note=normalized_note,
         )
         db.add(row)
+        _index_test(db, row)
         db.commit()
 
         return {
@@ -648,8 +1454,10 @@ def upsert_group(group_id: str, test_id: str, name: str, session_ids: List[str])
         raise ValueError("name is required")
 
     deduplicated_session_ids = list(dict.fromkeys(normalized_session_ids))
+    factory = _session_factory_for_test(normalized_test_id)
+    _ensure_catalog_test(normalized_test_id)
 
-    with SessionLocal() as db:
+    with factory() as db:
         _ensure_test(db, normalized_test_id)
 
         if deduplicated_session_ids:
@@ -683,17 +1491,22 @@ def upsert_group(group_id: str, test_id: str, name: str, session_ids: List[str])
         else:
             group.test_id = normalized_test_id
             group.name = normalized_name
+            group.membership_version = (group.membership_version or 0) + 1
 
         db.execute(delete(GroupSessionRecord).where(GroupSessionRecord.group_id == normalized_group_id))
         for sid in deduplicated_session_ids:
             db.add(GroupSessionRecord(group_id=normalized_group_id, session_id=sid))
 
+        _index_group(db, group)
         db.commit()
     
-    with SessionLocal() as db:
+    with factory() as db:
         latest = db.get(GroupRecord, normalized_group_id)
         note = latest.note if latest else None
 
+    if STORAGE_SHARDING:
+        _move_group_route(normalized_group_id, normalized_test_id)
+
     return {
         "id": normalized_group_id,
         "test_id": normalized_test_id,
@@ -703,6 +1516,26 @@ def upsert_group(group_id: str, test_id: str, name: str, session_ids: List[str])
     }
 
 
+def _move_group_route(group_id: str, test_id: str) -> None:
+    """Point the group at its current shard and drop the copy left in a previous test's shard."""
+    previous_test_id = _routed_test_id_for_group(group_id)
+    if previous_test_id and previous_test_id != test_id:
+        with _session_factory_for_test(previous_test_id)() as db:
+            stale = db.get(GroupRecord, group_id)
+            if stale:
+                db.delete(stale)
+                _drop_search_documents(db, "group", [group_id])
+                db.commit()
+
+    with SessionLocal() as db:
+        route = db.get(GroupRouteRecord, group_id)
+        if route:
+            route.test_id = test_id
+        else:
+            db.add(GroupRouteRecord(group_id=group_id, test_id=test_id))
+        db.commit()
+
+
 def get_test_settings(test_id: str) -> Dict[str, Optional[str]]:
     normalized_test_id = _normalize_test_id(test_id)
     with SessionLocal() as db:
@@ -726,6 +1559,7 @@ def update_test_settings(test_id: str, name: Optional[str], note: Optional[str])
 
         row.name = normalized_name if normalized_name else None
         row.note = normalized_note
+        _index_test(db, row)
         db.commit()
         return {
             "id": row.id if row else normalized_test_id,
@@ -748,8 +1582,24 @@ def delete_test(test_id: str) -> bool:
             db.delete(session_row)
 
         db.delete(row)
+        db.execute(delete(SearchDocumentRecord).where(SearchDocumentRecord.test_id == normalized_test_id))
+        db.execute(delete(MetricAggregateRecord).where(MetricAggregateRecord.test_id == normalized_test_id))
+        if STORAGE_SHARDING:
+            db.execute(delete(SessionRouteRecord).where(SessionRouteRecord.test_id == normalized_test_id))
+            db.execute(delete(GroupRouteRecord).where(GroupRouteRecord.test_id == normalized_test_id))
         db.commit()
-        return True
+
+    if STORAGE_SHARDING:
+        with _session_factory_for_test(normalized_test_id)() as db:
+            db.execute(delete(SessionRecord).where(SessionRecord.test_id == normalized_test_id))
+            db.execute(delete(SearchDocumentRecord).where(SearchDocumentRecord.test_id == normalized_test_id))
+            db.execute(delete(MetricAggregateRecord).where(MetricAggregateRecord.test_id == normalized_test_id))
+            shard_row = db.get(TestRecord, normalized_test_id)
+            if shard_row:
+                db.delete(shard_row)
+            db.commit()
+        _drop_shard(normalized_test_id)
+    return True
 
 
 def update_group_settings(group_id: str, name: Optional[str], note: Optional[str]) -> Dict[str, Any]:
@@ -757,7 +1607,11 @@ def update_group_settings(group_id: str, name: Optional[str], note: Optional[str
     if not normalized_group_id:
         raise ValueError("group_id is required")
 
-    with SessionLocal() as db:
+    factory = _session_factory_for_group(normalized_group_id)
+    if factory is None:
+        raise ValueError("Skupina nenalezena.")
+
+    with factory() as db:
         group = db.get(GroupRecord, normalized_group_id)
         if not group:
             raise ValueError("Skupina nenalezena.")
@@ -771,6 +1625,7 @@ def update_group_settings(group_id: str, name: Optional[str], note: Optional[str
         if note is not None:
             group.note = str(note)
 
+        _index_group(db, group)
         db.commit()
 
         return {
@@ -786,10 +1641,231 @@ def delete_group(group_id: str) -> bool:
     normalized_group_id = str(group_id or "").strip()
     if not normalized_group_id:
         return False
-    with SessionLocal() as db:
+    factory = _session_factory_for_group(normalized_group_id)
+    if factory is None:
+        return False
+    with factory() as db:
         group = db.get(GroupRecord, normalized_group_id)
         if not group:
             return False
         db.delete(group)
+        _drop_search_documents(db, "group", [normalized_group_id])
+        db.execute(
+            delete(MetricAggregateRecord).where(
+                MetricAggregateRecord.scope == "group",
+                MetricAggregateRecord.scope_id == normalized_group_id,
+            )
+        )
+        db.commit()
+
+    if STORAGE_SHARDING:
+        with SessionLocal() as db:
+            db.execute(delete(GroupRouteRecord).where(GroupRouteRecord.group_id == normalized_group_id))
+            db.commit()
+    return True
+
+
+def put_metric_aggregate(test_id: str, scope: str, scope_id: str, version: str, payload: Dict[str, Any]) -> None:
+    """Store the aggregate of a test or group in the database holding that test."""
+    normalized_test_id = _normalize_test_id(test_id)
+    with _session_factory_for_test(normalized_test_id)() as db:
+        row = db.get(MetricAggregateRecord, (scope, scope_id))
+        if row:
+            row.test_id = normalized_test_id
+            row.version = version
+            row.payload = payload
+            row.updated_at = int(time.time())
+        else:
+            db.add(
+                MetricAggregateRecord(
+                    scope=scope,
+                    scope_id=scope_id,
+                    test_id=normalized_test_id,
+                    version=version,
+                    payload=payload,
+                    updated_at=int(time.time()),
+                )
+            )
+        try:
+            db.commit()
+        except IntegrityError:
+            # A concurrent request stored the same aggregate first.
+            db.rollback()
+
+
+def _search_documents_query(dialect_name: str, tokens: List[str], test_id: Optional[str], limit: int):
+    """FTS5 MATCH on SQLite, tsvector @@ tsquery on PostgreSQL; every token is a prefix match."""
+    if dialect_name == "sqlite":
+        stmt = text(
+            "SELECT d.kind, d.ref_id, d.test_id, d.label, -bm25(search_documents_fts) AS score "
+            "FROM search_documents_fts JOIN search_documents d ON d.id = search_documents_fts.rowid "
+            "WHERE search_documents_fts MATCH :match"
+            + (" AND d.test_id = :test_id" if test_id else "")
+            + " ORDER BY score DESC LIMIT :limit"
+        )
+        params = {"match": " ".join(f'"{token}"*' for token in tokens), "limit": limit}
+    else:
+        stmt = text(
+            "SELECT kind, ref_id, test_id, label, "
+            "ts_rank(to_tsvector('simple', body), to_tsquery('simple', :match)) AS score "
+            "FROM search_documents WHERE to_tsvector('simple', body) @@ to_tsquery('simple', :match)"
+            + (" AND test_id = :test_id" if test_id else "")
+            + " ORDER BY score DESC LIMIT :limit"
+        )
+        params = {"match": " & ".join(f"{token}:*" for token in tokens), "limit": limit}
+    if test_id:
+        params["test_id"] = test_id
+    return stmt, params
+
+
+def search_documents(query: str, *, test_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """Prefix search over session ids, user ids, answers and test/group names and notes."""
+    tokens = fold_text(query).split()
+    if not tokens:
+        return []
+    normalized_test_id = _normalize_test_id(test_id) if isinstance(test_id, str) and test_id.strip() else None
+
+    # Test documents live in the catalog; sessions and groups live next to their data.
+    factories = [SessionLocal]
+    for factory in _session_factories_for_read(test_id=normalized_test_id):
+        if factory not in factories:
+            factories.append(factory)
+
+    hits: List[Dict[str, Any]] = []
+    for factory in factories:
+        with factory() as db:
+            stmt, params = _search_documents_query(db.get_bind().dialect.name, tokens, normalized_test_id, limit)
+            for row in db.execute(stmt, params).mappings():
+                hits.append(
+                    {
+                        "kind": row["kind"],
+                        "id": row["ref_id"],
+                        "test_id": row["test_id"],
+                        "label": row["label"],
+                        "score": float(row["score"] or 0.0),
+                    }
+                )
+
+    hits.sort(key=lambda hit: (-hit["score"], hit["kind"], hit["id"]))
+    return hits[:limit]
+
+
+def list_session_file_paths() -> set[str]:
+    """Every upload path still referenced by a session, across all shards."""
+    paths: set[str] = set()
+    for factory in _session_factories_for_read():
+        with factory() as db:
+            paths.update(db.execute(select(SessionRecord.file_path)).scalars().all())
+    return paths
+
+
+def _incremental_vacuum(target_engine: Engine) -> None:
+    with target_engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() != 2:
+            # auto_vacuum only takes effect after one full rebuild of the file.
+            conn.exec_driver_sql("PRAGMA auto_vacuum=INCREMENTAL")
+            conn.exec_driver_sql("VACUUM")
+        conn.exec_driver_sql("PRAGMA incremental_vacuum")
+
+
+def compact_databases() -> int:
+    """Return freed pages to the filesystem; server databases rely on their own autovacuum."""
+    if not DATABASE_URL.startswith("sqlite"):
+        return 0
+
+    engines = [engine]
+    if STORAGE_SHARDING:
+        for test_id in _catalog_test_ids():
+            _session_factory_for_test(test_id)
+            engines.append(_shard_engines[_normalize_test_id(test_id)])
+
+    for target_engine in engines:
+        _incremental_vacuum(target_engine)
+    return len(engines)
+
+
+def _session_file_paths(session_ids: List[str], test_id: Optional[str] = None) -> Dict[str, str]:
+    """file_path per existing session id, without loading stats."""
+    normalized_ids = _normalize_session_ids(session_ids)
+    if not normalized_ids:
+        return {}
+    out: Dict[str, str] = {}
+    for factory in _session_factories_for_read(test_id=test_id, session_ids=normalized_ids):
+        with factory() as db:
+            rows = db.execute(
+                select(SessionRecord.session_id, SessionRecord.file_path).where(SessionRecord.session_id.in_(normalized_ids))
+            ).all()
+            out.update({session_id: file_path for session_id, file_path in rows})
+    return out
+
+
+def _ingest_is_current(session_files: Dict[str, str], current_files: Dict[str, str]) -> bool:
+    return bool(session_files) and all(current_files.get(sid) == path for sid, path in session_files.items())
+
+
+def get_upload_ingest(content_hash: str, test_id: str, kind: str) -> Optional[Dict[str, Any]]:
+    """Stored result for identical content, or None once any of its sessions is gone or holds another upload."""
+    normalized_test_id = _normalize_test_id(test_id)
+    with SessionLocal() as db:
+        row = db.get(
+            UploadIngestRecord,
+            {"content_hash": content_hash, "test_id": normalized_test_id, "kind": kind},
+        )
+        if not row:
+            return None
+        session_files = dict(row.session_files or {})
+        result = dict(row.result or {})
+
+    if not _ingest_is_current(session_files, _session_file_paths(list(session_files), normalized_test_id)):
+        return None
+    return result
+
+
+def record_upload_ingest(
+    content_hash: str,
+    test_id: str,
+    kind: str,
+    *,
+    filename: Optional[str],
+    session_ids: List[str],
+    result: Dict[str, Any],
+) -> None:
+    normalized_test_id = _normalize_test_id(test_id)
+    normalized_ids = _normalize_session_ids(session_ids)
+    session_files = _session_file_paths(normalized_ids, normalized_test_id)
+    with SessionLocal() as db:
+        key = {"content_hash": content_hash, "test_id": normalized_test_id, "kind": kind}
+        row = db.get(UploadIngestRecord, key)
+        if not row:
+            row = UploadIngestRecord(**key)
+            db.add(row)
+        row.filename = filename
+        row.session_ids = normalized_ids
+        row.session_files = session_files
+        row.result = result
+        row.ingested_at = int(time.time())
+        db.commit()
+
+
+def prune_upload_ingests() -> int:
+    """Drop ingest records whose sessions were deleted or re-ingested so the table does not grow unbounded."""
+    with SessionLocal() as db:
+        rows = db.execute(select(UploadIngestRecord)).scalars().all()
+        keyed = [((row.content_hash, row.test_id, row.kind), dict(row.session_files or {})) for row in rows]
+
+    current_files = _session_file_paths(list({sid for _, files in keyed for sid in files}))
+    stale_keys = [key for key, files in keyed if not _ingest_is_current(files, current_files)]
+    if not stale_keys:
+        return 0
+
+    with SessionLocal() as db:
+        for content_hash, test_id, kind in stale_keys:
+            db.execute(
+                delete(UploadIngestRecord).where(
+                    UploadIngestRecord.content_hash == content_hash,
+                    UploadIngestRecord.test_id == test_id,
+                    UploadIngestRecord.kind == kind,
+                )
+            )
         db.commit()
-        return True
\ No newline at end of file
+    return len(stale_keys)
@@ -58,6 +58,13 @@ function fmtTimelineAxisTime(ms) {
   return `${minutes}:${String(seconds).padStart(2, "0")}`;
 }
 
+function fmtDistanceM(meters) {
+  const n = safeNum(meters);
+  if (n === null) return "—";
+  if (n < 1000) return `${n.toFixed(0)} m`;
+  return `${(n / 1000).toFixed(2)} km`;
+}
+
 function safeNum(x) {
   const n = Number(x);
   return Number.isFinite(n) ? n : null;
@@ -69,6 +76,13 @@ function fmtPercent(value) {
   return `${(n * 100).toFixed(1)} %`;
 }
 
+// Point estimate followed by its bootstrap interval, when the server sent one.
+function fmtWithCi(value, ci, fmt) {
+  if (value === null || value === undefined) return "—";
+  if (!Array.isArray(ci) || ci.length !== 2) return fmt(value);
+  return `${fmt(value)} [${fmt(ci[0])} – ${fmt(ci[1])}]`;
+}
+
 function normalizeBooleanLike(value) {
   if (value === null || value === undefined) return null;
   if (typeof value === "boolean") return value;
@@ -179,6 +193,11 @@ const INTERVAL_EVENT_OPTIONS = [
   { key: "zoom", label: "Zoom", color: "#8B5CF6" },
   { key: "popup", label: "Popup", color: "#14B8A6" },
 ];
+// Reported next to the behaviours above, which they overlap; dwell excludes idle time.
+const INTERVAL_SEGMENT_OPTIONS = [
+  { key: "idle", label: "Idle", color: "#F59E0B" },
+  { key: "dwell", label: "Dwell", color: "#EC4899" },
+];
 const INTERVAL_OTHER_OPTION = { key: "other", label: "Other", color: "#94A3B8" };
 const GROUP_RATIO_STAT_OPTIONS = [
   { key: "average", label: "Average" },
@@ -282,7 +301,7 @@ const state = {
   groupCompareChartReferenceGroupId: null,
   groupCompareChartColors: {},
   groupCompareChartVisibleTasks: [],
-  groupCompareAnswersCache: {},
+  groupCompareData: null,
   groupCompareMovementSelection: {
     taskKey: "ALL_TASKS",
     statistic: "average",
@@ -1002,6 +1021,10 @@ async function apiGetGroupAnswers(groupId) {
   return apiGet(`/api/groups/${encodeURIComponent(groupId)}/answers`);
 }
 
+async function apiGetGroupStats(groupId) {
+  return apiGet(`/api/groups/${encodeURIComponent(groupId)}/stats`);
+}
+
 async function apiGetGroupWordcloud(groupId, taskId = null) {
   const q = taskId ? `?task_id=${encodeURIComponent(taskId)}` : "";
   return apiGet(`/api/groups/${encodeURIComponent(groupId)}/wordcloud${q}`);
@@ -1011,6 +1034,18 @@ function apiGetGroupExportCsvUrl(groupId) {
   return `/api/groups/${encodeURIComponent(groupId)}/export-csv`;
 }
 
+async function apiCompareGroups(groupIds) {
+  const res = await apiFetch(`/api/groups/compare`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ group_ids: groupIds }),
+  });
+  if (!res.ok) {
+    throw new Error(await parseApiError(res));
+  }
+  return res.json();
+}
+
 async function apiCompareWordcloud(groupIds, taskId = null) {
   const res = await apiFetch(`/api/groups/compare/wordcloud`, {
     method: "POST",
@@ -1994,7 +2029,7 @@ async function setCorrectAnswerPersisted(testId, taskId, answerTextOrNull) {
 
     const recalculation = result?.recalculation;
     if (recalculation && Number.isFinite(Number(recalculation.matched))) {
-      renderSettingsStatus(`Saved. Recalculated sessions: ${Number(recalculation.updated)}/${Number(recalculation.matched)}.`);
+      renderSettingsStatus(`Saved. Re-scored answers: ${Number(recalculation.updated)}/${Number(recalculation.matched)}.`);
     } else {
       renderSettingsStatus("Saved.");
     }
@@ -2051,15 +2086,19 @@ async function uploadSettingsAnswersCsv(file) {
   try {
     const out = await apiUploadTestAnswersCsv(testId, file);
     state.correctAnswers[testId] = out?.answers ?? {};
+    renderSettingsPage();
+
+    const recalculation = out?.job_id
+      ? await pollUploadJob(out.job_id, { statusEl: $("#settingsStatus"), onCompleted: async () => {} })
+      : null;
     await refreshSessions();
     await refreshGroups();
     renderSettingsPage();
     renderSessionsList();
     renderTestAggMetrics();
 
-    const recalculation = out?.recalculation;
     const recalcText = recalculation && Number.isFinite(Number(recalculation.matched))
-      ? ` Recalculated sessions: ${Number(recalculation.updated)}/${Number(recalculation.matched)}.`
+      ? ` Re-scored answers: ${Number(recalculation.updated)}/${Number(recalculation.matched)}.`
       : "";
 
     renderSettingsStatus(`CSV uploaded. Processed rows: ${Number(out?.rows_valid ?? 0)}.${recalcText}`);
@@ -2624,13 +2663,11 @@ function renderIntervalRatiosModal() {
     const otherRatio = taskDurationMs > 0 ? (otherDurationMs / taskDurationMs) : 0;
     const dominantBehavior = scopePayload?.dominant_behavior ?? null;
 
-    const chartRows = [
-      ...visibleOptions.map((option) => {
-        const eventPayload = scopePayload.events?.[option.key] ?? {};
-        const ratio = safeNum(eventPayload.ratio);
-        const durationMs = safeNum(eventPayload.duration_ms) ?? 0;
-        const width = Math.max(0, Math.min(100, (ratio ?? 0) * 100));
-        return `
+    const renderRatioRow = (option, eventPayload) => {
+      const ratio = safeNum(eventPayload?.ratio);
+      const durationMs = safeNum(eventPayload?.duration_ms) ?? 0;
+      const width = Math.max(0, Math.min(100, (ratio ?? 0) * 100));
+      return `
           <div class="interval-ratios-row">
             <div class="interval-ratios-label">
               <span class="interval-ratios-dot" style="background:${option.color};"></span>
@@ -2643,7 +2680,10 @@ function renderIntervalRatiosModal() {
             <div class="interval-ratios-value">${fmtMs(durationMs)}</div>
           </div>
         `;
-      }),
+    };
+
+    const chartRows = [
+      ...visibleOptions.map((option) => renderRatioRow(option, scopePayload.events?.[option.key])),
       state.intervalRatiosSelection.showOther ? `
         <div class="interval-ratios-row">
           <div class="interval-ratios-label">
@@ -2687,6 +2727,12 @@ function renderIntervalRatiosModal() {
           <div class="interval-ratios-chart">${chartRows}</div>
         </div>
         <div class="interval-ratios-footnote">Right column shows summed duration. “Other” is the remaining task time that is not currently displayed in Move / Zoom / Popup, so the chart always sums to 100% even when hidden.</div>
+        ${scopePayload.segments ? `
+          <div class="interval-ratios-chart-card">
+            <div class="interval-ratios-chart">${INTERVAL_SEGMENT_OPTIONS.map((option) => renderRatioRow(option, scopePayload.segments[option.key])).join("")}</div>
+          </div>
+          <div class="interval-ratios-footnote">Idle gaps and dwells overlap the behaviours above and are not part of their 100%; dwell time excludes idle gaps.</div>
+        ` : ""}
       </div>
     `;
   }
@@ -3015,6 +3061,10 @@ async function openTaskModal(taskId) {
     renderMetricGrid({
       "Task Duration": fmtMs(m.duration_ms),
       "Event Count": m.events_total ?? "—",
+      "Pan Distance": fmtDistanceM(m.pan_distance_m),
+      "Pan Speed": safeNum(m.pan_speed_m_s) === null ? "—" : `${fmtDistanceM(m.pan_speed_m_s)}/s`,
+      "Direction Changes": m.direction_changes ?? "—",
+      "Zoom Changes": m.zoom_changes ?? "—",
       "User Answer": m.answer ?? "—",
       "Correct Answer": m.correct_answer ?? "—",
       "Correctly": m.is_correct === true ? "YES" : (m.is_correct === false ? "NO" : "—"),
@@ -5034,105 +5084,19 @@ function medianFromNumbers(values) {
   return nums.length % 2 ? nums[mid] : (nums[mid - 1] + nums[mid]) / 2;
 }
 
-function quantileFromSortedNumbers(sortedNums, q) {
-  if (!Array.isArray(sortedNums) || !sortedNums.length) return null;
-  if (!Number.isFinite(q)) return null;
-  if (sortedNums.length === 1) return sortedNums[0];
-
-  const pos = (sortedNums.length - 1) * Math.max(0, Math.min(1, q));
-  const base = Math.floor(pos);
-  const rest = pos - base;
-  const lower = sortedNums[base];
-  const upper = sortedNums[Math.min(base + 1, sortedNums.length - 1)];
-  return lower + rest * (upper - lower);
-}
-
-function buildBoxplotStats(values) {
-  const nums = values
-    .map((v) => Number(v))
-    .filter((v) => Number.isFinite(v))
-    .sort((a, b) => a - b);
-
-  if (!nums.length) return null;
-
-  const q1 = quantileFromSortedNumbers(nums, 0.25);
-  const median = quantileFromSortedNumbers(nums, 0.5);
-  const q3 = quantileFromSortedNumbers(nums, 0.75);
-  const iqr = q3 - q1;
-  const lowerFence = q1 - 1.5 * iqr;
-  const upperFence = q3 + 1.5 * iqr;
-  const inside = nums.filter((v) => v >= lowerFence && v <= upperFence);
-  const outliers = nums.filter((v) => v < lowerFence || v > upperFence);
-
-  return {
-    min: nums[0],
-    max: nums[nums.length - 1],
-    q1,
-    median,
-    q3,
-    iqr,
-    lowerFence,
-    upperFence,
-    whiskerLow: inside.length ? inside[0] : nums[0],
-    whiskerHigh: inside.length ? inside[inside.length - 1] : nums[nums.length - 1],
-    outliers,
-    average: nums.reduce((sum, val) => sum + val, 0) / nums.length,
-    count: nums.length,
-  };
-}
-
-// Normalize per-group aggregates for table and chart tabs from the same source sessions.
-function buildGroupCompareRows(groups, taskId = null) {
-  return (groups ?? []).map((group) => {
-    let sessions = Array.isArray(group?.sessions) ? group.sessions : [];
-    if (taskId) {
-      sessions = sessions.filter((s) => {
-        const taskIds = Array.isArray(s?.tasks) && s.tasks.length ? s.tasks : [s?.task ?? "unknown"];
-        return taskIds.includes(taskId);
-      });
-    }
-
-    const durations = sessions
-      .map((s) => {
-        if (taskId) return s?.stats?.tasks?.[taskId]?.duration_ms;
-        return s?.stats?.session?.duration_ms;
-      })
-      .filter((v) => Number.isFinite(Number(v)))
-      .map((v) => Number(v));
-
-    const ages = sessions
-      .map((s) => s?.stats?.session?.soc_demo?.age)
-      .filter((v) => Number.isFinite(Number(v)))
-      .map((v) => Number(v));
-    
-    const accuracies = sessions
-    .map((s) => {
-      if (taskId) {
-        const evalTask = s?.stats?.answers_eval?.by_task?.[taskId];
-        if (typeof evalTask?.is_correct === "boolean") {
-          return evalTask.is_correct ? 1 : 0;
-        }
-        const taskAccuracy = Number(s?.stats?.tasks?.[taskId]?.accuracy);
-        return Number.isFinite(taskAccuracy) ? taskAccuracy : null;
-      }
-      const sessionAccuracy = Number(s?.stats?.answers_eval?.summary?.accuracy);
-      return Number.isFinite(sessionAccuracy) ? sessionAccuracy : null;
-    })
-    .filter((v) => Number.isFinite(v));
-
-    const avgDurationMs = durations.length ? durations.reduce((a, b) => a + b, 0) / durations.length : null;
-    const medianDurationMs = medianFromNumbers(durations);
-    const avgAge = ages.length ? ages.reduce((a, b) => a + b, 0) / ages.length : null;
-    const avgCorrectness = accuracies.length ? accuracies.reduce((a, b) => a + b, 0) / accuracies.length : null;
-
+// Map server-side compare rows (overall or for one task) to the table row shape.
+function buildGroupCompareRows(compare, taskId = null) {
+  return (compare?.groups ?? []).map((item) => {
+    const row = (taskId ? item.by_task?.[taskId] : item.summary) ?? {};
     return {
-      groupId: group.id,
-      groupName: group.name ?? "No name",
-      avgDurationMs,
-      medianDurationMs,
-      avgCorrectness,
-      avgAge,
-      membersCount: sessions.length,
+      groupId: item.group_id,
+      groupName: item.name ?? "No name",
+      avgDurationMs: row.avg_duration_ms ?? null,
+      medianDurationMs: row.median_duration_ms ?? null,
+      avgCorrectness: row.avg_correctness ?? null,
+      avgAge: row.avg_age ?? null,
+      ci: row.ci ?? null,
+      membersCount: row.members_count ?? 0,
     };
   });
 }
@@ -5140,9 +5104,9 @@ function buildGroupCompareRows(groups, taskId = null) {
 function renderCompareTable({ rows }) {
   const sorted = [...rows].sort((a, b) => String(a.groupName).localeCompare(String(b.groupName), "cs"));
   const metrics = [
-    { label: "Average time", render: (row) => fmtMs(row.avgDurationMs) },
-    { label: "Median time", render: (row) => fmtMs(row.medianDurationMs) },
-    { label: "Average correctness", render: (row) => fmtPercent(row.avgCorrectness) },
+    { label: "Average time", render: (row) => fmtWithCi(row.avgDurationMs, row.ci?.avg_duration_ms, fmtMs) },
+    { label: "Median time", render: (row) => fmtWithCi(row.medianDurationMs, row.ci?.median_duration_ms, fmtMs) },
+    { label: "Average correctness", render: (row) => fmtWithCi(row.avgCorrectness, row.ci?.avg_correctness, fmtPercent) },
     { label: "Average age", render: (row) => (row.avgAge === null ? "—" : row.avgAge.toFixed(1)) },
   ];
 
@@ -5168,20 +5132,17 @@ function renderCompareTable({ rows }) {
   `;
 }
 
-function renderGroupCompareBoxplotTab(groups) {
+function renderGroupCompareBoxplotTab(groups, compare) {
   const wrap = $("#groupsCompareBoxplotWrap");
   if (!wrap) return;
   if (!groups.length) {
     wrap.innerHTML = `<div class="empty"><div class="empty-title">No groups selected</div><div class="muted small">Select groups for comparison on the Groups page.</div></div>`;
     return;
   }
+  const boxplotsById = new Map((compare?.groups ?? []).map((item) => [item.group_id, item.duration_boxplot]));
   const statsByGroup = groups
     .map((group, index) => {
-      const sessions = Array.isArray(group?.sessions) ? group.sessions : [];
-      const durations = sessions
-        .map((s) => Number(s?.stats?.session?.duration_ms))
-        .filter((v) => Number.isFinite(v));
-      const stats = buildBoxplotStats(durations);
+      const stats = boxplotsById.get(group.id);
       if (!stats) return null;
       return {
         id: group.id,
@@ -5527,21 +5488,23 @@ function getGroupTaskAccuracyMap(groupAnswersPayload, taskIds) {
   return map;
 }
 
-  async function ensureGroupAnswersCache(groupIds = []) {
-  const ids = Array.from(new Set((groupIds ?? []).filter(Boolean)));
-  const missingIds = ids.filter((groupId) => !state.groupCompareAnswersCache?.[groupId]);
-  if (!missingIds.length) return state.groupCompareAnswersCache ?? {};
+// One /api/groups/compare payload per selection; the server memoizes it by group and data versions.
+async function ensureGroupCompareData(groups) {
+  const groupIds = (groups ?? []).map((group) => group.id);
+  const key = groupIds.join("|");
+  if (state.groupCompareData?.key === key) return state.groupCompareData.payload;
+  const payload = await apiCompareGroups(groupIds);
+  state.groupCompareData = { key, payload };
+  return payload;
+}
 
-  const responses = await Promise.all(
-    missingIds.map((groupId) => apiGetGroupAnswers(groupId).catch(() => null)),
-  );
+function getLoadedGroupCompareData(groups) {
+  const key = (groups ?? []).map((group) => group.id).join("|");
+  return state.groupCompareData?.key === key ? state.groupCompareData.payload : null;
+}
 
-  const nextCache = { ...(state.groupCompareAnswersCache ?? {}) };
-  missingIds.forEach((groupId, index) => {
-    nextCache[groupId] = responses[index];
-  });
-  state.groupCompareAnswersCache = nextCache;
-  return nextCache;
+function getGroupCompareAnswersById(compare) {
+  return Object.fromEntries((compare?.groups ?? []).map((item) => [item.group_id, item.answers]));
 }
 
 // Produces aligned category axis + per-group series across selectable comparison dimensions.
@@ -5653,9 +5616,7 @@ async function renderGroupCompareChartTab(groups) {
 
   let groupAnswersById = {};
   if (state.groupCompareChartDimension === "tasks") {
-    const groupIds = (groups ?? []).map((group) => group.id);
-    await ensureGroupAnswersCache(groupIds);
-    groupAnswersById = state.groupCompareAnswersCache ?? {};
+    groupAnswersById = getGroupCompareAnswersById(await ensureGroupCompareData(groups));
   }
 
   const chartData = buildGroupCompareChartData(groups, { groupAnswersById });
@@ -5908,26 +5869,6 @@ async function renderGroupCompareChartTab(groups) {
 }
 
 // ===== Answer Intelligence & Wordcloud Rendering =====
-function computeNumericStats(values) {
-  const nums = values
-    .map((v) => Number(v))
-    .filter((v) => Number.isFinite(v))
-    .sort((a, b) => a - b);
-
-  if (!nums.length) return null;
-
-  const mid = Math.floor(nums.length / 2);
-  const median = nums.length % 2 ? nums[mid] : (nums[mid - 1] + nums[mid]) / 2;
-
-  return {
-    count: nums.length,
-    min: nums[0],
-    max: nums[nums.length - 1],
-    avg: nums.reduce((acc, n) => acc + n, 0) / nums.length,
-    median,
-  };
-}
-
 function renderGroupStatMetric(label, value) {
   return `
     <div class="metric">
@@ -5937,11 +5878,25 @@ function renderGroupStatMetric(label, value) {
   `;
 }
 
-function renderGroupTimeStats(group) {
+// Distributions come precomputed from /api/groups/{id}/stats; panels only format the numbers.
+async function renderGroupStatsPanels(group) {
+  let groupStats = null;
+  try {
+    groupStats = await apiGetGroupStats(group.id);
+  } catch (e) {
+    showAppMessage({ type: "error", text: `Group statistics failed: ${e?.message ?? e}` });
+  }
+  if (getSelectedGroup()?.id !== group.id) return;
+
+  renderGroupTimeStats(groupStats);
+  renderGroupCountsStats(groupStats);
+  renderGroupSocioStats(groupStats);
+}
+
+function renderGroupTimeStats(groupStats) {
   const panel = $("#groupTimeStatsPanel");
   if (!panel) return;
-  const sessions = Array.isArray(group?.sessions) ? group.sessions : [];
-  const stats = computeNumericStats(sessions.map((s) => s?.stats?.session?.duration_ms));
+  const stats = groupStats?.session?.duration_ms ?? null;
 
   panel.classList.remove("hidden");
   if (!stats) {
@@ -5960,12 +5915,11 @@ function renderGroupTimeStats(group) {
   `;
 }
 
-function renderGroupCountsStats(group) {
+function renderGroupCountsStats(groupStats) {
   const panel = $("#groupCountsStatsPanel");
   if (!panel) return;
-  const sessions = Array.isArray(group?.sessions) ? group.sessions : [];
-  const tasksStats = computeNumericStats(sessions.map((s) => s?.stats?.session?.tasks_count));
-  const eventsStats = computeNumericStats(sessions.map((s) => s?.stats?.session?.events_total));
+  const tasksStats = groupStats?.session?.tasks_count ?? null;
+  const eventsStats = groupStats?.session?.events_total ?? null;
 
   panel.classList.remove("hidden");
   panel.innerHTML = `<div class="title">Task and event statistics</div>`;
@@ -5997,27 +5951,18 @@ function renderGroupCountsStats(group) {
   }
 }
 
-function renderGroupSocioStats(group) {
+function renderGroupSocioStats(groupStats) {
   const panel = $("#groupSocioPanel");
   if (!panel) return;
 
-  const sessions = Array.isArray(group?.sessions) ? group.sessions : [];
-  const socRows = sessions.map((s) => s?.stats?.session?.soc_demo ?? {});
-  const ageStats = computeNumericStats(socRows.map((r) => r?.age));
+  const socio = groupStats?.soc_demo ?? {};
+  const ageStats = socio.age ?? null;
 
   function distribution(key) {
-    const counts = new Map();
-    let total = 0;
-    socRows.forEach((row) => {
-      const val = String(row?.[key] ?? "").trim();
-      if (!val) return;
-      counts.set(val, (counts.get(val) ?? 0) + 1);
-      total += 1;
-    });
-    if (!total) return "—";
-    return Array.from(counts.entries())
-      .sort((a, b) => b[1] - a[1])
-      .map(([value, count]) => `${escapeHtml(value)}: ${((count / total) * 100).toFixed(1)} %`)
+    const values = socio?.[key]?.values ?? [];
+    if (!values.length) return "—";
+    return values
+      .map((row) => `${escapeHtml(row.value)}: ${(row.share * 100).toFixed(1)} %`)
       .join(" · ");
   }
 
@@ -6136,7 +6081,7 @@ async function renderGroupAnswersAndWordcloud(group) {
   }
 }
 
-function renderGroupCompareAnswersTab(groups) {
+function renderGroupCompareAnswersTab(groups, compare) {
   const wrap = $("#groupsCompareWordcloudWrap");
   if (!wrap) return;
   if (!groups.length) {
@@ -6163,10 +6108,9 @@ function renderGroupCompareAnswersTab(groups) {
 
   const load = async () => {
     const taskId = $("#groupsCompareWordcloudTaskSelect")?.value || null;
-    const [res, groupAnswers] = await Promise.all([
-      apiCompareWordcloud(groups.map((g) => g.id), taskId),
-      Promise.all(groups.map((g) => apiGetGroupAnswers(g.id).catch(() => null))),
-    ]);
+    const res = await apiCompareWordcloud(groups.map((g) => g.id), taskId);
+    const answersById = getGroupCompareAnswersById(compare);
+    const groupAnswers = groups.map((g) => answersById[g.id] ?? null);
 
     const grid = $("#groupsCompareWordcloudGrid");
     if (!grid) return;
@@ -6326,9 +6270,7 @@ function renderGroupsPage() {
 
   if (answersPanelEl) answersPanelEl.classList.remove("hidden");
   renderGroupAnswersAndWordcloud(group);
-  renderGroupTimeStats(group);
-  renderGroupCountsStats(group);
-  renderGroupSocioStats(group);
+  renderGroupStatsPanels(group);
 
   if (editBtn) editBtn.disabled = false;
   if (exportGroupBtn) exportGroupBtn.disabled = false;
@@ -6928,7 +6870,7 @@ function getGroupsForComparison() {
   return state.groups.filter((g) => ids.has(g.id));
 }
 
-function renderGroupCompareSummaryTab(groups) {
+function renderGroupCompareSummaryTab(groups, compare) {
   const wrap = $("#groupsCompareTableWrap");
   if (!wrap) return;
   if (!groups.length) {
@@ -6936,16 +6878,16 @@ function renderGroupCompareSummaryTab(groups) {
     return;
   }
 
-  const rows = buildGroupCompareRows(groups, null);
+  const rows = buildGroupCompareRows(compare, null);
   wrap.innerHTML = renderCompareTable({ rows });
 }
 
-function renderGroupCompareTaskTab(groups) {
+function renderGroupCompareTaskTab(groups, compare) {
   const taskListEl = $("#groupTaskList");
   const tableWrap = $("#groupTaskCompareTableWrap");
   if (!taskListEl || !tableWrap) return;
 
-  const allTasks = getAllTaskIdsForGroups(groups);
+  const allTasks = compare?.task_ids ?? [];
   const q = normalizeSearchText(state.groupTaskSearchQuery);
   const filteredTasks = allTasks.filter((taskId) => normalizeSearchText(taskId).includes(q));
 
@@ -6978,7 +6920,7 @@ function renderGroupCompareTaskTab(groups) {
     return;
   }
 
-  const rows = buildGroupCompareRows(groups, state.selectedGroupCompareTaskId);
+  const rows = buildGroupCompareRows(compare, state.selectedGroupCompareTaskId);
   tableWrap.innerHTML = `
     <div class="muted small" style="margin-bottom:8px;">Task: <b>${escapeHtml(state.selectedGroupCompareTaskId)}</b></div>
     ${renderCompareTable({ rows })}
@@ -7001,17 +6943,30 @@ function renderGroupCompareModal() {
     panel.classList.toggle("hidden", panel.dataset.panel !== state.groupCompareTab);
   });
 
-  renderGroupCompareSummaryTab(groups);
+  const compare = getLoadedGroupCompareData(groups);
+  if (groups.length && !compare) {
+    const wraps = ["#groupsCompareTableWrap", "#groupTaskCompareTableWrap", "#groupsCompareBoxplotWrap"].map((sel) => $(sel)).filter(Boolean);
+    wraps.forEach((el) => { el.innerHTML = `<div class="muted small">Loading…</div>`; });
+    ensureGroupCompareData(groups)
+      .then(() => renderGroupCompareModal())
+      .catch((e) => {
+        wraps.forEach((el) => { el.innerHTML = `<div class="muted small">Loading error: ${escapeHtml(e?.message ?? e)}</div>`; });
+      });
+    return;
+  }
+
+  renderGroupCompareSummaryTab(groups, compare);
   renderGroupCompareChartTab(groups);
-  renderGroupCompareBoxplotTab(groups);
+  renderGroupCompareBoxplotTab(groups, compare);
   renderGroupCompareMovementTab(groups);
-  renderGroupCompareTaskTab(groups);
-  renderGroupCompareAnswersTab(groups);
+  renderGroupCompareTaskTab(groups, compare);
+  renderGroupCompareAnswersTab(groups, compare);
 }
 
 function openGroupCompareModal() {
   if ((state.selectedGroupCompareIds ?? []).length < 1) return;
   state.groupCompareTab = "summary";
+  state.groupCompareData = null;
   show($("#groupsCompareModal"));
   renderGroupCompareModal();
 }